@@ -0,0 +1,398 @@
+import asyncio
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import Callable, Container, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+from fetch_orchestrator import (
+    FALLBACK_HOST_LIMIT, MAX_CONSECUTIVE_FAILURES, SourceSkipped, is_transport_failure, source_host, takes_limit
+)
+from news_scrapers import (
+    HEADERS, BODY_FETCH_DEADLINE, ARTICLE_MAX_CHARS, parse_article_content, parse_listing, read_file_url
+)
+from scrape_cache import ScrapeCache, make_scrape_key
+from source_registry import NewsSource, get_source, host_limits as source_host_limits
+
+# Concurrent requests per host: registered sources use their declared
+# concurrency, article hosts use the fallback
+ASYNC_FALLBACK_HOST_LIMIT = 8
+ASYNC_TOTAL_CONNECTIONS = 100
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket for coroutines; acquire() sleeps without blocking the loop
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncScraper:
+    """
+    asyncio scraping backend
+    Owns an event loop running on a daemon thread, one aiohttp session and
+    a semaphore per host; listing requests also take a token from their
+    source's rate limit. HTML and feed parsing runs on the loop's default
+    executor so it never stalls requests in flight. Coroutine methods must
+    run on that loop; use run() (or the module-level sync facade) from
+    regular threads.
+    """
+
+    def __init__(self, host_limits: Optional[Dict[str, int]] = None,
+                 fallback_limit: int = ASYNC_FALLBACK_HOST_LIMIT,
+                 total_connections: int = ASYNC_TOTAL_CONNECTIONS):
+        self.host_limits = dict(host_limits or {})
+        self.fallback_limit = fallback_limit
+        self.total_connections = total_connections
+        self._semaphores = {}
+        self._buckets = {}
+        self._session = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-scraper", daemon=True)
+        self._thread.start()
+
+    def submit(self, coro) -> Future:
+        """
+        Schedule a coroutine on the scraper loop from another thread
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """
+        Run a coroutine on the scraper loop and wait for its result
+        """
+        return self.submit(coro).result(timeout)
+
+    def close(self):
+        if self._session is not None:
+            self.run(self._session.close())
+            self._session = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.total_connections, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, headers=HEADERS)
+        return self._session
+
+    def _semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self._semaphores:
+            limit = self.host_limits.get(host)
+            if limit is None:
+                source_limit = source_host_limits().get(host)
+                limit = source_limit[2] if source_limit is not None else self.fallback_limit
+            self._semaphores[host] = asyncio.Semaphore(limit)
+        return self._semaphores[host]
+
+    def _bucket(self, host: str) -> AsyncTokenBucket:
+        if host not in self._buckets:
+            rate, burst, _ = source_host_limits().get(host, FALLBACK_HOST_LIMIT)
+            self._buckets[host] = AsyncTokenBucket(rate, burst)
+        return self._buckets[host]
+
+    @asynccontextmanager
+    async def listing_slot(self, host: str):
+        """
+        Hold one of a listing host's request slots after taking a rate token
+        """
+        async with self._semaphore(host):
+            await self._bucket(host).acquire()
+            yield
+
+    async def _get(self, url: str, timeout: float = 10) -> bytes:
+        async with self._get_session().get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            response.raise_for_status()
+            return await response.read()
+
+    async def fetch(self, url: str, timeout: float = 10) -> bytes:
+        """
+        GET a URL under its host's semaphore and return the body
+        """
+        host = urlparse(url).hostname or ''
+        async with self._semaphore(host):
+            return await self._get(url, timeout)
+
+    async def in_executor(self, func: Callable, *args):
+        """
+        Run CPU-bound work (parsing) off the event loop thread
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def fetch_article_content(self, url: str, max_length: int = ARTICLE_MAX_CHARS) -> str:
+        """
+        Attempt to fetch article content from URL
+        """
+        if not url or url.startswith('#') or not url.startswith('http'):
+            return ''
+
+        try:
+            html = await self.fetch(url, timeout=5)
+            return await self.in_executor(parse_article_content, html, max_length)
+        except Exception as e:
+            return ''
+
+    async def attach_article_contents(self, news_items: List[Dict], deadline: float = BODY_FETCH_DEADLINE,
+                                      max_length: int = ARTICLE_MAX_CHARS) -> List[Dict]:
+        """
+        Fetch bodies concurrently; fetches still running at the deadline are cancelled
+        """
+        tasks = {}
+        for item in news_items:
+            url = item.get('url', '')
+            if url and url.startswith('http'):
+                tasks[asyncio.ensure_future(self.fetch_article_content(url, max_length))] = item
+
+        if not tasks:
+            return news_items
+
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+
+        for task in done:
+            tasks[task]['content'] = task.result()
+
+        for task in pending:
+            task.cancel()
+
+        return news_items
+
+    async def scrape_source(self, source: NewsSource, ticker: str, max_articles: int = 5,
+                            body_deadline: float = BODY_FETCH_DEADLINE,
+                            known: Optional[Container[str]] = None, since: Optional[float] = None,
+                            content_length: int = ARTICLE_MAX_CHARS, limit: Optional[Callable] = None) -> List[Dict]:
+        """
+        Scrape one registered source; listing page errors are raised
+        The listing request runs under limit() (an async context manager
+        factory, default: the host's listing_slot); bodies run outside it
+        """
+        url = source.page_url(ticker)
+        async with limit() if limit is not None else self.listing_slot(source.host):
+            page = read_file_url(url) if url.startswith('file://') else await self._get(url, timeout=source.timeout)
+        news_items = await self.in_executor(parse_listing, source, page, ticker, max_articles, known, since)
+        if source.needs_bodies:
+            await self.attach_article_contents(news_items, deadline=body_deadline, max_length=content_length)
+        return news_items
+
+    async def _scrape_or_report(self, source_name: str, ticker: str, **kwargs) -> List[Dict]:
+        try:
+            return await self.scrape_source(get_source(source_name), ticker, **kwargs)
+        except Exception as e:
+            print(f"Error scraping {source_name} for {ticker}: {str(e)}")
+            return []
+
+    async def scrape_finviz(self, ticker: str, max_articles: int = 5, body_deadline: float = BODY_FETCH_DEADLINE,
+                           known: Optional[Container[str]] = None, since: Optional[float] = None,
+                           content_length: int = ARTICLE_MAX_CHARS) -> List[Dict]:
+        return await self._scrape_or_report("Finviz", ticker, max_articles=max_articles, body_deadline=body_deadline,
+                                            known=known, since=since, content_length=content_length)
+
+    async def scrape_yahoo(self, ticker: str, max_articles: int = 5, body_deadline: float = BODY_FETCH_DEADLINE,
+                          known: Optional[Container[str]] = None, since: Optional[float] = None,
+                          content_length: int = ARTICLE_MAX_CHARS) -> List[Dict]:
+        return await self._scrape_or_report("Yahoo Finance", ticker, max_articles=max_articles,
+                                            body_deadline=body_deadline, known=known, since=since,
+                                            content_length=content_length)
+
+    async def scrape_google_news(self, ticker: str, max_articles: int = 5,
+                                 known: Optional[Container[str]] = None, since: Optional[float] = None) -> List[Dict]:
+        return await self._scrape_or_report("Google News", ticker, max_articles=max_articles, known=known, since=since)
+
+    async def scrape_many(self, jobs: List[Tuple[str, str]], max_articles: int = 5,
+                          deadline: Optional[float] = None) -> List[Tuple[str, str, List[Dict], Optional[Exception]]]:
+        """
+        Run (ticker, source_name) jobs of any registered sources concurrently
+        Jobs unfinished at the deadline are cancelled and reported with a TimeoutError
+        """
+        tasks = {
+            asyncio.ensure_future(self.scrape_source(get_source(source_name), ticker, max_articles=max_articles)):
+                (ticker, source_name)
+            for ticker, source_name in jobs
+        }
+        if not tasks:
+            return []
+
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+
+        results = []
+        for task, (ticker, source_name) in tasks.items():
+            if task in pending:
+                results.append((ticker, source_name, [], TimeoutError(f"deadline of {deadline}s exceeded")))
+            elif task.exception() is not None:
+                results.append((ticker, source_name, [], task.exception()))
+            else:
+                results.append((ticker, source_name, task.result(), None))
+        return results
+
+    async def run_jobs(self, jobs: List[Tuple[str, str, Callable]], on_result: Callable,
+                       max_articles: int = 5, max_workers: int = 8,
+                       cache: Optional[ScrapeCache] = None, ttl: float = 900, cache_variant: str = '',
+                       max_failures: int = MAX_CONSECUTIVE_FAILURES):
+        """
+        Async counterpart of fetch_orchestrator.run_scrape_jobs
+        Jobs are (ticker, source_name, coroutine function) with at most
+        max_workers in flight per source; on_result(ticker, source_name,
+        news_items, error) is called as each completes. Listing requests
+        are limited per host, and a source is skipped after max_failures
+        consecutive transport failures. With a cache, fresh entries skip the
+        network and concurrent identical jobs (sync or async) share one fetch.
+        """
+        lanes = {source_name: asyncio.Semaphore(max(1, max_workers)) for _, source_name, _ in jobs}
+        failures = dict.fromkeys(lanes, 0)
+
+        async def run_job(ticker: str, source_name: str, scraper_func: Callable) -> List[Dict]:
+            host = source_host(source_name)
+
+            @asynccontextmanager
+            async def listing_slot():
+                async with self.listing_slot(host):
+                    if failures[source_name] >= max_failures:
+                        raise SourceSkipped(f"{source_name} skipped after {max_failures} consecutive failures")
+                    yield
+
+            async def fetch() -> List[Dict]:
+                if takes_limit(scraper_func):
+                    return await scraper_func(ticker, max_articles=max_articles, limit=listing_slot)
+                async with listing_slot():
+                    return await scraper_func(ticker, max_articles=max_articles)
+
+            try:
+                if cache is None:
+                    news_items = await fetch()
+                else:
+                    news_items = await cache.get_or_fetch_async(
+                        make_scrape_key(ticker, source_name, max_articles, cache_variant), fetch, ttl)
+            except SourceSkipped:
+                raise
+            except Exception as e:
+                failures[source_name] = failures[source_name] + 1 if is_transport_failure(e) else 0
+                raise
+            failures[source_name] = 0
+            return news_items
+
+        async def run_and_report(ticker: str, source_name: str, scraper_func: Callable):
+            async with lanes[source_name]:
+                try:
+                    news_items = await run_job(ticker, source_name, scraper_func)
+                except Exception as e:
+                    on_result(ticker, source_name, [], e)
+                    return
+            on_result(ticker, source_name, news_items, None)
+
+        await asyncio.gather(*(run_and_report(*job) for job in jobs))
+
+
+_scraper = None
+_scraper_lock = threading.Lock()
+
+
+def get_async_scraper() -> AsyncScraper:
+    """
+    Return the shared scraper (one event loop per process)
+    """
+    global _scraper
+    with _scraper_lock:
+        if _scraper is None:
+            _scraper = AsyncScraper()
+            atexit.register(_scraper.close)
+        return _scraper
+
+
+# Sync facade with the same signatures as news_scrapers
+
+def scrape_finviz(ticker: str, max_articles: int = 5, body_deadline: float = BODY_FETCH_DEADLINE,
+                  known: Optional[Container[str]] = None, since: Optional[float] = None,
+                  content_length: int = ARTICLE_MAX_CHARS) -> List[Dict]:
+    """
+    Scrape news from Finviz.com on the async backend
+    """
+    scraper = get_async_scraper()
+    return scraper.run(scraper.scrape_finviz(ticker, max_articles, body_deadline, known, since, content_length))
+
+
+def scrape_yahoo(ticker: str, max_articles: int = 5, body_deadline: float = BODY_FETCH_DEADLINE,
+                 known: Optional[Container[str]] = None, since: Optional[float] = None,
+                 content_length: int = ARTICLE_MAX_CHARS) -> List[Dict]:
+    """
+    Scrape news from Yahoo Finance on the async backend
+    """
+    scraper = get_async_scraper()
+    return scraper.run(scraper.scrape_yahoo(ticker, max_articles, body_deadline, known, since, content_length))
+
+
+def scrape_google_news(ticker: str, max_articles: int = 5,
+                       known: Optional[Container[str]] = None, since: Optional[float] = None) -> List[Dict]:
+    """
+    Scrape news from Google News on the async backend
+    """
+    scraper = get_async_scraper()
+    return scraper.run(scraper.scrape_google_news(ticker, max_articles, known, since))
+
+
+def scrape_source(source: NewsSource, ticker: str, max_articles: int = 5,
+                  body_deadline: float = BODY_FETCH_DEADLINE,
+                  known: Optional[Container[str]] = None, since: Optional[float] = None,
+                  content_length: int = ARTICLE_MAX_CHARS) -> List[Dict]:
+    """
+    Scrape one registered source on the async backend; listing page errors are raised
+    """
+    scraper = get_async_scraper()
+    return scraper.run(scraper.scrape_source(source, ticker, max_articles, body_deadline, known, since, content_length))
+
+
+def fetch_article_content(url: str, max_length: int = ARTICLE_MAX_CHARS) -> str:
+    """
+    Attempt to fetch article content from URL on the async backend
+    """
+    scraper = get_async_scraper()
+    return scraper.run(scraper.fetch_article_content(url, max_length))
+
+
+def run_scrape_jobs(jobs: List[Tuple[str, str, Callable]], max_articles: int = 5, max_workers: int = 8,
+                    cache: Optional[ScrapeCache] = None, ttl: float = 900, cache_variant: str = '',
+                    max_failures: int = MAX_CONSECUTIVE_FAILURES) -> Iterator[Tuple[str, str, List[Dict], Optional[Exception]]]:
+    """
+    fetch_orchestrator.run_scrape_jobs for async scrapers (see get_scrapers)
+    All jobs run on the scraper's event loop in one pass; yields
+    (ticker, source_name, news_items, error) as they complete
+    """
+    if not jobs:
+        return
+
+    scraper = get_async_scraper()
+    results = queue.Queue()
+    done = scraper.submit(scraper.run_jobs(jobs, lambda *result: results.put(result), max_articles, max_workers,
+                                           cache, ttl, cache_variant, max_failures))
+    for _ in jobs:
+        yield results.get()
+    done.result()
+
+
+def scrape_many(jobs: List[Tuple[str, str]], max_articles: int = 5,
+                deadline: Optional[float] = None) -> List[Tuple[str, str, List[Dict], Optional[Exception]]]:
+    """
+    Scrape all (ticker, source_name) jobs in one event loop pass
+    Returns (ticker, source_name, news_items, error) tuples in job order
+    """
+    scraper = get_async_scraper()
+    return scraper.run(scraper.scrape_many(jobs, max_articles, deadline))
@@ -0,0 +1,426 @@
+"""
+Benchmark script for the sentiment pipeline
+Run: python benchmark.py <benchmark> [options]
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import List
+
+# Building blocks for synthetic headlines and article bodies
+SAMPLE_SENTENCES = [
+    "Apple Inc. reported strong quarterly earnings, exceeding analyst expectations.",
+    "Shares plunged after the company cut its full-year guidance.",
+    "The board will meet on Tuesday to discuss the dividend.",
+    "Analysts upgraded the stock to buy citing robust iPhone demand.",
+    "Regulators opened an investigation into the company's accounting practices.",
+    "Revenue was flat year over year while margins narrowed slightly.",
+    "The chipmaker announced a new partnership with a major cloud provider.",
+    "Investors remain cautious ahead of the Federal Reserve decision.",
+]
+
+
+def make_corpus(n_texts: int, long_fraction: float = 0.3, seed: int = 0) -> List[str]:
+    """
+    Build a mix of headline-sized and body-sized texts
+    Bodies are capped at 1000 characters like fetch_article_content
+    """
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n_texts):
+        if rng.random() < long_fraction:
+            body = " ".join(rng.choice(SAMPLE_SENTENCES) for _ in range(20))
+            texts.append(body[:rng.randint(300, 1000)])
+        else:
+            texts.append(rng.choice(SAMPLE_SENTENCES))
+    return texts
+
+
+def bench_scheduler(args):
+    """Compare padding waste of fixed-count batches and token-budget batches"""
+    import sentiment_analyzer as sa
+
+    texts = make_corpus(args.texts, long_fraction=args.long_fraction)
+
+    sa.load_finbert()
+    encodings = sa.finbert_tokenizer(texts, truncation=True, max_length=512)
+    lengths = [len(ids) for ids in encodings['input_ids']]
+
+    fixed = [list(range(i, min(i + args.batch_size, len(texts)))) for i in range(0, len(texts), args.batch_size)]
+    scheduled = sa.schedule_batches(lengths, max_tokens=args.max_tokens, max_batch_size=args.batch_size)
+
+    print(f"{'plan':<12}{'batches':>10}{'tokens':>12}{'padding':>12}{'pad %':>10}")
+    for name, plan in [('fixed', fixed), ('scheduled', scheduled)]:
+        stats = sa.padding_stats(lengths, plan)
+        print(f"{name:<12}{stats['batches']:>10}{stats['tokens']:>12}{stats['padding']:>12}"
+              f"{stats['padding_ratio'] * 100:>9.1f}%")
+
+    if args.run_model:
+        # Time both plans through the same uncached forward pass
+        for name, plan in [('fixed', fixed), ('scheduled', scheduled)]:
+            start = time.time()
+            for batch in plan:
+                sa._score_finbert_batch([texts[i] for i in batch],
+                                        [{k: encodings[k][i] for k in encodings.keys()} for i in batch])
+            elapsed = time.time() - start
+            print(f"{name + ':':<12}{elapsed:.2f}s ({len(texts) / elapsed:.1f} texts/s)")
+
+
+def score_uncached(sa, texts: List[str], batch_size: int = 32, max_tokens: int = 4096):
+    """Run texts through the loaded backend, bypassing caches; returns (n, 3) probabilities"""
+    import numpy as np
+
+    sa.load_finbert()
+    encodings = sa.finbert_tokenizer(texts, truncation=True, max_length=512)
+    lengths = [len(ids) for ids in encodings['input_ids']]
+    probs = np.zeros((len(texts), 3))
+    for batch in sa.schedule_batches(lengths, max_tokens=max_tokens, max_batch_size=batch_size):
+        features = [{k: encodings[k][i] for k in encodings.keys()} for i in batch]
+        for i, result in zip(batch, sa._score_finbert_batch([texts[i] for i in batch], features)):
+            probs[i] = [result.get('positive', 0.0), result.get('negative', 0.0), result.get('neutral', 0.0)]
+    return probs
+
+
+def bench_backends(args):
+    """Throughput of each FinBERT backend and label parity against torch fp32"""
+    import numpy as np
+    import sentiment_analyzer as sa
+
+    texts = make_corpus(args.texts, long_fraction=args.long_fraction, seed=1)
+    backends = args.backends.split(',')
+    if 'torch' not in backends:
+        backends.insert(0, 'torch')
+
+    reference = None
+    failed = []
+    print(f"{'backend':<12}{'load s':>10}{'texts/s':>12}{'label agree':>14}{'max |dp|':>12}")
+    for name in backends:
+        sa.set_finbert_backend(name)
+        start = time.time()
+        sa.load_finbert()
+        load_time = time.time() - start
+
+        score_uncached(sa, texts[:8])  # warm up
+        start = time.time()
+        probs = score_uncached(sa, texts)
+        elapsed = time.time() - start
+
+        if reference is None:
+            reference = probs
+        agreement = float(np.mean(probs.argmax(axis=1) == reference.argmax(axis=1)))
+        max_diff = float(np.abs(probs - reference).max())
+        print(f"{name:<12}{load_time:>10.2f}{len(texts) / elapsed:>12.1f}{agreement * 100:>13.1f}%{max_diff:>12.4f}")
+
+        if name != 'torch' and agreement < args.min_agreement:
+            failed.append(name)
+            print(f"  parity check failed: {name} agrees with fp32 on {agreement * 100:.1f}% of labels "
+                  f"(minimum {args.min_agreement * 100:.1f}%)")
+
+    # Nonzero exit so the parity check can gate a backend switch
+    if failed:
+        sys.exit(1)
+
+
+def _pss_mb(pid: int) -> float:
+    """Proportional set size of a process in MB (Linux only; 0 elsewhere)"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def bench_pool(args):
+    """Sweep FinBERT process pool workers x threads per worker"""
+    import torch
+    import sentiment_analyzer as sa
+    from inference_pool import FinbertProcessPool
+
+    texts = make_corpus(args.texts, long_fraction=args.long_fraction, seed=2)
+
+    # In-process baseline
+    torch.set_num_threads(args.baseline_threads)
+    sa.score_finbert_texts(texts[:8])
+    start = time.time()
+    sa.score_finbert_texts(texts)
+    baseline = len(texts) / (time.time() - start)
+    print(f"in-process ({args.baseline_threads} threads): {baseline:.1f} texts/s, "
+          f"PSS {_pss_mb(os.getpid()):.0f} MB\n")
+
+    print(f"{'workers':>8}{'threads':>9}{'texts/s':>12}{'speedup':>10}{'total PSS MB':>15}")
+    for workers in [int(w) for w in args.workers.split(',')]:
+        for threads in [int(t) for t in args.threads.split(',')]:
+            pool = FinbertProcessPool(workers=workers, threads_per_worker=threads)
+            try:
+                pool.score(texts[:workers * 8], batch_size=8)  # start and warm up every worker
+                start = time.time()
+                pool.score(texts, batch_size=args.batch_size)
+                rate = len(texts) / (time.time() - start)
+                pss = _pss_mb(os.getpid()) + sum(_pss_mb(pid) for pid in pool.pids())
+            finally:
+                pool.shutdown()
+            print(f"{workers:>8}{threads:>9}{rate:>12.1f}{rate / baseline:>9.2f}x{pss:>15.0f}")
+
+
+def bench_vader(args):
+    """Per-text VADER vs. the columnar path; outputs must be identical"""
+    from sentiment_analyzer import analyze_vader_sentiment
+    from vader_fast import vader_columnar
+
+    rng = random.Random(0)
+    words = " ".join(SAMPLE_SENTENCES).split()
+    # Headline-sized texts with repeats, like syndicated news
+    distinct = [" ".join(rng.choice(words) for _ in range(rng.randint(4, 14))) for _ in range(args.distinct)]
+    texts = [rng.choice(distinct) for _ in range(args.texts)]
+
+    start = time.perf_counter()
+    expected = [analyze_vader_sentiment(text) for text in texts]
+    baseline = time.perf_counter() - start
+    print(f"{'per-text':<22}{baseline:>8.2f}s{len(texts) / baseline:>12.0f} texts/s")
+
+    for processes in [int(p) for p in args.processes.split(',')]:
+        start = time.perf_counter()
+        columns = vader_columnar(texts, processes=processes)
+        elapsed = time.perf_counter() - start
+        same = columns.to_dicts() == expected
+        print(f"{f'columnar x{processes}':<22}{elapsed:>8.2f}s{len(texts) / elapsed:>12.0f} texts/s"
+              f"{baseline / elapsed:>8.1f}x" + ("" if same else "  (outputs differ!)"))
+
+
+def bench_long(args):
+    """FinBERT cost versus article length: truncated lead vs. pooled windows"""
+    import sentiment_analyzer as sa
+
+    sa.load_finbert()
+    rng = random.Random(2)
+    print(f"{'tokens':>8}{'windows':>9}{'lead ms':>10}{'windows ms':>12}{'x lead':>8}{'articles/s':>12}")
+    for target in [int(n) for n in args.lengths.split(',')]:
+        # Grow each body sentence by sentence to about target tokens
+        texts = []
+        for _ in range(args.articles):
+            sentences = []
+            while len(sa.finbert_tokenizer(" ".join(sentences))['input_ids']) < target:
+                sentences.append(rng.choice(SAMPLE_SENTENCES))
+            texts.append(" ".join(sentences))
+
+        sa.score_finbert_texts(texts[:2])  # warm up
+        start = time.perf_counter()
+        sa.score_finbert_texts(texts)
+        lead = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = sa.score_finbert_long(texts, max_windows=args.max_windows)
+        windowed = time.perf_counter() - start
+
+        windows = sum(result.get('windows', 0) for result in results) / len(texts)
+        print(f"{target:>8}{windows:>9.1f}{lead * 1000 / len(texts):>10.1f}{windowed * 1000 / len(texts):>12.1f}"
+              f"{windowed / lead:>8.1f}{len(texts) / windowed:>12.1f}")
+
+
+def import_times(module: str) -> dict:
+    """
+    Cumulative import time in ms per imported package, via python -X importtime
+    Runs in a fresh interpreter so nothing is already imported
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def bench_startup(args):
+    """Cold import time per module; fails on budget overruns or forbidden imports"""
+    forbidden = [name for name in args.forbid.split(',') if name]
+    # Imported by interpreter startup itself (site, .pth files); not ours to fix
+    baseline = import_times('sys')
+    failed = False
+
+    for module in args.modules.split(','):
+        runs = [import_times(module) for _ in range(args.runs)]
+        total = min(run[module] for run in runs)
+        eager = [name for name in forbidden if name in runs[0]]
+        print(f"{module:<24}{total:>9.1f} ms" + (f"  imports {', '.join(eager)}!" if eager else ""))
+
+        slowest = sorted(((ms, name) for name, ms in runs[0].items() if '.' not in name and name != module and name not in baseline),
+                         reverse=True)[:args.top]
+        for ms, name in slowest:
+            print(f"    {name:<20}{ms:>9.1f} ms")
+
+        if eager or (args.budget_ms and total > args.budget_ms):
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+def bench_history(args):
+    """Range, rolling and top-mover query latency over a synthetic history"""
+    import tempfile
+    import numpy as np
+    from history_store import HistoryStore, SECONDS_PER_DAY, _day
+
+    rng = np.random.default_rng(0)
+    now = time.time()
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+    articles = args.rows // 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, 'history.db'))
+
+        start = time.perf_counter()
+        ages = rng.integers(0, args.days, articles) * SECONDS_PER_DAY
+        rows = [
+            (tickers[t], f"article-{i}", model, now - age, _day(now - age), 'Finviz', int(label), float(score))
+            for i, (t, age, label, score) in enumerate(zip(
+                rng.integers(0, args.tickers, articles), ages, rng.integers(0, 3, articles), rng.random(articles)))
+            for model in ('vader', 'finbert')
+        ]
+        store.append_rows(rows)
+        print(f"loaded {store.stats()['rows']} rows ({store.stats()['daily_rows']} daily) "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        queries = [
+            ('daily, 1 ticker, 90 days', lambda: store.daily([tickers[0]], start=now - 90 * SECONDS_PER_DAY, end=now)),
+            ('daily, all tickers, 7 days', lambda: store.daily(start=now - 7 * SECONDS_PER_DAY, end=now)),
+            ('rolling 7d, 5 tickers, 90 days', lambda: store.rolling(tickers[:5], window_days=7,
+                                                                     start=now - 90 * SECONDS_PER_DAY, end=now)),
+            ('top movers, 7d vs prior 7d', lambda: store.top_movers(window_days=7, as_of=now)),
+        ]
+        for name, query in queries:
+            query()
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                result = query()
+            elapsed = (time.perf_counter() - start) / args.iterations * 1000
+            print(f"{name:<34}{len(result):>8} rows{elapsed:>10.1f} ms")
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def bench_parsing(args):
+    """Parse time per page for the stdlib parser, lxml, and lxml with strainers"""
+    import feed_parsing
+    import html_parsing
+    import news_scrapers
+
+    pages = [
+        ('finviz_quote.html', lambda html: news_scrapers.parse_finviz(html, args.max_articles)),
+        ('google_news_search.html', lambda html: news_scrapers.parse_google_news(html, args.max_articles)),
+        ('yahoo_quote.html', lambda html: news_scrapers.parse_yahoo(html, args.max_articles)),
+        ('article.html', lambda html: news_scrapers.parse_article_content(html)),
+        # Feeds skip BeautifulSoup entirely; the row shows iterparse per feed
+        ('rss_feed.xml', lambda html: feed_parsing.parse_feed(html, args.max_articles)),
+    ]
+    configs = [
+        ('html.parser', 'html.parser', False),
+        ('lxml', 'lxml', False),
+        ('lxml+strainer', 'lxml', True),
+    ]
+
+    print(f"{'page':<26}" + "".join(f"{name:>16}" for name, _, _ in configs) + f"{'saved':>10}")
+    for filename, parse in pages:
+        with open(os.path.join(FIXTURES_DIR, filename), 'rb') as f:
+            html = f.read()
+
+        timings = []
+        outputs = []
+        for _, parser, strainers in configs:
+            html_parsing.HTML_PARSER = parser
+            html_parsing.USE_STRAINERS = strainers
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                result = parse(html)
+            timings.append((time.perf_counter() - start) / args.iterations * 1000)
+            outputs.append(result)
+
+        same = all(output == outputs[0] for output in outputs)
+        print(f"{filename:<26}" + "".join(f"{ms:>13.2f} ms" for ms in timings)
+              + f"{timings[0] - timings[-1]:>7.2f} ms" + ("" if same else "  (outputs differ!)"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentiment pipeline benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    scheduler = subparsers.add_parser("scheduler", help="FinBERT batch padding waste")
+    scheduler.add_argument("--texts", type=int, default=600)
+    scheduler.add_argument("--long-fraction", type=float, default=0.3)
+    scheduler.add_argument("--batch-size", type=int, default=32)
+    scheduler.add_argument("--max-tokens", type=int, default=4096)
+    scheduler.add_argument("--run-model", action="store_true", help="Also time forward passes")
+    scheduler.set_defaults(func=bench_scheduler)
+
+    parsing = subparsers.add_parser("parsing", help="HTML parse time per page over saved fixtures")
+    parsing.add_argument("--iterations", type=int, default=20)
+    parsing.add_argument("--max-articles", type=int, default=10)
+    parsing.set_defaults(func=bench_parsing)
+
+    backends = subparsers.add_parser("backends", help="FinBERT backend throughput and fp32 parity")
+    backends.add_argument("--backends", default="torch,torch-int8,onnx")
+    backends.add_argument("--texts", type=int, default=300)
+    backends.add_argument("--long-fraction", type=float, default=0.3)
+    backends.add_argument("--min-agreement", type=float, default=0.97,
+                          help="Exit with status 1 if a backend agrees with fp32 on fewer labels than this")
+    backends.set_defaults(func=bench_backends)
+
+    pool = subparsers.add_parser("pool", help="FinBERT process pool workers x threads sweep")
+    pool.add_argument("--workers", default="1,2,4")
+    pool.add_argument("--threads", default="1,2")
+    pool.add_argument("--texts", type=int, default=400)
+    pool.add_argument("--long-fraction", type=float, default=0.3)
+    pool.add_argument("--batch-size", type=int, default=16)
+    pool.add_argument("--baseline-threads", type=int, default=os.cpu_count() or 1)
+    pool.set_defaults(func=bench_pool)
+
+    vader = subparsers.add_parser("vader", help="Columnar VADER throughput and exactness")
+    vader.add_argument("--texts", type=int, default=100000)
+    vader.add_argument("--distinct", type=int, default=40000)
+    vader.add_argument("--processes", default="1,4")
+    vader.set_defaults(func=bench_vader)
+
+    long = subparsers.add_parser("long", help="FinBERT cost versus article length with windowed scoring")
+    long.add_argument("--lengths", default="128,256,512,1024,2048,4096", help="Article lengths in tokens")
+    long.add_argument("--articles", type=int, default=16, help="Articles per length")
+    long.add_argument("--max-windows", type=int, default=64, help="Window cap (FINBERT_MAX_WINDOWS)")
+    long.set_defaults(func=bench_long)
+
+    startup = subparsers.add_parser("startup", help="Cold import time (python -X importtime)")
+    startup.add_argument("--modules", default="sentiment_analyzer,pipeline")
+    startup.add_argument("--forbid", default="torch,transformers,vaderSentiment",
+                         help="Packages that must not be imported at startup")
+    startup.add_argument("--budget-ms", type=float, default=0, help="Fail if any module takes longer")
+    startup.add_argument("--runs", type=int, default=3, help="Report the best of N cold imports")
+    startup.add_argument("--top", type=int, default=5)
+    startup.set_defaults(func=bench_startup)
+
+    history = subparsers.add_parser("history", help="Sentiment history query latency")
+    history.add_argument("--rows", type=int, default=2000000, help="History rows (two models per article)")
+    history.add_argument("--tickers", type=int, default=2000)
+    history.add_argument("--days", type=int, default=365)
+    history.add_argument("--iterations", type=int, default=5)
+    history.set_defaults(func=bench_history)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
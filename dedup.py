@@ -0,0 +1,138 @@
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from sentiment_cache import normalize_text
+
+# 128 hash functions in 32 bands of 4 rows: a pair at 0.6 Jaccard
+# similarity shares a band with ~99% probability, one at 0.3 with ~23%.
+# Headlines with opposite wording ("rose ... raised" vs "plunged ... cut")
+# can reach ~0.5, so the match threshold stays above that
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.6
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_NON_WORD = re.compile(r'[^\w\s]')
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """
+    Character shingles of lowercased text with punctuation removed
+    Character shingles tolerate small rewordings of short headlines better
+    than word shingles
+    """
+    text = normalize_text(_NON_WORD.sub(' ', text.lower()))
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHasher:
+    """
+    MinHash signatures using universal hashing over crc32 shingle hashes
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # a * x + b stays below 2**63 for 32-bit x, so int64 never overflows
+        self.a = rng.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.int64)
+        self.b = rng.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.int64)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(text)), dtype=np.int64)
+        return ((np.outer(hashes, self.a) + self.b) % _MERSENNE_PRIME).min(axis=0)
+
+
+class NearDuplicateIndex:
+    """
+    Incremental near-duplicate clustering with MinHash + LSH banding
+    assign() maps each text to a cluster id, joining an existing cluster
+    when an LSH candidate's estimated Jaccard similarity reaches threshold.
+    Each text is compared only with its band-mates, so a run stays near
+    linear in the number of texts. Per-cluster results can be stored so a
+    cluster is scored once and the result reused for every member.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = NUM_PERM, bands: int = BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._buckets = {}      # (band, band bytes) -> cluster ids
+        self._signatures = []   # cluster id -> representative signature
+        self._texts = []        # cluster id -> representative text
+        self._members = []      # cluster id -> member count
+        self._assigned = {}     # exact text -> cluster id
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def _bands(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _assign_one(self, text: str) -> int:
+        cluster = self._assigned.get(text)
+        if cluster is not None:
+            self._members[cluster] += 1
+            return cluster
+
+        signature = self.hasher.signature(text)
+        best, best_similarity = None, self.threshold
+        candidates = set()
+        for key in self._bands(signature):
+            candidates.update(self._buckets.get(key, ()))
+        if candidates:
+            candidates = sorted(candidates)
+            similarities = (np.stack([self._signatures[c] for c in candidates]) == signature).mean(axis=1)
+            top = int(similarities.argmax())
+            if similarities[top] >= best_similarity:
+                best = candidates[top]
+
+        if best is None:
+            best = len(self._signatures)
+            self._signatures.append(signature)
+            self._texts.append(text)
+            self._members.append(0)
+            for key in self._bands(signature):
+                self._buckets.setdefault(key, []).append(best)
+
+        self._members[best] += 1
+        self._assigned[text] = best
+        return best
+
+    def assign(self, texts: List[str]) -> List[int]:
+        """
+        Cluster id per text; empty texts each get their own cluster
+        """
+        with self._lock:
+            return [self._assign_one(text) if text and text.strip() else self._new_singleton(text)
+                    for text in texts]
+
+    def _new_singleton(self, text: str) -> int:
+        cluster = len(self._signatures)
+        self._signatures.append(np.full(self.bands * self.rows, -1, dtype=np.int64))
+        self._texts.append(text)
+        self._members.append(1)
+        return cluster
+
+    def representative(self, cluster: int) -> str:
+        return self._texts[cluster]
+
+    def get_result(self, cluster: int) -> Optional[Dict]:
+        return self._results.get(cluster)
+
+    def set_result(self, cluster: int, result: Dict):
+        self._results[cluster] = result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            texts = sum(self._members)
+            clusters = len(self._members)
+        return {'texts': texts, 'clusters': clusters, 'duplicates': texts - clusters}
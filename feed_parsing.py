@@ -0,0 +1,135 @@
+import re
+from io import BytesIO
+from typing import Dict, List, Optional
+
+from lxml import etree
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+RSS_ITEM = 'item'
+ATOM_ENTRY = ATOM + 'entry'
+# Dublin Core date, used by some RSS feeds instead of pubDate
+DC_DATE = '{http://purl.org/dc/elements/1.1/}date'
+
+# Tickers that are also common words; like 1-2 letter tickers they only
+# count in headlines as $NOW, (NOW) or NYSE:NOW
+WORD_TICKERS = frozenset({
+    'ALL', 'ARE', 'BIG', 'CAN', 'CAR', 'CASH', 'EAT', 'FAST', 'FLY', 'FUN', 'GAIN', 'GOOD', 'HAS', 'KEY',
+    'LIFE', 'LOVE', 'LOW', 'MAIN', 'MOVE', 'NEXT', 'NICE', 'NOW', 'ONE', 'OPEN', 'OUT', 'PLAY', 'POST',
+    'REAL', 'RUN', 'SAVE', 'SEE', 'TRUE', 'WELL', 'WORK'
+})
+
+
+def _text(element, path: str) -> str:
+    value = element.findtext(path)
+    return value.strip() if value else ''
+
+
+def _atom_link(entry) -> str:
+    links = entry.findall(ATOM + 'link')
+    for link in links:
+        if link.get('rel', 'alternate') == 'alternate':
+            return link.get('href', '')
+    return links[0].get('href', '') if links else ''
+
+
+def _feed_item(element) -> Dict:
+    if element.tag == ATOM_ENTRY:
+        return {
+            'headline': _text(element, ATOM + 'title'),
+            'date': _text(element, ATOM + 'published') or _text(element, ATOM + 'updated'),
+            'url': _atom_link(element),
+            'categories': [category.get('term', '') for category in element.findall(ATOM + 'category')]
+        }
+
+    url = _text(element, 'link')
+    guid = element.find('guid')
+    if not url and guid is not None and guid.get('isPermaLink', 'true') == 'true':
+        url = (guid.text or '').strip()
+    return {
+        'headline': _text(element, 'title'),
+        'date': _text(element, 'pubDate') or _text(element, DC_DATE),
+        'url': url,
+        'categories': [(category.text or '').strip() for category in element.findall('category')]
+    }
+
+
+def parse_feed(data: bytes, max_articles: Optional[int] = 5) -> List[Dict]:
+    """
+    Parse news items from an RSS 2.0 or Atom feed
+    Entries are read one at a time with iterparse and cleared as soon as
+    they are read, so no document tree is kept, and parsing stops after
+    max_articles entries (None reads the whole feed). Feed categories are
+    kept on each item for assign_tickers
+    """
+    news_items = []
+    entries = etree.iterparse(BytesIO(data), events=('end',), tag=(RSS_ITEM, ATOM_ENTRY),
+                              resolve_entities=False, no_network=True, recover=True)
+
+    for _, element in entries:
+        item = _feed_item(element)
+        # Drop the entry and everything before it; only the feed root stays
+        element.clear(keep_tail=True)
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+        if len(item['headline']) < 10:
+            continue
+        news_items.append({
+            'source': 'Feed',
+            'headline': item['headline'],
+            'date': item['date'] or 'Recent',
+            'url': item['url'] if item['url'].startswith('http') else '',
+            'content': '',
+            'categories': [category for category in item['categories'] if category]
+        })
+        if max_articles is not None and len(news_items) >= max_articles:
+            break
+
+    return news_items
+
+
+def _symbols(tickers: List[str]) -> str:
+    return '|'.join(re.escape(ticker) for ticker in sorted(tickers, key=len, reverse=True))
+
+
+def headline_pattern(tickers: List[str]):
+    """
+    Regex finding tickers named in a headline: 'AAPL' or '$AAPL', but only
+    '$IT', '(IT)' or 'NYSE:IT' for tickers of 1-2 letters or in
+    WORD_TICKERS, which would otherwise match ordinary words
+    """
+    ambiguous = [ticker for ticker in tickers if len(ticker) <= 2 or ticker in WORD_TICKERS]
+    plain = [ticker for ticker in tickers if ticker not in ambiguous]
+
+    forms = []
+    if plain:
+        forms.append(r'(?<![\w$])\$?(' + _symbols(plain) + r')(?!\w)')
+    if ambiguous:
+        strict = _symbols(ambiguous)
+        forms.append(r'(?<![\w$])\$(' + strict + r')(?!\w)')
+        forms.append(r'\((' + strict + r')\)')
+        forms.append(r'\b[A-Z]+:\s?(' + strict + r')(?!\w)')
+    # No tickers: a pattern that never matches
+    return re.compile('|'.join(forms) or r'(?!)')
+
+
+def assign_tickers(news_items: List[Dict], tickers: List[str], max_articles: Optional[int] = None) -> List[Dict]:
+    """
+    Attribute the items of a feed requested for several tickers
+    An item belongs to every ticker named in its categories ('AAPL',
+    'NASDAQ:AAPL') or as a symbol in its headline (see headline_pattern);
+    items naming none of them are dropped. Returns one copy per (item,
+    ticker) with 'ticker' set, at most max_articles per ticker, in feed order
+    """
+    headline_symbols = headline_pattern(tickers)
+    counts = dict.fromkeys(tickers, 0)
+
+    assigned = []
+    for item in news_items:
+        named = {category.split(':')[-1].strip().lstrip('$').upper() for category in item.get('categories', [])}
+        named.update(match.group(match.lastindex) for match in headline_symbols.finditer(item['headline']))
+        for ticker in tickers:
+            if ticker in named and (max_articles is None or counts[ticker] < max_articles):
+                counts[ticker] += 1
+                assigned.append(dict(item, ticker=ticker))
+    return assigned
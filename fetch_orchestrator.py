@@ -0,0 +1,220 @@
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, ExitStack
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from scrape_cache import ScrapeCache, make_scrape_key
+from source_registry import get_source, host_limits
+
+# Per-host politeness for hosts no registered source declares:
+# (requests per second, burst size, max concurrent requests)
+FALLBACK_HOST_LIMIT = (2.0, 2, 2)
+
+# A source whose jobs fail this many times in a row (connection errors,
+# timeouts, 429 or 5xx) is skipped for the rest of a run
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+class SourceSkipped(Exception):
+    """
+    Reported for jobs of a source skipped after repeated failures
+    """
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket; acquire() blocks until a token is available
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HostLimiter:
+    """
+    Per-host rate limit (token bucket) plus concurrency cap (semaphore)
+    Without explicit limits, hosts use the limits their registered source
+    declares (see source_registry)
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, int, int]]] = None):
+        self.limits = dict(limits) if limits is not None else None
+        self._buckets = {}
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def host_limit(self, host: str) -> Tuple[float, int, int]:
+        limits = self.limits if self.limits is not None else host_limits()
+        return limits.get(host, FALLBACK_HOST_LIMIT)
+
+    def _get(self, host: str):
+        with self._lock:
+            if host not in self._buckets:
+                rate, burst, concurrency = self.host_limit(host)
+                self._buckets[host] = TokenBucket(rate, burst)
+                self._semaphores[host] = threading.BoundedSemaphore(concurrency)
+            return self._buckets[host], self._semaphores[host]
+
+    @contextmanager
+    def limit(self, host: str):
+        """
+        Hold one of the host's concurrency slots after taking a rate token
+        """
+        bucket, semaphore = self._get(host)
+        with semaphore:
+            bucket.acquire()
+            yield
+
+
+# Shared limiter so concurrent runs respect the same per-host budget
+host_limiter = HostLimiter()
+
+
+def source_host(source_name: str) -> str:
+    try:
+        return get_source(source_name).host
+    except KeyError:
+        return source_name
+
+
+def is_transport_failure(error: Exception) -> bool:
+    """
+    Whether an error says the source's host is struggling: connection
+    errors, timeouts, 429 and 5xx responses. A 404 for an unknown ticker or
+    a parse error says nothing about the host
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+
+    # aiohttp ClientResponseError carries .status, requests HTTPError a response
+    status = getattr(error, 'status', None)
+    if status is None and getattr(error, 'response', None) is not None:
+        status = getattr(error.response, 'status_code', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+
+    try:
+        import requests
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+    except ImportError:
+        pass
+    try:
+        import aiohttp
+        if isinstance(error, aiohttp.ClientConnectionError):
+            return True
+    except ImportError:
+        pass
+    return False
+
+
+def takes_limit(scraper_func: Callable) -> bool:
+    """
+    Whether a scraper accepts limit=, a context manager factory it holds
+    around its listing request only
+    """
+    try:
+        return 'limit' in inspect.signature(scraper_func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def run_scrape_jobs(jobs: List[Tuple[str, str, Callable]], max_articles: int = 5,
+                    max_workers: int = 8, limiter: Optional[HostLimiter] = None,
+                    cache: Optional[ScrapeCache] = None, ttl: float = 900,
+                    cache_variant: str = '',
+                    max_failures: int = MAX_CONSECUTIVE_FAILURES) -> Iterator[Tuple[str, str, List[Dict], Optional[Exception]]]:
+    """
+    Run (ticker, source_name, scraper_func) jobs, each source on its own lane
+    Every source gets its own thread pool of up to max_workers threads, so
+    jobs waiting on one source's rate limit or timeouts never hold threads
+    the other sources could use. The host limiter (rate and concurrency)
+    covers only the listing request of scrapers that accept limit= (see
+    news_scrapers.scrape_source), so article body downloads neither hold
+    the listing host's slots nor wait on them; other scrapers are limited
+    around the whole call. Yields (ticker, source_name, news_items, error)
+    as jobs complete across all lanes, so callers can process results while
+    other fetches are in flight. After max_failures consecutive transport
+    failures (see is_transport_failure) a source's remaining jobs are
+    reported with SourceSkipped instead of being run.
+    With a cache, fresh entries (younger than ttl seconds) skip the network
+    and concurrent identical jobs share one fetch; cache_variant separates
+    entries of scrapers called with non-default options.
+    """
+    limiter = limiter or host_limiter
+
+    lanes = {}
+    for job in jobs:
+        lanes.setdefault(job[1], []).append(job)
+    failures = {source_name: 0 for source_name in lanes}
+    failures_lock = threading.Lock()
+
+    def run_job(ticker: str, source_name: str, scraper_func: Callable) -> List[Dict]:
+        host = source_host(source_name)
+
+        @contextmanager
+        def listing_slot():
+            # Checked once a slot is free, so queued jobs see failures of the ones before
+            with limiter.limit(host):
+                with failures_lock:
+                    if failures[source_name] >= max_failures:
+                        raise SourceSkipped(f"{source_name} skipped after {max_failures} consecutive failures")
+                yield
+
+        def fetch() -> List[Dict]:
+            if takes_limit(scraper_func):
+                return scraper_func(ticker, max_articles=max_articles, limit=listing_slot)
+            with listing_slot():
+                return scraper_func(ticker, max_articles=max_articles)
+
+        try:
+            if cache is None:
+                news_items = fetch()
+            else:
+                news_items = cache.get_or_fetch(make_scrape_key(ticker, source_name, max_articles, cache_variant),
+                                                fetch, ttl)
+        except SourceSkipped:
+            raise
+        except Exception as e:
+            with failures_lock:
+                failures[source_name] = failures[source_name] + 1 if is_transport_failure(e) else 0
+            raise
+        with failures_lock:
+            failures[source_name] = 0
+        return news_items
+
+    if not jobs:
+        return
+
+    with ExitStack() as stack:
+        futures = {}
+        for source_name, lane_jobs in lanes.items():
+            workers = max(1, min(max_workers, len(lane_jobs)))
+            executor = stack.enter_context(ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"scrape-{source_name}"))
+            for ticker, _, scraper_func in lane_jobs:
+                futures[executor.submit(run_job, ticker, source_name, scraper_func)] = (ticker, source_name)
+
+        for future in as_completed(futures):
+            ticker, source_name = futures[future]
+            try:
+                yield ticker, source_name, future.result(), None
+            except Exception as e:
+                yield ticker, source_name, [], e
@@ -0,0 +1,166 @@
+import os
+from typing import Dict, Tuple
+
+import numpy as np
+
+# torch, transformers and onnxruntime are imported on first use so that
+# importing this module (and sentiment_analyzer) stays cheap
+
+# Supported inference backends
+BACKENDS = ('torch', 'torch-int8', 'onnx')
+
+# Where downloaded weights and exported graphs are kept so later loads work offline
+DEFAULT_ARTIFACT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'stock-sentiment')
+
+# ONNX graph inputs, in BertForSequenceClassification.forward order
+ONNX_INPUT_NAMES = ['input_ids', 'attention_mask', 'token_type_ids']
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def model_dir(model_id: str, artifact_dir: str) -> str:
+    return os.path.join(artifact_dir, model_id.replace('/', '--'))
+
+
+def load_tokenizer(model_id: str, artifact_dir: str):
+    """
+    Load just the tokenizer, preferring the local artifact copy
+    """
+    from transformers import AutoTokenizer
+
+    local_dir = model_dir(model_id, artifact_dir)
+    if os.path.exists(os.path.join(local_dir, 'tokenizer_config.json')):
+        return AutoTokenizer.from_pretrained(local_dir, local_files_only=True)
+    return AutoTokenizer.from_pretrained(model_id)
+
+
+def load_pretrained(model_id: str, artifact_dir: str):
+    """
+    Load tokenizer and fp32 model, preferring the local artifact copy
+    The first load downloads from the Hub and saves a copy; after that no
+    network access is needed
+    """
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    local_dir = model_dir(model_id, artifact_dir)
+    if os.path.exists(os.path.join(local_dir, 'config.json')):
+        tokenizer = AutoTokenizer.from_pretrained(local_dir, local_files_only=True)
+        model = AutoModelForSequenceClassification.from_pretrained(local_dir, local_files_only=True)
+    else:
+        tokenizer = AutoTokenizer.from_pretrained(model_id)
+        model = AutoModelForSequenceClassification.from_pretrained(model_id)
+        os.makedirs(local_dir, exist_ok=True)
+        tokenizer.save_pretrained(local_dir)
+        model.save_pretrained(local_dir)
+
+    model.eval()
+    return tokenizer, model
+
+
+class TorchBackend:
+    """
+    PyTorch fp32 inference (the original behaviour)
+    """
+    name = 'torch'
+    return_tensors = 'pt'
+
+    def __init__(self, model):
+        self.model = model.eval()
+
+    def predict_proba(self, inputs: Dict) -> np.ndarray:
+        """
+        Class probabilities (batch, 3) for tokenized inputs
+        """
+        import torch
+
+        with torch.no_grad():
+            logits = self.model(**inputs).logits
+            return torch.nn.functional.softmax(logits, dim=-1).numpy()
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """
+    PyTorch with dynamic int8 quantization of all Linear layers
+    """
+    name = 'torch-int8'
+
+    def __init__(self, model):
+        import torch
+
+        quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        super().__init__(quantized)
+
+
+class OnnxBackend:
+    """
+    Exported ONNX graph run through ONNX Runtime on CPU
+    """
+    name = 'onnx'
+    return_tensors = 'np'
+
+    def __init__(self, onnx_path: str, intra_op_threads: int = 0):
+        import onnxruntime as ort
+
+        self.onnx_path = onnx_path
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = [graph_input.name for graph_input in self.session.get_inputs()]
+
+    def predict_proba(self, inputs: Dict) -> np.ndarray:
+        feed = {name: np.asarray(inputs[name], dtype=np.int64) for name in self.input_names}
+        logits = self.session.run(['logits'], feed)[0]
+        return _softmax(logits)
+
+
+def export_onnx(model, tokenizer, onnx_path: str):
+    """
+    Export the classifier to ONNX with dynamic batch and sequence axes
+    """
+    import torch
+
+    sample = tokenizer(["Shares rose after earnings.", "Guidance was cut."], padding=True, return_tensors='pt')
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in ONNX_INPUT_NAMES}
+    dynamic_axes['logits'] = {0: 'batch'}
+
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+    torch.onnx.export(
+        model,
+        tuple(sample[name] for name in ONNX_INPUT_NAMES),
+        onnx_path,
+        input_names=ONNX_INPUT_NAMES,
+        output_names=['logits'],
+        dynamic_axes=dynamic_axes,
+        opset_version=17,
+        dynamo=False
+    )
+
+
+def load_backend(name: str, model_id: str, artifact_dir: str = DEFAULT_ARTIFACT_DIR) -> Tuple[object, object]:
+    """
+    Build (tokenizer, backend) for a backend name from BACKENDS
+    With an exported ONNX graph on disk the onnx backend loads only the
+    tokenizer and the graph; the torch model is loaded just to export it
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown FinBERT backend '{name}', expected one of {BACKENDS}")
+
+    onnx_path = os.path.join(model_dir(model_id, artifact_dir), 'model.onnx')
+    if name == 'onnx' and os.path.exists(onnx_path):
+        return load_tokenizer(model_id, artifact_dir), OnnxBackend(onnx_path)
+
+    tokenizer, model = load_pretrained(model_id, artifact_dir)
+
+    if name == 'torch':
+        return tokenizer, TorchBackend(model)
+    if name == 'torch-int8':
+        return tokenizer, QuantizedTorchBackend(model)
+
+    export_onnx(model, tokenizer, onnx_path)
+    del model
+    return tokenizer, OnnxBackend(onnx_path)
@@ -0,0 +1,241 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from finbert_backends import DEFAULT_ARTIFACT_DIR
+from utils import calculate_sentiment_ratio
+from watermark_store import item_key
+
+MODELS = ('vader', 'finbert')
+LABEL_CODES = {'positive': 0, 'negative': 1, 'neutral': 2}
+SECONDS_PER_DAY = 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentiment_history (
+    ticker TEXT NOT NULL,
+    article_key TEXT NOT NULL,
+    model TEXT NOT NULL,
+    ts REAL NOT NULL,
+    day INTEGER NOT NULL,
+    source TEXT,
+    label INTEGER NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (ticker, article_key, model)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_history_ticker_time ON sentiment_history (ticker, model, ts);
+
+-- Daily rollup kept in step with the article table, so range and rolling
+-- queries read one row per (ticker, model, day) instead of every article
+CREATE TABLE IF NOT EXISTS daily_sentiment (
+    ticker TEXT NOT NULL,
+    model TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    positive INTEGER NOT NULL DEFAULT 0,
+    negative INTEGER NOT NULL DEFAULT 0,
+    neutral INTEGER NOT NULL DEFAULT 0,
+    score_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (ticker, model, day)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_daily_model_day ON daily_sentiment (model, day);
+
+CREATE TRIGGER IF NOT EXISTS trg_history_rollup AFTER INSERT ON sentiment_history
+BEGIN
+    INSERT INTO daily_sentiment (ticker, model, day, positive, negative, neutral, score_sum)
+    VALUES (NEW.ticker, NEW.model, NEW.day, NEW.label = 0, NEW.label = 1, NEW.label = 2, NEW.score)
+    ON CONFLICT (ticker, model, day) DO UPDATE SET
+        positive = positive + excluded.positive,
+        negative = negative + excluded.negative,
+        neutral = neutral + excluded.neutral,
+        score_sum = score_sum + excluded.score_sum;
+END;
+"""
+
+
+def _day(ts: float) -> int:
+    return int(ts // SECONDS_PER_DAY)
+
+
+class HistoryStore:
+    """
+    Append-only sentiment history in SQLite
+    One row per (ticker, article, model), stamped with the article's publish
+    time, or the time it was first scored when that is unknown; re-scraped
+    articles are ignored. A trigger maintains
+    per-day counts, so daily, rolling and top-mover queries stay fast over
+    millions of articles. Days are UTC.
+    """
+
+    def __init__(self, db_path: str = ':memory:'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def append(self, results: pd.DataFrame, ts: Optional[float] = None) -> int:
+        """
+        Record a results frame (see results_frame); returns rows added
+        Articles are bucketed by their 'published' time; ts (default: now)
+        stands in for missing or future publish times
+        """
+        if results is None or not len(results):
+            return 0
+
+        ts = time.time() if ts is None else ts
+        rows = []
+        for item in results.to_dict('records'):
+            key = item_key(item)
+            published = item.get('published')
+            item_ts = published if pd.notna(published) and published <= ts else ts
+            for model in MODELS:
+                rows.append((
+                    item['ticker'], key, model, item_ts, _day(item_ts), item['source'],
+                    LABEL_CODES.get(item[f'{model}_sentiment'], 2), float(item[f'{model}_score'])
+                ))
+        return self.append_rows(rows)
+
+    def append_rows(self, rows: List[tuple]) -> int:
+        """
+        Insert raw (ticker, article_key, model, ts, day, source, label, score) rows
+        """
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO sentiment_history "
+                "(ticker, article_key, model, ts, day, source, label, score) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._db.commit()
+            # total_changes also counts the trigger's rollup writes, one per inserted row
+            return (self._db.total_changes - before) // 2
+
+    def _query(self, sql: str, params: tuple) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query(sql, self._db, params=params)
+
+    def tickers(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT DISTINCT ticker FROM daily_sentiment ORDER BY ticker")]
+
+    def daily(self, tickers: Optional[List[str]] = None, model: str = 'finbert',
+              start: Optional[float] = None, end: Optional[float] = None) -> pd.DataFrame:
+        """
+        Per-ticker daily counts, P/N ratio, net sentiment and mean score
+        between start and end (epoch seconds, inclusive days)
+        """
+        sql = ("SELECT ticker, day, positive, negative, neutral, score_sum FROM daily_sentiment "
+               "WHERE model = ? AND day BETWEEN ? AND ?")
+        params = [model, _day(start) if start is not None else 0, _day(end) if end is not None else 2 ** 31]
+        if tickers:
+            sql += f" AND ticker IN ({', '.join('?' * len(tickers))})"
+            params.extend(tickers)
+        sql += " ORDER BY ticker, day"
+
+        daily = self._query(sql, tuple(params))
+        total = daily['positive'] + daily['negative'] + daily['neutral']
+        daily['total'] = total
+        daily['ratio'] = calculate_sentiment_ratio(daily['positive'].to_numpy(), daily['negative'].to_numpy())
+        daily['net'] = (daily['positive'] - daily['negative']) / total.where(total > 0, 1)
+        daily['mean_score'] = daily['score_sum'] / total.where(total > 0, 1)
+        daily['date'] = pd.to_datetime(daily['day'], unit='D')
+        return daily.drop(columns='score_sum')
+
+    def rolling(self, tickers: Optional[List[str]] = None, model: str = 'finbert', window_days: int = 7,
+                start: Optional[float] = None, end: Optional[float] = None) -> pd.DataFrame:
+        """
+        Rolling window_days sums per ticker: counts, P/N ratio and net sentiment
+        Days without articles count as empty days inside the window
+        """
+        lead = (window_days - 1) * SECONDS_PER_DAY
+        daily = self.daily(tickers, model, start - lead if start is not None else None, end)
+        if daily.empty:
+            return daily
+
+        frames = []
+        for ticker, group in daily.groupby('ticker', sort=False):
+            counts = group.set_index('day')[['positive', 'negative', 'neutral']]
+            counts = counts.reindex(range(counts.index.min(), counts.index.max() + 1), fill_value=0)
+            window = counts.rolling(window_days, min_periods=1).sum().astype(np.int64)
+            window['ticker'] = ticker
+            frames.append(window.reset_index().rename(columns={'index': 'day'}))
+
+        rolled = pd.concat(frames, ignore_index=True)
+        if start is not None:
+            rolled = rolled[rolled['day'] >= _day(start)]
+        total = rolled['positive'] + rolled['negative'] + rolled['neutral']
+        rolled['total'] = total
+        rolled['ratio'] = calculate_sentiment_ratio(rolled['positive'].to_numpy(), rolled['negative'].to_numpy())
+        rolled['net'] = (rolled['positive'] - rolled['negative']) / total.where(total > 0, 1)
+        rolled['date'] = pd.to_datetime(rolled['day'], unit='D')
+        return rolled.reset_index(drop=True)
+
+    def top_movers(self, model: str = 'finbert', window_days: int = 7, as_of: Optional[float] = None,
+                   limit: int = 10, min_articles: int = 3) -> pd.DataFrame:
+        """
+        Tickers whose net sentiment changed most between the last window_days
+        and the window before it
+        """
+        end_day = _day(time.time() if as_of is None else as_of)
+        split_day = end_day - window_days + 1
+        start_day = split_day - window_days
+
+        movers = self._query(
+            "SELECT ticker, "
+            "SUM(CASE WHEN day >= :split THEN positive - negative ELSE 0 END) AS recent_net, "
+            "SUM(CASE WHEN day >= :split THEN positive + negative + neutral ELSE 0 END) AS recent_total, "
+            "SUM(CASE WHEN day < :split THEN positive - negative ELSE 0 END) AS prior_net, "
+            "SUM(CASE WHEN day < :split THEN positive + negative + neutral ELSE 0 END) AS prior_total "
+            "FROM daily_sentiment WHERE model = :model AND day BETWEEN :start AND :end GROUP BY ticker",
+            {'split': split_day, 'model': model, 'start': start_day, 'end': end_day}
+        )
+        movers = movers[(movers['recent_total'] >= min_articles) & (movers['prior_total'] >= min_articles)].copy()
+        movers['recent'] = movers['recent_net'] / movers['recent_total']
+        movers['prior'] = movers['prior_net'] / movers['prior_total']
+        movers['change'] = movers['recent'] - movers['prior']
+        movers = movers.reindex(movers['change'].abs().sort_values(ascending=False).index)
+        return movers[['ticker', 'recent', 'prior', 'change', 'recent_total', 'prior_total']].head(limit).reset_index(drop=True)
+
+    def has_history(self) -> bool:
+        with self._lock:
+            return bool(self._db.execute("SELECT EXISTS (SELECT 1 FROM daily_sentiment)").fetchone()[0])
+
+    def stats(self) -> Dict:
+        """
+        Article and daily row counts, both read from the daily rollup
+        """
+        with self._lock:
+            rows, days = self._db.execute(
+                "SELECT COALESCE(SUM(positive + negative + neutral), 0), COUNT(*) FROM daily_sentiment"
+            ).fetchone()
+        return {'rows': rows, 'daily_rows': days}
+
+
+_history_store = None
+_history_lock = threading.Lock()
+
+
+def get_history_store() -> HistoryStore:
+    """
+    Process-wide history store at SENTIMENT_HISTORY_DB
+    (default: history.db under the FinBERT artifact directory)
+    """
+    global _history_store
+
+    with _history_lock:
+        if _history_store is None:
+            db_path = os.environ.get('SENTIMENT_HISTORY_DB')
+            if not db_path:
+                artifact_dir = os.environ.get('FINBERT_ARTIFACT_DIR', DEFAULT_ARTIFACT_DIR)
+                os.makedirs(artifact_dir, exist_ok=True)
+                db_path = os.path.join(artifact_dir, 'history.db')
+            _history_store = HistoryStore(db_path)
+        return _history_store
@@ -0,0 +1,25 @@
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Prefer the C-based lxml parser; fall back to the stdlib parser if missing
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Parse only the subtree a scraper reads; set to False to build full trees
+USE_STRAINERS = True
+
+# Subtrees needed by each scraper
+FINVIZ_NEWS_TABLE = SoupStrainer('table', attrs={'id': 'news-table'})
+GOOGLE_NEWS_ARTICLES = SoupStrainer('article')
+
+
+def make_soup(html, parse_only: SoupStrainer = None) -> BeautifulSoup:
+    """
+    Build a BeautifulSoup tree with the configured parser
+    parse_only restricts the tree to matching elements (and their children)
+    """
+    if parse_only is not None and USE_STRAINERS:
+        return BeautifulSoup(html, HTML_PARSER, parse_only=parse_only)
+    return BeautifulSoup(html, HTML_PARSER)
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# User agent to avoid blocking
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Session defaults; override with configure_session()
+SESSION_CONFIG = {
+    'retries': 2,
+    'backoff_factor': 0.3,
+    'status_forcelist': (429, 500, 502, 503, 504),
+    'pool_connections': 32,   # number of hosts kept in the pool manager
+    'pool_maxsize': 8,        # keep-alive connections per host
+    'store_entries': 1000,
+    'store_bytes': 32 * 1024 * 1024,
+    'store_dir': os.environ.get('HTTP_CACHE_DIR'),
+}
+
+
+class ResponseStore:
+    """
+    Validator store for conditional GETs
+    Keeps ETag/Last-Modified plus the body of the last 200 response per URL
+    in an LRU bounded by entry count and body bytes, optionally mirrored to
+    a directory on disk. Bodies larger than max_bytes are not kept
+    """
+
+    def __init__(self, max_entries: int = 1000, store_dir: Optional[str] = None,
+                 max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.store_dir = store_dir
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.store_dir, hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+                return entry
+
+        if self.store_dir and os.path.exists(self._path(url) + '.json'):
+            try:
+                with open(self._path(url) + '.json') as f:
+                    entry = json.load(f)
+                with open(self._path(url) + '.body', 'rb') as f:
+                    entry['content'] = f.read()
+                self._remember(url, entry)
+                return entry
+            except (OSError, ValueError):
+                return None
+
+        return None
+
+    def put(self, url: str, response: requests.Response):
+        """
+        Remember a 200 response if it carries a validator
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if (not etag and not last_modified) or len(response.content) > self.max_bytes:
+            return
+
+        entry = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': dict(response.headers),
+            'encoding': response.encoding,
+            'content': response.content,
+        }
+        self._remember(url, entry)
+
+        if self.store_dir:
+            try:
+                with open(self._path(url) + '.body', 'wb') as f:
+                    f.write(response.content)
+                with open(self._path(url) + '.json', 'w') as f:
+                    json.dump({k: v for k, v in entry.items() if k != 'content'}, f)
+            except OSError:
+                pass
+
+    def _remember(self, url: str, entry: Dict):
+        with self._lock:
+            if url in self._entries:
+                self._bytes -= len(self._entries[url]['content'])
+            self._entries[url] = entry
+            self._entries.move_to_end(url)
+            self._bytes += len(entry['content'])
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted['content'])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_session = None
+_store = None
+_lock = threading.Lock()
+
+
+def configure_session(**options):
+    """
+    Update session settings; the shared session is rebuilt on next use
+    """
+    global _session, _store
+    with _lock:
+        SESSION_CONFIG.update(options)
+        if _session is not None:
+            _session.close()
+        _session = None
+        _store = None
+
+
+def get_session() -> requests.Session:
+    """
+    Return the shared keep-alive session, creating it on first use
+    """
+    global _session, _store
+    with _lock:
+        if _session is None:
+            retry = Retry(
+                total=SESSION_CONFIG['retries'],
+                backoff_factor=SESSION_CONFIG['backoff_factor'],
+                status_forcelist=SESSION_CONFIG['status_forcelist'],
+                allowed_methods=frozenset(['GET', 'HEAD']),
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(
+                pool_connections=SESSION_CONFIG['pool_connections'],
+                pool_maxsize=SESSION_CONFIG['pool_maxsize'],
+                max_retries=retry
+            )
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+            _store = ResponseStore(SESSION_CONFIG['store_entries'], SESSION_CONFIG['store_dir'],
+                                   SESSION_CONFIG['store_bytes'])
+        return _session
+
+
+def get_response_store() -> ResponseStore:
+    get_session()
+    return _store
+
+
+def read_body(response: requests.Response, max_bytes: Optional[int] = None,
+              deadline: Optional[float] = None, chunk_size: int = 16384) -> bytes:
+    """
+    Read a streamed response body, cut at max_bytes
+    Raises TimeoutError once reading has taken more than deadline seconds
+    in total; the per-read timeout alone lets a server that trickles bytes
+    hold the connection indefinitely. The response is closed either way
+    """
+    started = time.monotonic()
+    chunks = []
+    size = 0
+    try:
+        for chunk in response.iter_content(chunk_size):
+            chunks.append(chunk)
+            size += len(chunk)
+            if max_bytes is not None and size >= max_bytes:
+                break
+            if deadline is not None and time.monotonic() - started > deadline:
+                raise TimeoutError(f"body of {response.url} not read within {deadline}s")
+    finally:
+        response.close()
+    body = b''.join(chunks)
+    return body[:max_bytes] if max_bytes is not None else body
+
+
+def http_get(url: str, timeout: float = 10, conditional: bool = True,
+             max_bytes: Optional[int] = None, deadline: Optional[float] = None, **kwargs) -> requests.Response:
+    """
+    GET through the shared session
+    With conditional=True, stored ETag/Last-Modified validators are sent and
+    a 304 is turned into a 200 response rebuilt from the stored body
+    (marked with response.from_store = True). With max_bytes or deadline
+    the body is streamed through read_body; response.truncated tells
+    whether it was cut, and truncated bodies are never stored
+    """
+    session = get_session()
+    store = get_response_store()
+
+    headers = dict(kwargs.pop('headers', None) or {})
+    entry = store.get(url) if conditional else None
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    bounded = max_bytes is not None or deadline is not None
+    response = session.get(url, headers=headers, timeout=timeout, stream=bounded, **kwargs)
+    response.from_store = False
+    response.truncated = False
+    if bounded:
+        response._content = read_body(response, max_bytes, deadline)
+        response.truncated = max_bytes is not None and len(response._content) >= max_bytes
+
+    if response.status_code == 304 and entry:
+        cached = requests.Response()
+        cached.status_code = 200
+        cached.url = response.url
+        cached.headers.update(entry['headers'])
+        cached.encoding = entry.get('encoding')
+        cached._content = entry['content']
+        cached.request = response.request
+        cached.from_store = True
+        cached.truncated = False
+        return cached
+
+    if conditional and response.status_code == 200 and not response.truncated:
+        store.put(url, response)
+
+    return response
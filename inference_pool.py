@@ -0,0 +1,100 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import sentiment_analyzer
+
+
+def _init_worker(threads: int):
+    """
+    Pin the worker's intra-op thread count
+    With the fork start method the model loaded by the parent is inherited
+    copy-on-write, so workers do not load (or duplicate) the weights
+    """
+    import torch
+
+    torch.set_num_threads(threads)
+    sentiment_analyzer.load_finbert()
+
+    backend = sentiment_analyzer.finbert_backend
+    if getattr(backend, 'name', None) == 'onnx':
+        # ONNX Runtime sessions are not fork-safe; rebuild with the pinned thread count
+        from finbert_backends import OnnxBackend
+        sentiment_analyzer.finbert_backend = OnnxBackend(backend.onnx_path, intra_op_threads=threads)
+
+
+def _score_shard(texts: List[str], features: List[Dict]) -> List[Dict]:
+    # Tokenized by the parent; one padded forward pass per shard
+    return sentiment_analyzer._score_finbert_batch(texts, features)
+
+
+class FinbertProcessPool:
+    """
+    Pool of FinBERT worker processes
+    The parent loads the model before the workers fork, so the weights are
+    shared copy-on-write rather than copied into every process. Texts are
+    tokenized once in the parent, grouped into length-bucketed batches and
+    the batches are spread across workers, each scored in one forward pass.
+    """
+
+    def __init__(self, workers: int = 2, threads_per_worker: int = 1):
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+
+        # Load in the parent first so forked workers inherit the weights
+        sentiment_analyzer.load_finbert()
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(threads_per_worker,)
+        )
+
+    def score(self, texts: List[str], batch_size: int = 32, max_tokens: int = 4096) -> List[Dict]:
+        """
+        Score non-empty texts across the worker processes, in input order
+        """
+        if not texts:
+            return []
+
+        shards = sentiment_analyzer.tokenize_batches(texts, batch_size=batch_size, max_tokens=max_tokens)
+
+        results = [None] * len(texts)
+        futures = [self._executor.submit(_score_shard, shard_texts, features) for _, shard_texts, features in shards]
+        for (shard, _, _), future in zip(shards, futures):
+            for i, result in zip(shard, future.result()):
+                results[i] = result
+        return results
+
+    def pids(self) -> List[int]:
+        return list(self._executor._processes.keys())
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_finbert_pool(workers: Optional[int] = None, threads_per_worker: Optional[int] = None) -> FinbertProcessPool:
+    """
+    Return the shared pool, creating it on first use
+    Defaults come from FINBERT_PROCESSES and FINBERT_THREADS_PER_PROCESS
+    """
+    global _pool
+
+    if _pool is None:
+        # Racing callers would each fork a set of model processes
+        with _pool_lock:
+            if _pool is None:
+                _pool = FinbertProcessPool(
+                    workers=workers or int(os.environ.get('FINBERT_PROCESSES', 2)),
+                    threads_per_worker=threads_per_worker or int(os.environ.get('FINBERT_THREADS_PER_PROCESS', 1))
+                )
+    return _pool
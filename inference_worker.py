@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+
+class InferenceWorker:
+    """
+    Long-lived micro-batching inference service on a background thread
+    Requests are queued and gathered into batches of up to max_batch_size
+    texts, waiting at most max_wait seconds after the first request of a
+    batch for more to arrive. Each request gets its own Future, so callers
+    from different sessions share forward passes.
+    """
+
+    def __init__(self, score_batch: Callable[[List[str]], List[Dict]],
+                 max_batch_size: int = 16, max_wait: float = 0.010, latency_window: int = 10000):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self.batches = 0
+        self.items = 0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="finbert-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Stop the worker thread; requests it has not picked up fail with
+        RuntimeError instead of leaving their callers waiting
+        """
+        with self._lock:
+            self._stopping.set()
+            self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request[1].set_exception(RuntimeError("worker stopped"))
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue one text; the Future resolves to its result dict, or fails
+        with RuntimeError once the worker is stopping
+        """
+        future = Future()
+        with self._lock:
+            if self._stopping.is_set():
+                future.set_exception(RuntimeError("worker stopped"))
+            else:
+                self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def score(self, texts: List[str]) -> List[Dict]:
+        """
+        Submit texts and wait for all of them
+        """
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def _collect(self) -> List:
+        """
+        Block for the first request, then gather more until the batch is
+        full or max_wait has passed
+        """
+        first = self._queue.get()
+        if first is None:
+            return []
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._stopping.set()
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            texts = [text for text, _, _ in batch]
+            try:
+                results = self.score_batch(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            with self._lock:
+                self.batches += 1
+                self.items += len(batch)
+                for (_, future, submitted), result in zip(batch, results):
+                    self._latencies.append(now - submitted)
+                    future.set_result(result)
+
+    def stats(self) -> Dict:
+        """
+        Queue depth, mean batch fill ratio and p50/p99 latency (ms)
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            batches = self.batches
+            items = self.items
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+        return {
+            'queue_depth': self._queue.qsize(),
+            'batches': batches,
+            'items': items,
+            'fill_ratio': items / (batches * self.max_batch_size) if batches else 0.0,
+            'p50_ms': percentile(0.50),
+            'p99_ms': percentile(0.99)
+        }
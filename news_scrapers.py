@@ -1,296 +1,404 @@
-import requests
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import nullcontext
 from datetime import datetime
-import time
-from typing import List, Dict
+from typing import Callable, Container, ContextManager, List, Dict, Optional
+from urllib.parse import urlparse
+from urllib.request import url2pathname
 import re
 
-# User agent to avoid blocking
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-}
+# Pooled keep-alive session with retries and conditional GETs
+from http_session import HEADERS, http_get
+from feed_parsing import assign_tickers
+from html_parsing import make_soup, FINVIZ_NEWS_TABLE, GOOGLE_NEWS_ARTICLES
+from source_registry import NewsSource, get_source
+from watermark_store import select_new
 
-def scrape_finviz(ticker: str, max_articles: int = 5) -> List[Dict]:
+# Article bodies are fetched on a shared bounded pool; bodies still missing
+# after the deadline (seconds) degrade to headline-only
+BODY_FETCH_WORKERS = 16
+BODY_FETCH_DEADLINE = 8.0
+body_executor = ThreadPoolExecutor(max_workers=BODY_FETCH_WORKERS, thread_name_prefix="article-body")
+
+# Article body characters kept by default; long-document runs ask for more
+ARTICLE_MAX_CHARS = 1000
+
+# Article pages are read up to this many bytes, and for no longer than the
+# body deadline, so one oversized or trickling page cannot hold a pool thread
+ARTICLE_MAX_BYTES = 2 * 1024 * 1024
+
+
+def read_file_url(url: str) -> bytes:
     """
-    Scrape news from Finviz.com
+    Contents of a file:// URL, so sources can point at local feed files
     """
-    news_items = []
+    with open(url2pathname(urlparse(url).path), 'rb') as f:
+        return f.read()
+
+
+def parse_listing(source: NewsSource, page: bytes, ticker: str, max_articles: int,
+                  known: Optional[Container[str]] = None, since: Optional[float] = None) -> List[Dict]:
+    """
+    New news items of a fetched listing page or feed, stamped with the source
+    ticker may be a comma list for sources with tickers_per_request > 1;
+    items then carry the 'ticker' they were attributed to
+    """
+    tickers = ticker.split(',')
+    if len(tickers) > 1:
+        news_items = assign_tickers(source.parse(page, None), tickers, max_articles)
+    else:
+        news_items = source.parse(page, max_articles)
+    news_items = select_new(news_items, known, since, stop_at_known=source.newest_first)
+    # Parsers may be shared between sources; items carry the registered name
+    for item in news_items:
+        item['source'] = source.name
+    return news_items
+
+
+def scrape_source(source: NewsSource, ticker: str, max_articles: int = 5,
+                  body_deadline: float = BODY_FETCH_DEADLINE,
+                  known: Optional[Container[str]] = None, since: Optional[float] = None,
+                  content_length: int = ARTICLE_MAX_CHARS,
+                  limit: Optional[Callable[[], ContextManager]] = None) -> List[Dict]:
+    """
+    Scrape one registered source (see source_registry) for a ticker
+    Errors fetching or parsing the listing page are raised so the caller
+    can report them; bodies that fail to arrive degrade to headline-only.
+    With known item keys (see watermark_store), only items not seen before
+    are returned and have their bodies fetched. limit() (e.g. a host
+    limiter slot) is held around the listing request only, not the bodies
+    """
+    url = source.page_url(ticker)
+    with limit() if limit is not None else nullcontext():
+        if url.startswith('file://'):
+            page = read_file_url(url)
+        else:
+            response = http_get(url, timeout=source.timeout)
+            response.raise_for_status()
+            page = response.content
     
-    try:
-        url = f"https://finviz.com/quote.ashx?t={ticker}"
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        news_table = soup.find('table', {'id': 'news-table'})
-        
-        if news_table:
-            rows = news_table.find_all('tr')[:max_articles]
-            
-            for row in rows:
-                try:
-                    # Get date/time
-                    date_cell = row.find('td', {'align': 'right'})
-                    date_text = date_cell.text.strip() if date_cell else 'N/A'
-                    
-                    # Get headline and link
-                    link_cell = row.find('a', {'class': 'tab-link-news'})
-                    if link_cell:
-                        headline = link_cell.text.strip()
-                        url = link_cell.get('href', '')
-                        
-                        # Try to fetch article content if URL is available
-                        content = fetch_article_content(url) if url else ''
-                        
-                        news_items.append({
-                            'source': 'Finviz',
-                            'headline': headline,
-                            'date': date_text,
-                            'url': url,
-                            'content': content
-                        })
-                except Exception as e:
-                    continue
-        
-        time.sleep(0.5)  # Be respectful to the server
-        
-    except Exception as e:
-        print(f"Error scraping Finviz for {ticker}: {str(e)}")
+    news_items = parse_listing(source, page, ticker, max_articles, known, since)
+    
+    # Fetch article bodies concurrently once all headlines are parsed
+    if source.needs_bodies:
+        attach_article_contents(news_items, deadline=body_deadline, max_length=content_length)
     
     return news_items
 
 
-def scrape_yahoo(ticker: str, max_articles: int = 5) -> List[Dict]:
+def _scrape_or_report(source_name: str, ticker: str, **kwargs) -> List[Dict]:
+    """
+    scrape_source that prints errors and returns no items instead of raising
+    """
+    try:
+        return scrape_source(get_source(source_name), ticker, **kwargs)
+    except Exception as e:
+        print(f"Error scraping {source_name} for {ticker}: {str(e)}")
+        return []
+
+
+def scrape_finviz(ticker: str, max_articles: int = 5, body_deadline: float = BODY_FETCH_DEADLINE,
+                  known: Optional[Container[str]] = None, since: Optional[float] = None,
+                  content_length: int = ARTICLE_MAX_CHARS) -> List[Dict]:
+    """
+    Scrape news from Finviz.com
+    With known item keys (see watermark_store), only items newer than the
+    first known one are returned and have their bodies fetched
+    """
+    return _scrape_or_report("Finviz", ticker, max_articles=max_articles, body_deadline=body_deadline,
+                             known=known, since=since, content_length=content_length)
+
+
+def scrape_yahoo(ticker: str, max_articles: int = 5, body_deadline: float = BODY_FETCH_DEADLINE,
+                 known: Optional[Container[str]] = None, since: Optional[float] = None,
+                 content_length: int = ARTICLE_MAX_CHARS) -> List[Dict]:
     """
     Scrape news from Yahoo Finance - Updated for 2024 structure
     """
-    news_items = []
+    return _scrape_or_report("Yahoo Finance", ticker, max_articles=max_articles, body_deadline=body_deadline,
+                             known=known, since=since, content_length=content_length)
+
+
+def scrape_google_news(ticker: str, max_articles: int = 5,
+                       known: Optional[Container[str]] = None, since: Optional[float] = None) -> List[Dict]:
+    """
+    Scrape news from Google News
+    Note: Google News URLs may redirect through Google's servers
+    Search results are ordered by relevance, so known items are skipped
+    rather than ending the scan
+    """
+    return _scrape_or_report("Google News", ticker, max_articles=max_articles, known=known, since=since)
+
+
+def fetch_article_content(url: str, max_length: int = ARTICLE_MAX_CHARS) -> str:
+    """
+    Attempt to fetch article content from URL
+    Limited to first max_length characters to avoid overload
+    """
+    if not url or url.startswith('#') or not url.startswith('http'):
+        return ''
     
     try:
-        url = f"https://finance.yahoo.com/quote/{ticker}"
-        response = requests.get(url, headers=HEADERS, timeout=10)
+        # Bodies are fetched once per article; keeping them for conditional GETs only costs memory
+        response = http_get(url, timeout=5, conditional=False, max_bytes=ARTICLE_MAX_BYTES,
+                            deadline=BODY_FETCH_DEADLINE)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Yahoo Finance uses various div structures for news
-        # Try multiple selectors to find news items
-        news_containers = []
+        return parse_article_content(response.content, max_length)
         
-        # Look for news sections
-        selectors = [
-            'div[data-test="news-stream"]',
-            'div.stream-items',
-            'div.Mb\\(20px\\)',
-            'li.js-stream-content'
-        ]
-        
-        for selector in selectors:
-            containers = soup.select(selector)
-            if containers:
-                news_containers.extend(containers[:max_articles * 2])  # Get extra in case some fail
-                break
+    except Exception as e:
+        return ''
+
+
+def parse_finviz(html: bytes, max_articles: int = 5) -> List[Dict]:
+    """
+    Parse news rows from a Finviz quote page
+    """
+    news_items = []
+    soup = make_soup(html, parse_only=FINVIZ_NEWS_TABLE)
+    news_table = soup.find('table', {'id': 'news-table'})
+    
+    if news_table:
+        rows = news_table.find_all('tr')[:max_articles]
         
-        # If no specific news containers, look for article/h3 tags
-        if not news_containers:
-            # Find all h3 tags that might contain news
-            h3_tags = soup.find_all('h3')
-            for h3 in h3_tags[:max_articles * 2]:
-                link = h3.find('a')
-                if link and link.get('href'):
-                    headline = link.text.strip()
-                    article_url = link.get('href', '')
-                    
-                    # Make URL absolute if relative
-                    if article_url.startswith('/'):
-                        article_url = f"https://finance.yahoo.com{article_url}"
-                    elif not article_url.startswith('http'):
-                        continue
-                    
-                    # Skip if not a valid URL
-                    if not article_url or article_url == '#':
-                        continue
-                    
-                    # Try to get date from nearby elements
-                    date_text = 'Recent'
-                    parent = h3.find_parent()
-                    if parent:
-                        time_elem = parent.find('time')
-                        if time_elem:
-                            date_text = time_elem.text.strip()
-                    
-                    # Try to fetch content
-                    content = ''
-                    if article_url.startswith('http'):
-                        content = fetch_article_content(article_url)
-                    
-                    news_items.append({
-                        'source': 'Yahoo Finance',
-                        'headline': headline,
-                        'date': date_text,
-                        'url': article_url,
-                        'content': content
-                    })
-                    
-                    if len(news_items) >= max_articles:
-                        break
-        else:
-            # Process news containers
-            for container in news_containers:
-                if len(news_items) >= max_articles:
-                    break
+        for row in rows:
+            try:
+                # Get date/time
+                date_cell = row.find('td', {'align': 'right'})
+                date_text = date_cell.text.strip() if date_cell else 'N/A'
                 
-                try:
-                    # Find headline and link
-                    link = container.find('a')
-                    if not link:
-                        continue
-                    
-                    headline = link.text.strip()
-                    article_url = link.get('href', '')
-                    
-                    # Skip empty headlines
-                    if not headline or len(headline) < 10:
-                        continue
-                    
-                    # Make URL absolute if relative
-                    if article_url.startswith('/'):
-                        article_url = f"https://finance.yahoo.com{article_url}"
-                    elif not article_url.startswith('http'):
-                        continue
-                    
-                    # Try to get date
-                    date_text = 'Recent'
-                    time_elem = container.find('time')
-                    if time_elem:
-                        date_text = time_elem.text.strip()
-                    
-                    # Try to fetch content
-                    content = ''
-                    if article_url.startswith('http'):
-                        content = fetch_article_content(article_url)
+                # Get headline and link
+                link_cell = row.find('a', {'class': 'tab-link-news'})
+                if link_cell:
+                    headline = link_cell.text.strip()
+                    url = link_cell.get('href', '')
                     
                     news_items.append({
-                        'source': 'Yahoo Finance',
+                        'source': 'Finviz',
                         'headline': headline,
                         'date': date_text,
-                        'url': article_url,
-                        'content': content
+                        'url': url,
+                        'content': ''
                     })
-                except Exception as e:
-                    continue
-        
-        time.sleep(0.5)
-        
-    except Exception as e:
-        print(f"Error scraping Yahoo Finance for {ticker}: {str(e)}")
+            except Exception as e:
+                continue
     
-    return news_items[:max_articles]
+    return news_items
 
 
-def scrape_google_news(ticker: str, max_articles: int = 5) -> List[Dict]:
+def parse_yahoo(html: bytes, max_articles: int = 5) -> List[Dict]:
     """
-    Scrape news from Google News
-    Note: Google News URLs may redirect through Google's servers
+    Parse news items from a Yahoo Finance quote page
     """
     news_items = []
+    soup = make_soup(html)
     
-    try:
-        # Search Google News for ticker
-        search_query = f"{ticker} stock news"
-        url = f"https://news.google.com/search?q={search_query}&hl=en-US&gl=US&ceid=US:en"
-        
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Google News articles
-        articles = soup.find_all('article', limit=max_articles * 2)
-        
-        for article in articles:
+    # Yahoo Finance uses various div structures for news
+    # Try multiple selectors to find news items
+    news_containers = []
+    
+    # Look for news sections
+    selectors = [
+        'div[data-test="news-stream"]',
+        'div.stream-items',
+        'div.Mb\\(20px\\)',
+        'li.js-stream-content'
+    ]
+    
+    for selector in selectors:
+        containers = soup.select(selector)
+        if containers:
+            news_containers.extend(containers[:max_articles * 2])  # Get extra in case some fail
+            break
+    
+    # If no specific news containers, look for article/h3 tags
+    if not news_containers:
+        # Find all h3 tags that might contain news
+        h3_tags = soup.find_all('h3')
+        for h3 in h3_tags[:max_articles * 2]:
+            link = h3.find('a')
+            if link and link.get('href'):
+                headline = link.text.strip()
+                article_url = link.get('href', '')
+                
+                # Make URL absolute if relative
+                if article_url.startswith('/'):
+                    article_url = f"https://finance.yahoo.com{article_url}"
+                elif not article_url.startswith('http'):
+                    continue
+                
+                # Skip if not a valid URL
+                if not article_url or article_url == '#':
+                    continue
+                
+                # Try to get date from nearby elements
+                date_text = 'Recent'
+                parent = h3.find_parent()
+                if parent:
+                    time_elem = parent.find('time')
+                    if time_elem:
+                        date_text = time_elem.text.strip()
+                
+                news_items.append({
+                    'source': 'Yahoo Finance',
+                    'headline': headline,
+                    'date': date_text,
+                    'url': article_url,
+                    'content': ''
+                })
+                
+                if len(news_items) >= max_articles:
+                    break
+    else:
+        # Process news containers
+        for container in news_containers:
             if len(news_items) >= max_articles:
                 break
             
             try:
-                # Get headline and link
-                headline_tag = article.find('a')
-                if not headline_tag:
+                # Find headline and link
+                link = container.find('a')
+                if not link:
                     continue
                 
-                headline = headline_tag.text.strip()
-                article_url = headline_tag.get('href', '')
+                headline = link.text.strip()
+                article_url = link.get('href', '')
                 
-                # Skip if headline too short
-                if len(headline) < 10:
+                # Skip empty headlines
+                if not headline or len(headline) < 10:
                     continue
                 
-                # Handle Google News URLs
-                final_url = ''
-                if article_url.startswith('./articles/'):
-                    # Google News article - convert to full URL
-                    final_url = f"https://news.google.com{article_url[1:]}"
-                elif article_url.startswith('./'):
-                    final_url = f"https://news.google.com{article_url[1:]}"
-                elif article_url.startswith('http'):
-                    final_url = article_url
+                # Make URL absolute if relative
+                if article_url.startswith('/'):
+                    article_url = f"https://finance.yahoo.com{article_url}"
+                elif not article_url.startswith('http'):
+                    continue
                 
-                # Get date/time
-                time_tag = article.find('time')
-                date_text = time_tag.text.strip() if time_tag else 'Recent'
+                # Try to get date
+                date_text = 'Recent'
+                time_elem = container.find('time')
+                if time_elem:
+                    date_text = time_elem.text.strip()
                 
-                # Add article with or without URL
                 news_items.append({
-                    'source': 'Google News',
+                    'source': 'Yahoo Finance',
                     'headline': headline,
                     'date': date_text,
-                    'url': final_url if final_url.startswith('http') else '',  # Only include valid URLs
+                    'url': article_url,
                     'content': ''
                 })
             except Exception as e:
                 continue
+    
+    return news_items[:max_articles]
+
+
+def parse_google_news(html: bytes, max_articles: int = 5) -> List[Dict]:
+    """
+    Parse articles from a Google News search page
+    """
+    news_items = []
+    soup = make_soup(html, parse_only=GOOGLE_NEWS_ARTICLES)
+    
+    # Google News articles
+    articles = soup.find_all('article', limit=max_articles * 2)
+    
+    for article in articles:
+        if len(news_items) >= max_articles:
+            break
         
-        time.sleep(0.5)
-        
-    except Exception as e:
-        print(f"Error scraping Google News for {ticker}: {str(e)}")
+        try:
+            # Get headline and link
+            headline_tag = article.find('a')
+            if not headline_tag:
+                continue
+            
+            headline = headline_tag.text.strip()
+            article_url = headline_tag.get('href', '')
+            
+            # Skip if headline too short
+            if len(headline) < 10:
+                continue
+            
+            # Handle Google News URLs
+            final_url = ''
+            if article_url.startswith('./articles/'):
+                # Google News article - convert to full URL
+                final_url = f"https://news.google.com{article_url[1:]}"
+            elif article_url.startswith('./'):
+                final_url = f"https://news.google.com{article_url[1:]}"
+            elif article_url.startswith('http'):
+                final_url = article_url
+            
+            # Get date/time
+            time_tag = article.find('time')
+            date_text = time_tag.text.strip() if time_tag else 'Recent'
+            
+            # Add article with or without URL
+            news_items.append({
+                'source': 'Google News',
+                'headline': headline,
+                'date': date_text,
+                'url': final_url if final_url.startswith('http') else '',  # Only include valid URLs
+                'content': ''
+            })
+        except Exception as e:
+            continue
     
     return news_items
 
 
-def fetch_article_content(url: str, max_length: int = 1000) -> str:
+def parse_article_content(html: bytes, max_length: int = ARTICLE_MAX_CHARS) -> str:
     """
-    Attempt to fetch article content from URL
-    Limited to first max_length characters to avoid overload
+    Extract cleaned article text from an article page
     """
-    if not url or url.startswith('#') or not url.startswith('http'):
-        return ''
+    soup = make_soup(html)
     
-    try:
-        response = requests.get(url, headers=HEADERS, timeout=5)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(['script', 'style', 'nav', 'header', 'footer']):
-            script.decompose()
-        
-        # Try common article containers
-        article_content = None
-        for selector in ['article', 'div[class*="article"]', 'div[class*="content"]', 'main']:
-            article_content = soup.find(selector)
-            if article_content:
-                break
-        
+    # Remove script and style elements
+    for script in soup(['script', 'style', 'nav', 'header', 'footer']):
+        script.decompose()
+    
+    # Try common article containers
+    article_content = None
+    for selector in ['article', 'div[class*="article"]', 'div[class*="content"]', 'main']:
+        article_content = soup.find(selector)
         if article_content:
-            # Get text and clean it
-            text = article_content.get_text(separator=' ', strip=True)
-            # Remove extra whitespace
-            text = re.sub(r'\s+', ' ', text).strip()
-            return text[:max_length]
-        
-        return ''
-        
-    except Exception as e:
-        return ''
+            break
+    
+    if article_content:
+        # Get text and clean it
+        text = article_content.get_text(separator=' ', strip=True)
+        # Remove extra whitespace
+        text = re.sub(r'\s+', ' ', text).strip()
+        return text[:max_length]
+    
+    return ''
+
+
+def attach_article_contents(news_items: List[Dict], deadline: float = BODY_FETCH_DEADLINE,
+                            max_length: int = ARTICLE_MAX_CHARS) -> List[Dict]:
+    """
+    Fill in 'content' for news items by fetching article bodies concurrently
+    Bodies not fetched within deadline seconds are left empty (headline-only)
+    """
+    futures = {}
+    for item in news_items:
+        url = item.get('url', '')
+        if url and url.startswith('http'):
+            futures[body_executor.submit(fetch_article_content, url, max_length)] = item
+    
+    if not futures:
+        return news_items
+    
+    done, not_done = wait(futures, timeout=deadline)
+    
+    for future in done:
+        try:
+            futures[future]['content'] = future.result()
+        except Exception as e:
+            futures[future]['content'] = ''
+    
+    # Drop queued fetches that will no longer be used
+    for future in not_done:
+        future.cancel()
+    
+    return news_items
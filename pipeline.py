@@ -0,0 +1,482 @@
+"""
+Headless scrape -> analyze -> summarize pipeline
+Used by the Streamlit app and runnable on its own for scheduled runs:
+    python pipeline.py --tickers-file watchlist.txt --format parquet --output-dir out/
+"""
+
+import argparse
+import inspect
+import os
+import sys
+import time
+from datetime import datetime
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+from dedup import NearDuplicateIndex
+from fetch_orchestrator import run_scrape_jobs
+from history_store import HistoryStore
+from results_frame import build_results_frame, summary_table, detail_table
+from scrape_cache import scrape_cache, make_scrape_key
+from sentiment_analyzer import (
+    batch_analyze_vader, batch_analyze_finbert, batch_analyze_finbert_long, blend_vader, blend_finbert,
+    POOLING_METHODS
+)
+from source_registry import all_sources, get_source, source_names
+from utils import validate_ticker, clean_ticker
+from watermark_store import WatermarkStore
+
+ANALYSIS_MODES = ["Headlines Only", "Full Content", "Both (Averaged)"]
+
+# Short names accepted on the command line
+CLI_MODES = {'headlines': "Headlines Only", 'content': "Full Content", 'both': "Both (Averaged)"}
+OUTPUT_FORMATS = ('csv', 'parquet', 'jsonl')
+
+# Long-document runs fetch bodies up to this many characters from the
+# sources whose scrapers fetch article bodies
+LONG_ARTICLE_MAX_CHARS = int(os.environ.get('LONG_ARTICLE_MAX_CHARS', 20000))
+
+# FinBERT class probabilities kept on scored items
+FINBERT_LABELS = ('positive', 'negative', 'neutral')
+
+# "Both (Averaged)" weight of the headline; the body gets the rest
+DEFAULT_HEADLINE_WEIGHT = float(os.environ.get('HEADLINE_WEIGHT', 0.5))
+
+
+def get_scrapers(backend: Optional[str] = None) -> Dict[str, Callable]:
+    """
+    Source name -> scraper function of every registered source, for the
+    sync or async scraping backend (default: SCRAPER_BACKEND environment
+    variable). Scrapers raise on listing page errors so runs can report them.
+    Async scrapers are coroutine functions on the shared event loop
+    """
+    backend = backend or os.environ.get('SCRAPER_BACKEND', 'sync')
+    if backend == 'async':
+        from async_scrapers import get_async_scraper
+        scrape_source = get_async_scraper().scrape_source
+    else:
+        from news_scrapers import scrape_source
+    return {source.name: partial(scrape_source, source) for source in all_sources()}
+
+
+def scrape_runner(scrapers: Dict[str, Callable]) -> Callable:
+    """
+    run_scrape_jobs for a set of scrapers: the async orchestrator when they
+    are all coroutine functions, so a whole run shares one event loop pass
+    """
+    if scrapers and all(inspect.iscoroutinefunction(scraper) for scraper in scrapers.values()):
+        from async_scrapers import run_scrape_jobs as run_async_scrape_jobs
+        return run_async_scrape_jobs
+    return run_scrape_jobs
+
+
+def ticker_groups(tickers: List[str], source_name: str) -> List[str]:
+    """
+    Scrape job keys of a source: each ticker, or comma lists of up to
+    tickers_per_request tickers for feeds that serve several per request
+    """
+    try:
+        size = get_source(source_name).tickers_per_request
+    except KeyError:
+        size = 1
+    return [','.join(tickers[i:i + size]) for i in range(0, len(tickers), size)]
+
+
+def split_by_ticker(news_items: List[Dict], group: str) -> Dict[str, List[Dict]]:
+    """
+    Items of a scrape job per ticker of its group (see ticker_groups)
+    """
+    members = group.split(',')
+    if len(members) == 1:
+        return {group: news_items}
+    split = {ticker: [] for ticker in members}
+    for news in news_items:
+        split[news['ticker']].append(news)
+    return split
+
+
+def analysis_text(news: Dict, mode: str) -> str:
+    """
+    Text to score for one news item under an analysis mode
+    """
+    if mode == "Headlines Only":
+        return news['headline']
+    elif mode == "Full Content":
+        return news.get('content', news['headline'])
+    else:  # Both (Averaged)
+        return news['headline'] + " " + news.get('content', '')
+
+
+def analysis_parts(news: Dict, mode: str) -> List[str]:
+    """
+    Texts scored separately for one news item: headline and body in
+    "Both (Averaged)", otherwise just its analysis_text
+    """
+    if mode == "Both (Averaged)":
+        return [news['headline'], news.get('content', '')]
+    return [analysis_text(news, mode)]
+
+
+def mark_duplicates(news_items: List[Dict], mode: str, dedup: NearDuplicateIndex) -> List[Dict]:
+    """
+    Set 'cluster' (near-duplicate story id) on items, and 'duplicate' on
+    every item after the first of its cluster in this list
+    """
+    clusters = dedup.assign([analysis_text(news, mode) for news in news_items])
+    seen = set()
+    for news, cluster in zip(news_items, clusters):
+        news['cluster'] = cluster
+        news['duplicate'] = cluster in seen
+        seen.add(cluster)
+    return news_items
+
+
+def score_news(ticker: str, news_items: List[Dict], mode: str,
+               dedup: Optional[NearDuplicateIndex] = None,
+               long_documents: Optional[str] = None,
+               headline_weight: float = DEFAULT_HEADLINE_WEIGHT) -> List[Dict]:
+    """
+    Score all news items of one ticker in one batch, annotating them in place
+    In "Both (Averaged)" headline and body are separate inputs of the same
+    batch (2N texts) and their results are blended with headline_weight.
+    With a dedup index (after mark_duplicates) each story cluster is scored
+    once, on its first item, and the result is shared by all its members.
+    With long_documents (a pooling method) FinBERT scores article text over
+    its full length in pooled windows instead of the first 512 tokens
+    """
+    if not news_items:
+        return news_items
+
+    score_finbert = batch_analyze_finbert
+    if long_documents is not None and mode != "Headlines Only":
+        score_finbert = partial(batch_analyze_finbert_long, pooling=long_documents)
+
+    if dedup is None:
+        to_score = news_items
+    else:
+        firsts = {}
+        for news in news_items:
+            if dedup.get_result(news['cluster']) is None:
+                firsts.setdefault(news['cluster'], news)
+        to_score = list(firsts.values())
+
+    parts = [analysis_parts(news, mode) for news in to_score]
+    texts_to_analyze = [text for item_parts in parts for text in item_parts]
+    vader_flat = batch_analyze_vader(texts_to_analyze)
+    finbert_flat = score_finbert(texts_to_analyze)
+
+    weights = [headline_weight, 1.0 - headline_weight]
+    scored = []
+    position = 0
+    for item_parts in parts:
+        end = position + len(item_parts)
+        if len(item_parts) == 1:
+            scored.append((vader_flat[position], finbert_flat[position]))
+        else:
+            scored.append((blend_vader(vader_flat[position:end], weights),
+                           blend_finbert(finbert_flat[position:end], weights)))
+        position = end
+
+    if dedup is None:
+        vader_results, finbert_results = zip(*scored)
+    else:
+        for news, result in zip(to_score, scored):
+            dedup.set_result(news['cluster'], result)
+        vader_results, finbert_results = zip(*(dedup.get_result(news['cluster']) for news in news_items))
+
+    for news, vader_result, finbert_result in zip(news_items, vader_results, finbert_results):
+        # VADER sentiment
+        news['vader_sentiment'] = vader_result['label']
+        news['vader_score'] = vader_result['compound']
+
+        # FinBERT sentiment
+        news['finbert_sentiment'] = finbert_result['label']
+        news['finbert_score'] = finbert_result['score']
+        # Error fallbacks carry no probabilities (see WatermarkStore.save_scores)
+        news['finbert_probabilities'] = {label: finbert_result[label] for label in FINBERT_LABELS
+                                         if label in finbert_result}
+
+        news['ticker'] = ticker
+
+    return news_items
+
+
+def run_pipeline(tickers: List[str], sources: Optional[List[str]] = None, max_articles: int = 5,
+                 mode: str = "Headlines Only", max_workers: int = 8, cache_ttl: float = 900,
+                 scrapers: Optional[Dict[str, Callable]] = None,
+                 watermarks: Optional[WatermarkStore] = None,
+                 history: Optional[HistoryStore] = None,
+                 dedup: bool = False, count_duplicates: bool = True,
+                 long_documents: Optional[str] = None,
+                 headline_weight: float = DEFAULT_HEADLINE_WEIGHT,
+                 on_ticker: Optional[Callable[[str, List[Dict]], None]] = None,
+                 on_error: Optional[Callable[[str, str, Exception], None]] = None) -> Dict:
+    """
+    Scrape, score and summarize news for a list of tickers
+    sources are registered source names (default: those enabled by default).
+    Each ticker is scored as soon as all of its sources have returned, and
+    on_ticker(ticker, items) is called right after. Feeds that serve several
+    tickers per request are fetched once per group of tickers. Returns a dict with the
+    results frame, summary and detail tables, scrape errors and per-stage
+    timings in seconds.
+    With a watermark store the run is incremental: scrapers only return
+    (and fetch bodies for) items not seen before, only those are scored,
+    and they are merged with the stored items. The scrape cache is skipped
+    because scrapes then return just the new items.
+    With a history store the scored articles are appended to it.
+    With dedup, near-duplicate stories (across sources and tickers) are
+    clustered and each cluster is scored once; count_duplicates decides
+    whether repeats of a story within a ticker count in the summary.
+    With long_documents (one of POOLING_METHODS) and a mode that reads
+    bodies, bodies are fetched up to LONG_ARTICLE_MAX_CHARS and FinBERT
+    pools overlapping windows over the whole text.
+    headline_weight sets the headline's share of "Both (Averaged)" scores.
+    """
+    # A ticker is analyzed once every source has returned, so each source counts once
+    sources = list(dict.fromkeys(sources or source_names(default_only=True)))
+    scrapers = scrapers or get_scrapers()
+    body_sources = {source.name for source in all_sources() if source.needs_bodies}
+    timings = {'scrape': 0.0, 'analyze': 0.0, 'summarize': 0.0}
+    results_by_ticker = {}
+    errors = []
+    dedup_index = NearDuplicateIndex() if dedup else None
+    if mode == "Headlines Only":
+        long_documents = None
+    if long_documents is not None and long_documents not in POOLING_METHODS:
+        raise ValueError(f"Unknown pooling method: {long_documents}")
+    # Long bodies are cached apart from the default lead paragraphs, and
+    # their scores are stored apart from truncated ones
+    cache_variant = f"body{LONG_ARTICLE_MAX_CHARS}" if long_documents is not None else ''
+    score_mode = mode
+    if mode == "Both (Averaged)":
+        score_mode += f" [headline {headline_weight:g}]"
+    if long_documents is not None:
+        score_mode += f" [{long_documents} windows]"
+    start_time = time.perf_counter()
+
+    # Serve cached scrapes immediately, fetch the rest concurrently
+    scraped = {ticker: {} for ticker in tickers}
+    jobs = []
+    for source_name in sources:
+        options = {}
+        if long_documents is not None and source_name in body_sources:
+            options['content_length'] = LONG_ARTICLE_MAX_CHARS
+        scraper = partial(scrapers[source_name], **options) if options else scrapers[source_name]
+
+        for group in ticker_groups(tickers, source_name):
+            if watermarks is not None:
+                if ',' in group:
+                    # Seen items of one ticker may be new to another; merge drops repeats
+                    jobs.append((group, source_name, scraper))
+                else:
+                    known, since = watermarks.known(group, source_name)
+                    jobs.append((group, source_name, partial(scraper, known=known, since=since)))
+                continue
+
+            cached_items = scrape_cache.get(make_scrape_key(group, source_name, max_articles, cache_variant), cache_ttl)
+            if cached_items is not None:
+                for ticker, news_items in split_by_ticker(cached_items, group).items():
+                    scraped[ticker][source_name] = news_items
+            else:
+                jobs.append((group, source_name, scraper))
+
+    def analyze_ticker(ticker: str):
+        analyze_start = time.perf_counter()
+
+        # Keep source order stable regardless of completion order
+        ticker_news = []
+        for source_name in sources:
+            news_items = scraped[ticker].get(source_name, [])
+            if watermarks is not None:
+                news_items = watermarks.merge(ticker, source_name, news_items)[:max_articles]
+            ticker_news.extend(news_items)
+
+        if dedup_index is not None:
+            mark_duplicates(ticker_news, mode, dedup_index)
+
+        if watermarks is not None:
+            # Only items without stored scores for this mode reach the models
+            pending = watermarks.apply_scores(ticker_news, score_mode)
+            score_news(ticker, pending, mode, dedup_index, long_documents, headline_weight)
+            watermarks.save_scores(ticker, pending, score_mode)
+            for news in ticker_news:
+                news['ticker'] = ticker
+        else:
+            score_news(ticker, ticker_news, mode, dedup_index, long_documents, headline_weight)
+        results_by_ticker[ticker] = ticker_news
+
+        timings['analyze'] += time.perf_counter() - analyze_start
+        if on_ticker is not None:
+            on_ticker(ticker, ticker_news)
+
+    # Tickers fully served from cache need no network round trip
+    for ticker in tickers:
+        if len(scraped[ticker]) == len(sources):
+            analyze_ticker(ticker)
+
+    for group, source_name, news_items, error in scrape_runner(scrapers)(
+            jobs, max_articles=max_articles, max_workers=max_workers,
+            cache=scrape_cache if watermarks is None else None, ttl=cache_ttl, cache_variant=cache_variant):
+        for ticker, ticker_items in split_by_ticker(news_items, group).items():
+            if error is not None:
+                errors.append((ticker, source_name, error))
+                if on_error is not None:
+                    on_error(ticker, source_name, error)
+            scraped[ticker][source_name] = ticker_items
+
+            if len(scraped[ticker]) == len(sources):
+                analyze_ticker(ticker)
+
+    # Scraping overlaps scoring; count only the time not spent scoring
+    timings['scrape'] = time.perf_counter() - start_time - timings['analyze']
+
+    summarize_start = time.perf_counter()
+    all_results = []
+    for ticker in tickers:
+        all_results.extend(results_by_ticker.get(ticker, []))
+
+    results_df = build_results_frame(all_results, tickers)
+    summary_df = summary_table(results_df, count_duplicates)
+    detailed_df = detail_table(results_df)
+    timings['summarize'] = time.perf_counter() - summarize_start
+
+    if history is not None:
+        record_start = time.perf_counter()
+        history.append(results_df)
+        timings['record'] = time.perf_counter() - record_start
+
+    timings['total'] = time.perf_counter() - start_time
+
+    return {
+        'timestamp': datetime.now(),
+        'tickers': tickers,
+        'results': results_df,
+        'summary': summary_df,
+        'detailed': detailed_df,
+        'errors': errors,
+        'timings': timings,
+        'dedup': dedup_index.stats() if dedup_index is not None else None
+    }
+
+
+def read_tickers(path: str) -> List[str]:
+    """
+    Read tickers from a file: comma or whitespace separated, '#' starts a comment
+    Invalid symbols are skipped with a warning; duplicates are dropped
+    """
+    tickers = []
+    with open(path) as f:
+        for line in f:
+            for token in line.split('#', 1)[0].replace(',', ' ').split():
+                ticker = clean_ticker(token)
+                if validate_ticker(ticker):
+                    tickers.append(ticker)
+                else:
+                    print(f"Skipping invalid ticker: {token}", file=sys.stderr)
+    return list(dict.fromkeys(tickers))
+
+
+def parquet_available() -> bool:
+    for module in ('pyarrow', 'fastparquet'):
+        try:
+            __import__(module)
+            return True
+        except ImportError:
+            pass
+    return False
+
+
+def write_table(df, path: str, fmt: str):
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+    elif fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_json(path, orient='records', lines=True, force_ascii=False)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run the news sentiment pipeline without Streamlit")
+    parser.add_argument("--tickers-file", required=True, help="File of tickers (comma/space/newline separated)")
+    parser.add_argument("--sources", default=None,
+                        help=f"Comma list of {', '.join(source.key for source in all_sources())} "
+                             f"(default: {', '.join(source.key for source in all_sources() if source.default_enabled)})")
+    parser.add_argument("--articles", type=int, default=5, help="Articles per ticker per source")
+    parser.add_argument("--mode", choices=list(CLI_MODES), default="headlines")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Scrape jobs in flight per source; listing requests stay within each "
+                             "source's host concurrency and rate limit")
+    parser.add_argument("--cache-ttl", type=float, default=900, help="Scrape cache TTL in seconds")
+    parser.add_argument("--backend", choices=['sync', 'async'], default=None, help="Scraping backend")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only fetch and score articles not seen in earlier runs")
+    parser.add_argument("--watermark-db", default=os.environ.get('WATERMARK_DB'),
+                        help="SQLite file that remembers seen articles between runs")
+    parser.add_argument("--history-db", default=None,
+                        help="Append scored articles to this sentiment history database")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Cluster near-duplicate stories and score each cluster once")
+    parser.add_argument("--count-duplicates", action="store_true",
+                        help="With --dedup, still count repeated stories in the summary")
+    parser.add_argument("--long-documents", choices=POOLING_METHODS, default=None,
+                        help="With --mode content/both, score whole article bodies in overlapping "
+                             "FinBERT windows pooled by this method")
+    parser.add_argument("--headline-weight", type=float, default=DEFAULT_HEADLINE_WEIGHT,
+                        help="With --mode both, weight of the headline score (the body gets the rest)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv")
+    parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args(argv)
+
+    if not 0.0 <= args.headline_weight <= 1.0:
+        parser.error("--headline-weight must be between 0 and 1")
+    if args.format == 'parquet' and not parquet_available():
+        parser.error("parquet output needs pyarrow or fastparquet (pip install pyarrow)")
+
+    tickers = read_tickers(args.tickers_file)
+    if not tickers:
+        parser.error(f"no valid tickers in {args.tickers_file}")
+    try:
+        sources = [get_source(name.strip()).name for name in (args.sources or '').split(',') if name.strip()]
+    except KeyError as e:
+        parser.error(f"unknown source {e}")
+
+    def report_error(ticker: str, source_name: str, error: Exception):
+        print(f"Error scraping {source_name} for {ticker}: {error}", file=sys.stderr)
+
+    run = run_pipeline(
+        tickers,
+        sources=sources,
+        max_articles=args.articles,
+        mode=CLI_MODES[args.mode],
+        max_workers=args.workers,
+        cache_ttl=args.cache_ttl,
+        scrapers=get_scrapers(args.backend),
+        watermarks=WatermarkStore(db_path=args.watermark_db) if args.incremental else None,
+        history=HistoryStore(args.history_db) if args.history_db else None,
+        dedup=args.dedup,
+        count_duplicates=args.count_duplicates or not args.dedup,
+        long_documents=args.long_documents,
+        headline_weight=args.headline_weight,
+        on_error=report_error
+    )
+
+    write_start = time.perf_counter()
+    os.makedirs(args.output_dir, exist_ok=True)
+    stamp = run['timestamp'].strftime('%Y%m%d_%H%M%S')
+    summary_path = os.path.join(args.output_dir, f"sentiment_summary_{stamp}.{args.format}")
+    detailed_path = os.path.join(args.output_dir, f"sentiment_detailed_{stamp}.{args.format}")
+    write_table(run['summary'], summary_path, args.format)
+    write_table(run['detailed'], detailed_path, args.format)
+    run['timings']['write'] = time.perf_counter() - write_start
+
+    print(f"{len(tickers)} tickers, {len(run['results'])} articles, {len(run['errors'])} scrape errors")
+    if run['dedup'] is not None:
+        print(f"{run['dedup']['clusters']} distinct stories, {run['dedup']['duplicates']} near-duplicates")
+    for stage, seconds in run['timings'].items():
+        print(f"  {stage:<10}{seconds:>8.2f}s")
+    print(f"Wrote {summary_path}")
+    print(f"Wrote {detailed_path}")
+
+
+if __name__ == "__main__":
+    main()
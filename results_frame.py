@@ -0,0 +1,102 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils import calculate_sentiment_ratio
+
+SENTIMENT_LABELS = ['positive', 'negative', 'neutral']
+MODELS = [('vader', 'VADER'), ('finbert', 'FinBERT')]
+
+# Column -> dtype of the scored results table
+RESULT_COLUMNS = {
+    'ticker': 'category',
+    'source': 'category',
+    'headline': 'object',
+    'date': 'object',
+    'url': 'object',
+    'published': 'float64',
+    'vader_sentiment': pd.CategoricalDtype(SENTIMENT_LABELS),
+    'vader_score': 'float64',
+    'finbert_sentiment': pd.CategoricalDtype(SENTIMENT_LABELS),
+    'finbert_score': 'float64',
+    'cluster': 'int64',
+    'duplicate': 'bool',
+}
+
+
+def build_results_frame(items: List[Dict], tickers: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Build the typed results table from scored news item dicts
+    ticker categories follow the given ticker order, so groupbys come back
+    in that order
+    """
+    frame = pd.DataFrame.from_records(items, columns=list(RESULT_COLUMNS))
+    frame['date'] = frame['date'].fillna('N/A')
+    frame['url'] = frame['url'].fillna('')
+    # Epoch seconds from watermark_store.annotate_published; NaN when unparsed
+    frame['published'] = pd.to_numeric(frame['published'])
+    # Set by the dedup stage only; without it every item is its own story
+    frame['cluster'] = pd.to_numeric(frame['cluster']).fillna(-1)
+    frame['duplicate'] = frame['duplicate'].eq(True)
+    frame = frame.astype(RESULT_COLUMNS)
+    if tickers is not None:
+        frame['ticker'] = frame['ticker'].cat.set_categories(tickers)
+    return frame
+
+
+def sentiment_counts(frame: pd.DataFrame, count_duplicates: bool = True) -> pd.DataFrame:
+    """
+    Per-ticker total plus positive/negative/neutral counts for each model,
+    computed in one groupby
+    """
+    if not count_duplicates:
+        frame = frame[~frame['duplicate']]
+
+    indicators = {'total': np.ones(len(frame), dtype=np.int64)}
+    for model, _ in MODELS:
+        codes = frame[f'{model}_sentiment'].cat.codes.to_numpy()
+        for code, label in enumerate(SENTIMENT_LABELS):
+            indicators[f'{model}_{label}'] = (codes == code).astype(np.int64)
+
+    counts = pd.DataFrame(indicators, index=frame.index)
+    return counts.groupby(frame['ticker'], observed=True).sum()
+
+
+def summary_table(frame: pd.DataFrame, count_duplicates: bool = True) -> pd.DataFrame:
+    """
+    Display summary: counts and P/N ratios per ticker, best FinBERT ratio first
+    """
+    counts = sentiment_counts(frame, count_duplicates)
+    summary = pd.DataFrame({'Ticker': counts.index.astype(str), 'Total News': counts['total'].to_numpy()})
+
+    ratios = {}
+    for model, name in MODELS:
+        for label in SENTIMENT_LABELS:
+            summary[f'{name} {label.capitalize()}'] = counts[f'{model}_{label}'].to_numpy()
+        ratios[model] = calculate_sentiment_ratio(counts[f'{model}_positive'].to_numpy(),
+                                                  counts[f'{model}_negative'].to_numpy())
+        summary[f'{name} Ratio (P/N)'] = [f"{ratio:.2f}" if ratio != float('inf') else "∞"
+                                          for ratio in ratios[model]]
+
+    # Sort by sentiment ratio (using FinBERT as primary)
+    order = np.argsort(-ratios['finbert'], kind='stable')
+    return summary.iloc[order].reset_index(drop=True)
+
+
+def detail_table(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-article table for display and CSV download
+    """
+    return pd.DataFrame({
+        'Ticker': frame['ticker'].astype(str),
+        'Source': frame['source'].astype(str),
+        'Headline': frame['headline'],
+        'Date': frame['date'],
+        'VADER Sentiment': frame['vader_sentiment'].astype(str),
+        'VADER Score': frame['vader_score'].map('{:.3f}'.format),
+        'FinBERT Sentiment': frame['finbert_sentiment'].astype(str),
+        'FinBERT Score': frame['finbert_score'].map('{:.3f}'.format),
+        'Duplicate': frame['duplicate'],
+        'URL': frame['url']
+    }).reset_index(drop=True)
@@ -0,0 +1,183 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from single_flight import SingleFlight
+
+
+def make_scrape_key(ticker: str, source_name: str, max_articles: int, variant: str = '') -> str:
+    key = f"{ticker}|{source_name}|{max_articles}"
+    return f"{key}|{variant}" if variant else key
+
+
+class ScrapeCache:
+    """
+    Process-wide TTL cache for scraper results
+    Shared by every Streamlit session. Entries are evicted LRU-first when
+    either max_entries or max_bytes is exceeded; an optional SQLite file
+    keeps results across restarts. Identical concurrent misses are
+    coalesced so only one caller fetches.
+    """
+
+    def __init__(self, max_entries: int = 2000, max_bytes: int = 64 * 1024 * 1024,
+                 db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (stored_at, size, items)
+        self._bytes = 0
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS scrape_cache "
+                "(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, items TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def _copy(items: List[Dict]) -> List[Dict]:
+        # Callers annotate items in place, so never hand out the cached dicts
+        return [dict(item) for item in items]
+
+    def _lookup(self, key: str, ttl: float) -> Optional[List[Dict]]:
+        """
+        Cache lookup; caller must hold the lock
+        """
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, _, items = entry
+            if now - stored_at <= ttl:
+                self._entries.move_to_end(key)
+                return items
+            return None
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT stored_at, items FROM scrape_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[0] <= ttl:
+                items = json.loads(row[1])
+                self._remember(key, row[0], items, len(row[1]))
+                return items
+
+        return None
+
+    def get(self, key: str, ttl: float) -> Optional[List[Dict]]:
+        """
+        Return cached items no older than ttl seconds, or None
+        """
+        with self._lock:
+            items = self._lookup(key, ttl)
+            if items is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._copy(items)
+
+    def put(self, key: str, items: List[Dict]):
+        payload = json.dumps(items)
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, self._copy(items), len(payload))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO scrape_cache (key, stored_at, items) VALUES (?, ?, ?)",
+                    (key, stored_at, payload)
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, stored_at: float, items: List[Dict], size: int):
+        if key in self._entries:
+            self._bytes -= self._entries[key][1]
+        self._entries[key] = (stored_at, size, items)
+        self._entries.move_to_end(key)
+        self._bytes += size
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], List[Dict]], ttl: float) -> List[Dict]:
+        """
+        Return cached items or call fetch(); concurrent callers for the same
+        key wait for the first caller's fetch instead of starting their own
+        """
+        items = self.get(key, ttl)
+        if items is not None:
+            return items
+
+        def fetch_and_store() -> List[Dict]:
+            # A previous leader may have stored the key since our lookup
+            with self._lock:
+                items = self._lookup(key, ttl)
+            if items is not None:
+                return items
+
+            items = fetch()
+            # Empty results are usually a failed or blocked scrape; retry next time
+            if items:
+                self.put(key, items)
+            return items
+
+        return self._copy(self._flights.do(key, fetch_and_store))
+
+    async def get_or_fetch_async(self, key: str, fetch: Callable[[], Awaitable[List[Dict]]],
+                                 ttl: float) -> List[Dict]:
+        """
+        get_or_fetch for a coroutine fetch; callers waiting on another
+        caller's fetch (sync or async) suspend instead of blocking the loop
+        """
+        items = self.get(key, ttl)
+        if items is not None:
+            return items
+
+        async def fetch_and_store() -> List[Dict]:
+            with self._lock:
+                items = self._lookup(key, ttl)
+            if items is not None:
+                return items
+
+            items = await fetch()
+            if items:
+                self.put(key, items)
+            return items
+
+        return self._copy(await self._flights.do_async(key, fetch_and_store))
+
+    def clear(self, disk: bool = True):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if disk and self._db is not None:
+                self._db.execute("DELETE FROM scrape_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            flights = self._flights.stats()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': flights['deduplicated'],
+                'entries': len(self._entries),
+                'bytes': self._bytes
+            }
+
+
+# Shared by all sessions in this process; set SCRAPE_CACHE_DB to persist
+scrape_cache = ScrapeCache(
+    max_entries=int(os.environ.get('SCRAPE_CACHE_ENTRIES', 2000)),
+    max_bytes=int(os.environ.get('SCRAPE_CACHE_BYTES', 64 * 1024 * 1024)),
+    db_path=os.environ.get('SCRAPE_CACHE_DB')
+)
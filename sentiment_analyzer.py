@@ -1,27 +1,147 @@
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
-from typing import Dict
+from typing import Dict, List
 import numpy as np
+import os
+import threading
 
-# Initialize VADER
-vader_analyzer = SentimentIntensityAnalyzer()
+from finbert_backends import load_backend, DEFAULT_ARTIFACT_DIR
+from inference_worker import InferenceWorker
+from sentiment_cache import sentiment_cache, make_key
+from single_flight import SingleFlight
+
+# Initialize VADER (lazy loading)
+vader_analyzer = None
+_vader_lock = threading.Lock()
 
 # Initialize FinBERT (lazy loading)
 finbert_tokenizer = None
-finbert_model = None
+finbert_backend = None
+_finbert_lock = threading.Lock()
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+
+# Inference backend: 'torch' (fp32), 'torch-int8' or 'onnx'; see finbert_backends
+FINBERT_BACKEND = os.environ.get('FINBERT_BACKEND', 'torch')
+FINBERT_ARTIFACT_DIR = os.environ.get('FINBERT_ARTIFACT_DIR', DEFAULT_ARTIFACT_DIR)
+
+# Cache key components; bump the mode when scoring logic changes
+VADER_MODEL_ID = "vaderSentiment"
+VADER_MODE = "compound"
+FINBERT_MODEL_ID = "ProsusAI/finbert"
+FINBERT_MODE = "truncate-512"
+
+# In-progress FinBERT computations keyed by cache key, shared across threads
+finbert_flights = SingleFlight()
+
+# Route FinBERT through a long-lived micro-batching worker (FINBERT_WORKER=1)
+FINBERT_WORKER = os.environ.get('FINBERT_WORKER') == '1'
+FINBERT_WORKER_BATCH = int(os.environ.get('FINBERT_WORKER_BATCH', 16))
+FINBERT_WORKER_WAIT_MS = float(os.environ.get('FINBERT_WORKER_WAIT_MS', 10))
+_finbert_worker = None
+_finbert_worker_lock = threading.Lock()
+
+# Spread FinBERT batches across worker processes (FINBERT_PROCESSES=N, N > 1)
+FINBERT_PROCESSES = int(os.environ.get('FINBERT_PROCESSES', 1))
+
+# Long-document scoring: 512-token windows overlapping by FINBERT_WINDOW_OVERLAP
+# tokens, at most FINBERT_MAX_WINDOWS per text, pooled into one result
+FINBERT_WINDOW_OVERLAP = int(os.environ.get('FINBERT_WINDOW_OVERLAP', 128))
+FINBERT_MAX_WINDOWS = int(os.environ.get('FINBERT_MAX_WINDOWS', 8))
+POOLING_METHODS = ('mean', 'max', 'length')
+
+
+def get_vader_analyzer():
+    """
+    Build the VADER analyzer on first use
+    """
+    global vader_analyzer
+    
+    if vader_analyzer is None:
+        with _vader_lock:
+            if vader_analyzer is None:
+                from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+                vader_analyzer = SentimentIntensityAnalyzer()
+    return vader_analyzer
 
 
 def load_finbert():
     """
     Lazy load FinBERT model to save startup time
+    torch and transformers are only imported here, on first use
     """
-    global finbert_tokenizer, finbert_model
+    global finbert_tokenizer, finbert_backend
+    
+    if finbert_tokenizer is None or finbert_backend is None:
+        # A warm-up thread may be loading already; wait for it instead of loading twice
+        with _finbert_lock:
+            if finbert_tokenizer is None or finbert_backend is None:
+                finbert_tokenizer, finbert_backend = load_backend(FINBERT_BACKEND, FINBERT_MODEL_ID, FINBERT_ARTIFACT_DIR)
+
+
+def start_warmup() -> threading.Thread:
+    """
+    Preload VADER and FinBERT on a background thread; safe to call repeatedly
+    """
+    global _warmup_thread
+    
+    def warm_up():
+        try:
+            get_vader_analyzer()
+            load_finbert()
+        except Exception as e:
+            print(f"FinBERT warm-up failed: {e}")
     
-    if finbert_tokenizer is None or finbert_model is None:
-        finbert_tokenizer = AutoTokenizer.from_pretrained("ProsusAI/finbert")
-        finbert_model = AutoModelForSequenceClassification.from_pretrained("ProsusAI/finbert")
-        finbert_model.eval()
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warm_up, name="finbert-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+
+def set_finbert_backend(name: str):
+    """
+    Switch the inference backend; the model is reloaded on next use
+    """
+    global FINBERT_BACKEND, finbert_tokenizer, finbert_backend
+    
+    with _finbert_lock:
+        FINBERT_BACKEND = name
+        finbert_tokenizer = None
+        finbert_backend = None
+
+
+def get_finbert_worker() -> InferenceWorker:
+    """
+    Return the shared FinBERT inference worker, starting it on first use
+    """
+    global _finbert_worker
+    
+    with _finbert_worker_lock:
+        if _finbert_worker is None:
+            _finbert_worker = InferenceWorker(
+                run_finbert,
+                max_batch_size=FINBERT_WORKER_BATCH,
+                max_wait=FINBERT_WORKER_WAIT_MS / 1000
+            )
+            _finbert_worker.start()
+        return _finbert_worker
+
+
+def finbert_cache_key(text: str, mode: str = FINBERT_MODE) -> str:
+    """
+    Cache key for a FinBERT result; backends differ slightly, so they never share entries
+    """
+    return make_key(FINBERT_MODEL_ID, f"{mode}:{FINBERT_BACKEND}", text)
+
+
+def vader_label(compound: float) -> str:
+    """
+    Classify a VADER compound score
+    """
+    if compound >= 0.05:
+        return 'positive'
+    elif compound <= -0.05:
+        return 'negative'
+    return 'neutral'
 
 
 def analyze_vader_sentiment(text: str) -> Dict:
@@ -32,24 +152,24 @@ def analyze_vader_sentiment(text: str) -> Dict:
     if not text or not text.strip():
         return {'label': 'neutral', 'compound': 0.0}
     
-    scores = vader_analyzer.polarity_scores(text)
-    compound = scores['compound']
+    cache_key = make_key(VADER_MODEL_ID, VADER_MODE, text)
+    cached = sentiment_cache.get(cache_key)
+    if cached is not None:
+        return cached
     
-    # Classify based on compound score
-    if compound >= 0.05:
-        label = 'positive'
-    elif compound <= -0.05:
-        label = 'negative'
-    else:
-        label = 'neutral'
+    scores = get_vader_analyzer().polarity_scores(text)
+    compound = scores['compound']
     
-    return {
-        'label': label,
+    result = {
+        'label': vader_label(compound),
         'compound': compound,
         'pos': scores['pos'],
         'neu': scores['neu'],
         'neg': scores['neg']
     }
+    sentiment_cache.put(cache_key, result)
+    
+    return result
 
 
 def analyze_finbert_sentiment(text: str) -> Dict:
@@ -60,6 +180,29 @@ def analyze_finbert_sentiment(text: str) -> Dict:
     if not text or not text.strip():
         return {'label': 'neutral', 'score': 0.0}
     
+    cache_key = finbert_cache_key(text)
+    cached = sentiment_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    def score_and_store() -> Dict:
+        if FINBERT_WORKER:
+            result = get_finbert_worker().submit(text).result()
+        else:
+            result = _score_finbert_text(text)
+        # Error fallbacks carry no probabilities and are not cached
+        if 'positive' in result:
+            sentiment_cache.put(cache_key, result)
+        return result
+    
+    # Concurrent callers scoring the same text share one forward pass
+    return dict(finbert_flights.do(cache_key, score_and_store))
+
+
+def _score_finbert_text(text: str) -> Dict:
+    """
+    Score a single non-empty text with FinBERT (no caching)
+    """
     # Load model if not already loaded
     load_finbert()
     
@@ -70,19 +213,17 @@ def analyze_finbert_sentiment(text: str) -> Dict:
         # Tokenize
         inputs = finbert_tokenizer(
             text,
-            return_tensors="pt",
+            return_tensors=finbert_backend.return_tensors,
             truncation=True,
             max_length=max_length,
             padding=True
         )
         
         # Get prediction
-        with torch.no_grad():
-            outputs = finbert_model(**inputs)
-            predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
+        predictions = finbert_backend.predict_proba(inputs)
         
         # FinBERT labels: 0=positive, 1=negative, 2=neutral
-        probs = predictions[0].numpy()
+        probs = predictions[0]
         predicted_class = np.argmax(probs)
         confidence = float(probs[predicted_class])
         
@@ -109,18 +250,344 @@ def batch_analyze_vader(texts: list) -> list:
     return [analyze_vader_sentiment(text) for text in texts]
 
 
-def batch_analyze_finbert(texts: list, batch_size: int = 8) -> list:
+def _blend(results: List[Dict], weights: List[float], fields: tuple) -> Dict:
+    """
+    Weighted average of fields over results; results without the fields
+    (empty texts, error fallbacks) drop out and the rest are reweighted.
+    If only zero-weight results remain they are averaged evenly, so an
+    article without a body still gets its headline score
+    """
+    present = [(result, weight) for result, weight in zip(results, weights) if fields[-1] in result]
+    if not present:
+        return {}
+    total = sum(weight for _, weight in present)
+    if not total:
+        present = [(result, 1.0) for result, _ in present]
+        total = len(present)
+    return {field: sum(result[field] * weight for result, weight in present) / total for field in fields}
+
+
+def blend_vader(results: List[Dict], weights: List[float]) -> Dict:
+    """
+    Combine VADER results of several texts of one article (e.g. headline and body)
+    """
+    blended = _blend(results, weights, ('compound', 'pos', 'neu', 'neg'))
+    if not blended:
+        return {'label': 'neutral', 'compound': 0.0}
+    blended['label'] = vader_label(blended['compound'])
+    return blended
+
+
+def blend_finbert(results: List[Dict], weights: List[float]) -> Dict:
+    """
+    Combine FinBERT results of several texts of one article by their class
+    probabilities; the blended label is the most probable class
+    """
+    blended = _blend(results, weights, ('positive', 'negative', 'neutral'))
+    if not blended:
+        return {'label': 'neutral', 'score': 0.0}
+    label = max(('positive', 'negative', 'neutral'), key=blended.get)
+    blended.update(label=label, score=blended[label])
+    return blended
+
+
+def schedule_batches(lengths: List[int], max_tokens: int = 4096, max_batch_size: int = 32) -> List[List[int]]:
+    """
+    Group text indices into batches under a padded token budget
+    Indices are sorted by token length so each batch holds texts of similar
+    length; a batch costs len(batch) * longest member tokens once padded
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    
+    batches = []
+    current = []
+    for i in order:
+        # Sorted ascending, so the newest member is always the longest
+        padded_cost = (len(current) + 1) * lengths[i]
+        if current and (padded_cost > max_tokens or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+        current.append(i)
+    
+    if current:
+        batches.append(current)
+    
+    return batches
+
+
+def padding_stats(lengths: List[int], batches: List[List[int]]) -> Dict:
+    """
+    Count real tokens versus padding tokens for a batch plan
+    """
+    processed = 0
+    padded = 0
+    for batch in batches:
+        longest = max(lengths[i] for i in batch)
+        real = sum(lengths[i] for i in batch)
+        processed += real
+        padded += longest * len(batch) - real
+    
+    return {
+        'batches': len(batches),
+        'tokens': processed,
+        'padding': padded,
+        'padding_ratio': padded / (processed + padded) if processed + padded else 0.0
+    }
+
+
+def batch_analyze_finbert(texts: list, batch_size: int = 32, max_tokens: int = 4096) -> list:
     """
     Batch analyze multiple texts with FinBERT for efficiency
+    Texts are tokenized once, grouped by length under a max_tokens padded
+    budget (at most batch_size texts each) and scored with one forward pass
+    per batch; results come back in input order. Cached texts are skipped,
+    repeated texts are scored once, and texts another caller is already
+    scoring are waited on rather than scored again
     """
-    results = []
+    results = [{'label': 'neutral', 'score': 0.0} for _ in texts]
+    
+    # Empty and cached texts never reach the model
+    pending = {}
+    for i, text in enumerate(texts):
+        if not text or not text.strip():
+            continue
+        cache_key = finbert_cache_key(text)
+        if cache_key in pending:
+            pending[cache_key].append(i)
+            continue
+        cached = sentiment_cache.get(cache_key)
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending[cache_key] = [i]
+    
+    if not pending:
+        return results
     
-    # Load model once
+    # Claim the texts nobody else is scoring; join the flights of the rest
+    owned = {}
+    joined = {}
+    for key in pending:
+        flight, leader = finbert_flights.begin(key)
+        (owned if leader else joined)[key] = flight
+    
+    keys = list(owned)
+    scored = {}
+    try:
+        if keys:
+            unique_texts = [texts[pending[key][0]] for key in keys]
+            if FINBERT_WORKER:
+                # Share forward passes with other sessions through the worker queue
+                futures = [get_finbert_worker().submit(text) for text in unique_texts]
+                owned_results = [future.result() for future in futures]
+            else:
+                owned_results = run_finbert(unique_texts, batch_size=batch_size, max_tokens=max_tokens)
+            
+            for key, result in zip(keys, owned_results):
+                # Error fallbacks carry no probabilities and are not cached
+                if 'positive' in result:
+                    sentiment_cache.put(key, result)
+                scored[key] = result
+                finbert_flights.finish(key, owned[key], result=result)
+    finally:
+        # Never leave waiters hanging if scoring raised part-way
+        for key in keys:
+            if key not in scored:
+                finbert_flights.finish(key, owned[key], result={'label': 'neutral', 'score': 0.0})
+    
+    for key, flight in joined.items():
+        scored[key] = flight.wait()
+    
+    for key, result in scored.items():
+        for j in pending[key]:
+            results[j] = dict(result)
+    
+    return results
+
+
+def tokenize_batches(texts: list, batch_size: int = 32, max_tokens: int = 4096) -> list:
+    """
+    Tokenize texts once and group them into length-bucketed batches
+    Returns (indices, texts, features) per batch, ready for one padded
+    forward pass each
+    """
     load_finbert()
     
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        for text in batch:
-            results.append(analyze_finbert_sentiment(text))
+    encodings = finbert_tokenizer(texts, truncation=True, max_length=512)
+    lengths = [len(ids) for ids in encodings['input_ids']]
+    
+    return [
+        (batch, [texts[i] for i in batch], [{key: encodings[key][i] for key in encodings.keys()} for i in batch])
+        for batch in schedule_batches(lengths, max_tokens=max_tokens, max_batch_size=batch_size)
+    ]
+
+
+def score_finbert_texts(texts: list, batch_size: int = 32, max_tokens: int = 4096) -> list:
+    """
+    Score non-empty texts with FinBERT, bypassing caches and single-flight
+    Texts are tokenized once and run in length-bucketed batches
+    """
+    results = [None] * len(texts)
+    for batch, batch_texts, features in tokenize_batches(texts, batch_size=batch_size, max_tokens=max_tokens):
+        for i, result in zip(batch, _score_finbert_batch(batch_texts, features)):
+            results[i] = result
     
     return results
+
+
+def run_finbert(texts: list, batch_size: int = 32, max_tokens: int = 4096) -> list:
+    """
+    Score non-empty texts in this process or, with FINBERT_PROCESSES > 1,
+    across the multi-process inference pool
+    """
+    if FINBERT_PROCESSES > 1:
+        from inference_pool import get_finbert_pool
+        return get_finbert_pool().score(texts, batch_size=batch_size, max_tokens=max_tokens)
+    return score_finbert_texts(texts, batch_size=batch_size, max_tokens=max_tokens)
+
+
+def pool_windows(probs: np.ndarray, lengths: np.ndarray, method: str = 'mean') -> np.ndarray:
+    """
+    Combine (windows, 3) class probabilities of one text into one row
+    mean: plain average; length: average weighted by window token count, so
+    a short tail window counts less; max: per-class maximum, renormalized,
+    so one strongly polar passage is not averaged away
+    """
+    if method == 'mean':
+        return probs.mean(axis=0)
+    if method == 'length':
+        return np.average(probs, axis=0, weights=lengths)
+    if method == 'max':
+        pooled = probs.max(axis=0)
+        return pooled / pooled.sum()
+    raise ValueError(f"Unknown pooling method: {method}")
+
+
+def score_finbert_long(texts: list, pooling: str = 'mean', overlap: int = FINBERT_WINDOW_OVERLAP,
+                       max_windows: int = FINBERT_MAX_WINDOWS, batch_size: int = 32,
+                       max_tokens: int = 4096) -> list:
+    """
+    Score non-empty texts of any length with FinBERT, bypassing caches
+    Each text is split into overlapping 512-token windows; the windows of
+    all texts are length-bucketed and run together, and each text's window
+    probabilities are pooled. Results carry the number of windows scored.
+    """
+    load_finbert()
+    
+    encodings = finbert_tokenizer(texts, truncation=True, max_length=512, stride=overlap,
+                                  return_overflowing_tokens=True)
+    owners = encodings.pop('overflow_to_sample_mapping')
+    
+    # Keep the first max_windows windows of each text
+    windows = []
+    counts = [0] * len(texts)
+    for window, owner in enumerate(owners):
+        if counts[owner] < max_windows:
+            counts[owner] += 1
+            windows.append(window)
+    
+    lengths = [len(encodings['input_ids'][window]) for window in windows]
+    probs = np.full((len(windows), 3), np.nan)
+    for batch in schedule_batches(lengths, max_tokens=max_tokens, max_batch_size=batch_size):
+        features = [{key: encodings[key][windows[i]] for key in encodings.keys()} for i in batch]
+        try:
+            inputs = finbert_tokenizer.pad(features, padding=True, return_tensors=finbert_backend.return_tensors)
+            probs[batch] = finbert_backend.predict_proba(inputs)
+        except Exception as e:
+            print(f"Error in windowed FinBERT analysis: {str(e)}")
+    
+    window_owners = np.array([owners[window] for window in windows])
+    lengths = np.array(lengths)
+    results = []
+    for i in range(len(texts)):
+        mine = window_owners == i
+        # Texts with a failed window fall back to neutral, uncached
+        if np.isnan(probs[mine]).any():
+            results.append({'label': 'neutral', 'score': 0.0})
+            continue
+        
+        pooled = pool_windows(probs[mine], lengths[mine], pooling)
+        # FinBERT labels: 0=positive, 1=negative, 2=neutral
+        predicted = int(np.argmax(pooled))
+        results.append({
+            'label': ('positive', 'negative', 'neutral')[predicted],
+            'score': float(pooled[predicted]),
+            'positive': float(pooled[0]),
+            'negative': float(pooled[1]),
+            'neutral': float(pooled[2]),
+            'windows': counts[i]
+        })
+    
+    return results
+
+
+def batch_analyze_finbert_long(texts: list, pooling: str = 'mean', batch_size: int = 32,
+                               max_tokens: int = 4096) -> list:
+    """
+    Batch analyze texts with FinBERT over their full length (see score_finbert_long)
+    Results are cached per pooling method; repeated texts are scored once.
+    Windows always run in this process, not on the worker or process pool.
+    """
+    if pooling not in POOLING_METHODS:
+        raise ValueError(f"Unknown pooling method: {pooling}")
+    
+    mode = f"window-{FINBERT_WINDOW_OVERLAP}x{FINBERT_MAX_WINDOWS}-{pooling}"
+    results = [{'label': 'neutral', 'score': 0.0} for _ in texts]
+    
+    pending = {}
+    for i, text in enumerate(texts):
+        if not text or not text.strip():
+            continue
+        cache_key = finbert_cache_key(text, mode)
+        if cache_key in pending:
+            pending[cache_key].append(i)
+            continue
+        cached = sentiment_cache.get(cache_key)
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending[cache_key] = [i]
+    
+    if not pending:
+        return results
+    
+    keys = list(pending)
+    scored = score_finbert_long([texts[pending[key][0]] for key in keys], pooling=pooling,
+                                batch_size=batch_size, max_tokens=max_tokens)
+    for key, result in zip(keys, scored):
+        if 'positive' in result:
+            sentiment_cache.put(key, result)
+        for j in pending[key]:
+            results[j] = dict(result)
+    
+    return results
+
+
+def _score_finbert_batch(batch: list, features: list) -> list:
+    """
+    Run one padded forward pass over pre-tokenized features
+    Falls back to per-text scoring if the batched call fails
+    """
+    try:
+        inputs = finbert_tokenizer.pad(features, padding=True, return_tensors=finbert_backend.return_tensors)
+        probs = finbert_backend.predict_proba(inputs)
+        
+        # FinBERT labels: 0=positive, 1=negative, 2=neutral
+        predicted = np.argmax(probs, axis=1)
+        confidences = probs[np.arange(len(batch)), predicted]
+        labels = np.array(['positive', 'negative', 'neutral'])[predicted]
+        
+        return [
+            {
+                'label': str(label),
+                'score': float(confidence),
+                'positive': float(row[0]),
+                'negative': float(row[1]),
+                'neutral': float(row[2])
+            }
+            for label, confidence, row in zip(labels, confidences, probs)
+        ]
+        
+    except Exception as e:
+        print(f"Error in batched FinBERT analysis: {str(e)}")
+        return [_score_finbert_text(text) for text in batch]
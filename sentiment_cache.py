@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for cache keys
+    Only unicode form and whitespace are normalized; case is kept because
+    VADER scores ALL CAPS words differently
+    """
+    text = unicodedata.normalize('NFC', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def make_key(model_id: str, mode: str, text: str) -> str:
+    """
+    Content-addressed cache key: hash of (model id, analysis mode, normalized text)
+    """
+    payload = f"{model_id}\x00{mode}\x00{normalize_text(text)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SentimentCache:
+    """
+    Two-tier cache for sentiment results
+    A bounded in-memory LRU sits in front of an optional SQLite file that
+    survives process restarts. Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int = 50000, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment_cache (key TEXT PRIMARY KEY, result TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Return a copy of the cached result, or None on a miss
+        """
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return dict(result)
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT result FROM sentiment_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    result = json.loads(row[0])
+                    self._remember(key, result)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return dict(result)
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, result: Dict):
+        """
+        Store a result in memory and, if configured, on disk
+        """
+        with self._lock:
+            self._remember(key, dict(result))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sentiment_cache (key, result) VALUES (?, ?)",
+                    (key, json.dumps(result))
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, result: Dict):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self, disk: bool = False):
+        """
+        Drop the in-memory tier (and the disk tier if disk=True)
+        """
+        with self._lock:
+            self._memory.clear()
+            if disk and self._db is not None:
+                self._db.execute("DELETE FROM sentiment_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        """
+        Hit/miss counters for reporting
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._memory)
+            }
+
+
+# Shared cache; set SENTIMENT_CACHE_DB to a file path to persist results
+sentiment_cache = SentimentCache(
+    max_entries=int(os.environ.get('SENTIMENT_CACHE_SIZE', 50000)),
+    db_path=os.environ.get('SENTIMENT_CACHE_DB')
+)
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class Flight:
+    """
+    One in-progress computation that other callers can wait on
+    """
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self.result = None
+        self.error = None
+
+    def add_done_callback(self, callback: Callable[[], None]):
+        """
+        Call callback() once the flight finishes (right away if it has)
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def set_done(self):
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def wait(self, timeout: float = None) -> Any:
+        """
+        Block until the leader finishes; re-raise its error if it failed
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError("timed out waiting for in-flight computation")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    async def wait_async(self) -> Any:
+        """
+        wait() for coroutines: suspends instead of blocking the event loop
+        """
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def wake():
+            if not done.done():
+                done.set_result(None)
+
+        self.add_done_callback(lambda: loop.call_soon_threadsafe(wake))
+        await done
+        return self.wait(0)
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls by key
+    The first caller for a key (the leader) runs the computation; callers
+    arriving while it runs wait for the leader's result instead of
+    repeating the work. Results are shared, so callers that mutate them
+    must copy first.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.deduplicated = 0
+
+    def begin(self, key: Hashable) -> Tuple[Flight, bool]:
+        """
+        Join or start the flight for key; returns (flight, is_leader)
+        A leader must call finish() exactly once.
+        """
+        with self._lock:
+            self.calls += 1
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                self.deduplicated += 1
+                return flight, False
+            flight = self._in_flight[key] = Flight()
+            return flight, True
+
+    def finish(self, key: Hashable, flight: Flight, result: Any = None, error: Exception = None):
+        """
+        Publish the leader's outcome and wake all waiters
+        """
+        with self._lock:
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+        flight.result = result
+        flight.error = error
+        flight.set_done()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn() once for all concurrent callers with the same key
+        """
+        flight, leader = self.begin(key)
+        if not leader:
+            return flight.wait()
+
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(key, flight, error=e)
+            raise
+        self.finish(key, flight, result=result)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable]) -> Any:
+        """
+        do() for coroutine functions: callers waiting on the leader suspend
+        instead of blocking the event loop. Flights are shared with do(), so
+        sync and async callers of the same key coalesce too
+        """
+        flight, leader = self.begin(key)
+        if not leader:
+            return await flight.wait_async()
+
+        try:
+            result = await fn()
+        except Exception as e:
+            self.finish(key, flight, error=e)
+            raise
+        except asyncio.CancelledError:
+            self.finish(key, flight, error=RuntimeError(f"in-flight computation for {key!r} was cancelled"))
+            raise
+        self.finish(key, flight, result=result)
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'deduplicated': self.deduplicated,
+                'in_flight': len(self._in_flight)
+            }
@@ -0,0 +1,131 @@
+import importlib
+import threading
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+# Page URLs per built-in source
+FINVIZ_URL = "https://finviz.com/quote.ashx?t={ticker}"
+YAHOO_URL = "https://finance.yahoo.com/quote/{ticker}"
+GOOGLE_NEWS_URL = "https://news.google.com/search?q={ticker} stock news&hl=en-US&gl=US&ceid=US:en"
+
+# RSS feeds: a few KB of XML per ticker instead of a full HTML page
+YAHOO_RSS_URL = "https://feeds.finance.yahoo.com/rss/2.0/headline?s={ticker}&region=US&lang=en-US"
+GOOGLE_NEWS_RSS_URL = "https://news.google.com/rss/search?q={ticker}+stock&hl=en-US&gl=US&ceid=US:en"
+
+
+class NewsSource:
+    """
+    A news source the scrapers and the fetch orchestrator can run
+    url is a page template with {ticker}; parse(html, max_articles) turns
+    the page into news item dicts and may be given as 'module:function' so
+    heavy parser imports wait until the first scrape. rate (requests per
+    second), burst and concurrency bound requests to host; needs_bodies
+    makes scrapers fetch article bodies for new items; newest_first means
+    a scan can stop at the first already-seen item; label is shown in the app.
+    Feeds that serve several tickers per request set tickers_per_request;
+    their url then gets a comma list of tickers and items are attributed
+    to tickers with feed_parsing.assign_tickers.
+    """
+
+    def __init__(self, name: str, key: str, url: str, parse: Union[str, Callable],
+                 host: Optional[str] = None, rate: float = 2.0, burst: int = 2, concurrency: int = 2,
+                 needs_bodies: bool = False, newest_first: bool = True, timeout: float = 10,
+                 default_enabled: bool = True, label: Optional[str] = None, tickers_per_request: int = 1):
+        self.name = name
+        self.label = label or name
+        self.key = key
+        self.url = url
+        self.host = host or urlparse(url).hostname or name
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.needs_bodies = needs_bodies
+        self.newest_first = newest_first
+        self.timeout = timeout
+        self.default_enabled = default_enabled
+        self.tickers_per_request = tickers_per_request
+        self._parse = parse
+
+    def parse(self, html: bytes, max_articles: int = 5) -> List[Dict]:
+        if isinstance(self._parse, str):
+            module, function = self._parse.split(':')
+            self._parse = getattr(importlib.import_module(module), function)
+        return self._parse(html, max_articles)
+
+    def page_url(self, ticker: str) -> str:
+        return self.url.format(ticker=ticker)
+
+    def limits(self) -> Tuple[float, int, int]:
+        return self.rate, self.burst, self.concurrency
+
+    def __repr__(self):
+        return f"NewsSource({self.name!r}, host={self.host!r})"
+
+
+_sources = {}  # name -> NewsSource, in registration order
+_sources_lock = threading.Lock()
+
+
+def register_source(source: NewsSource) -> NewsSource:
+    """
+    Add a source, or replace the one with the same name
+    """
+    with _sources_lock:
+        _sources[source.name] = source
+    return source
+
+
+def unregister_source(name: str):
+    with _sources_lock:
+        _sources.pop(name, None)
+
+
+def get_source(name: str) -> NewsSource:
+    """
+    Source by display name or short key; raises KeyError if unknown
+    """
+    with _sources_lock:
+        if name in _sources:
+            return _sources[name]
+        for source in _sources.values():
+            if source.key == name.lower():
+                return source
+    raise KeyError(name)
+
+
+def all_sources() -> List[NewsSource]:
+    with _sources_lock:
+        return list(_sources.values())
+
+
+def source_names(default_only: bool = False) -> List[str]:
+    return [source.name for source in all_sources() if source.default_enabled or not default_only]
+
+
+def host_limits() -> Dict[str, Tuple[float, int, int]]:
+    """
+    Per-host (rate, burst, concurrency) of all registered sources
+    """
+    return {source.host: source.limits() for source in all_sources()}
+
+
+register_source(NewsSource(
+    "Finviz", 'finviz', FINVIZ_URL, 'news_scrapers:parse_finviz', needs_bodies=True, label="Finviz.com"
+))
+register_source(NewsSource(
+    "Yahoo Finance", 'yahoo', YAHOO_URL, 'news_scrapers:parse_yahoo', needs_bodies=True
+))
+# Search results are ordered by relevance, so known items are skipped
+# rather than ending the scan
+register_source(NewsSource(
+    "Google News", 'google', GOOGLE_NEWS_URL, 'news_scrapers:parse_google_news', newest_first=False
+))
+# Feed alternatives to the HTML pages: headlines, links and publish times
+# only, so no article bodies are fetched
+register_source(NewsSource(
+    "Yahoo Finance RSS", 'yahoo-rss', YAHOO_RSS_URL, 'feed_parsing:parse_feed', default_enabled=False
+))
+register_source(NewsSource(
+    "Google News RSS", 'google-rss', GOOGLE_NEWS_RSS_URL, 'feed_parsing:parse_feed', newest_first=False,
+    default_enabled=False
+))
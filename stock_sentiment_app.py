@@ -2,14 +2,22 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import time
+import os
 from typing import List, Dict, Tuple
-import concurrent.futures
 from functools import lru_cache
 
 # Import custom modules
-from news_scrapers import scrape_finviz, scrape_google_news
-from sentiment_analyzer import analyze_vader_sentiment, analyze_finbert_sentiment
+import sentiment_analyzer
+from sentiment_analyzer import finbert_flights
+from sentiment_cache import sentiment_cache
+from scrape_cache import scrape_cache
+from watermark_store import watermark_store
+from history_store import get_history_store
 from utils import validate_ticker, format_results
+from fetch_orchestrator import SourceSkipped
+from results_frame import build_results_frame, summary_table
+from pipeline import run_pipeline, ANALYSIS_MODES, DEFAULT_HEADLINE_WEIGHT
+from source_registry import all_sources
 
 # Page configuration
 st.set_page_config(
@@ -19,10 +27,12 @@ st.set_page_config(
 )
 
 # Initialize session state
-if 'results_history' not in st.session_state:
-    st.session_state.results_history = []
-if 'cache' not in st.session_state:
-    st.session_state.cache = {}
+if 'last_run' not in st.session_state:
+    st.session_state.last_run = None
+
+# Load FinBERT in the background while the user types tickers (FINBERT_WARMUP=0 to disable)
+if os.environ.get('FINBERT_WARMUP', '1') == '1':
+    sentiment_analyzer.start_warmup()
 
 # Helper function for sentiment indicators
 def get_sentiment_indicator(sentiment: str) -> str:
@@ -41,6 +51,121 @@ def make_clickable(url, text):
         return f'<a href="{url}" target="_blank">{text}</a>'
     return text
 
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Long-article scoring choices -> pooling method (None keeps the lead paragraph only)
+LONG_DOCUMENT_OPTIONS = {
+    "Lead paragraph only": None,
+    "Full article, mean of windows": 'mean',
+    "Full article, length-weighted": 'length',
+    "Full article, max pooling": 'max',
+}
+
+def render_results(run: Dict, count_duplicates: bool = True):
+    """
+    Render the summary and paginated detail table of a finished run
+    Widget changes rerun the script; they only slice the stored tables
+    """
+    summary_df = run['summary']
+    if run['dedup'] is not None:
+        # Counting duplicates is a display choice; regroup the stored results
+        summary_df = summary_table(run['results'], count_duplicates)
+    detailed_df = run['detailed']
+    
+    # Display summary
+    st.header("📊 Summary Results")
+    st.dataframe(summary_df, use_container_width=True)
+    
+    # Download summary
+    csv_summary = summary_df.to_csv(index=False)
+    st.download_button(
+        label="📥 Download Summary as CSV",
+        data=csv_summary,
+        file_name=f"sentiment_summary_{run['timestamp'].strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv"
+    )
+    
+    # Detailed results
+    st.header("📰 Detailed News Analysis")
+    
+    filter_col, size_col, page_col = st.columns([2, 1, 1])
+    with filter_col:
+        # Ticker filter for detailed view
+        selected_ticker = st.selectbox(
+            "Filter by ticker:",
+            ['All'] + run['tickers']
+        )
+    
+    # Filter results
+    if selected_ticker != 'All':
+        filtered_df = detailed_df[detailed_df['Ticker'] == selected_ticker]
+    else:
+        filtered_df = detailed_df
+    
+    with size_col:
+        page_size = st.selectbox("Rows per page:", PAGE_SIZES)
+    page_count = max(1, -(-len(filtered_df) // page_size))
+    with page_col:
+        page = st.number_input("Page:", min_value=1, max_value=page_count, value=1, step=1)
+    
+    # One table for the current page, with sentiment indicators and clickable links
+    page_df = filtered_df.iloc[(page - 1) * page_size:page * page_size].copy()
+    for column in ('VADER Sentiment', 'FinBERT Sentiment'):
+        page_df[column] = page_df[column].map(lambda sentiment: f"{get_sentiment_indicator(sentiment)} {sentiment}")
+    st.dataframe(
+        page_df,
+        column_config={'URL': st.column_config.LinkColumn('URL')},
+        hide_index=True,
+        use_container_width=True
+    )
+    st.caption(f"Page {page} of {page_count} ({len(filtered_df)} articles)")
+    missing_link = ~page_df['URL'].fillna('').str.startswith('http')
+    if (missing_link & page_df['Source'].str.startswith('Google News')).any():
+        st.caption("⚠️ Google News rows without a link are Google News redirects")
+    
+    # Also provide downloadable detailed CSV
+    csv_detailed = filtered_df.to_csv(index=False)
+    st.download_button(
+        label="📥 Download Detailed Results as CSV",
+        data=csv_detailed,
+        file_name=f"sentiment_detailed_{run['timestamp'].strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv"
+    )
+
+TREND_LOOKBACK_DAYS = 90
+
+def render_trends(history):
+    """
+    Sentiment trend charts read from the history store; nothing is rescraped
+    """
+    if not history.has_history():
+        return
+    
+    st.header("📈 Sentiment Trends")
+    known_tickers = history.tickers()
+    recent = st.session_state.last_run['tickers'] if st.session_state.last_run is not None else []
+    default = [ticker for ticker in recent if ticker in known_tickers][:5] or known_tickers[:5]
+    
+    ticker_col, model_col, window_col = st.columns([2, 1, 1])
+    with ticker_col:
+        trend_tickers = st.multiselect("Tickers:", known_tickers, default=default)
+    with model_col:
+        trend_model = st.selectbox("Model:", ['finbert', 'vader'], format_func=lambda m: 'FinBERT' if m == 'finbert' else 'VADER')
+    with window_col:
+        window_days = st.slider("Rolling window (days):", 1, 30, 7)
+    
+    if trend_tickers:
+        rolled = history.rolling(trend_tickers, trend_model, window_days,
+                                 start=time.time() - TREND_LOOKBACK_DAYS * 86400)
+        if not rolled.empty:
+            st.line_chart(rolled.pivot(index='date', columns='ticker', values='net'))
+            st.caption("Net sentiment = (positive − negative) / articles in the rolling window")
+    
+    movers = history.top_movers(trend_model, window_days)
+    if not movers.empty:
+        st.subheader("Top movers")
+        st.dataframe(movers, hide_index=True, use_container_width=True)
+
 # Title and description
 st.title("📈 Stock News Sentiment Analyzer")
 st.markdown("Analyze news sentiment for multiple stocks using VADER and FinBERT")
@@ -58,8 +183,9 @@ with st.sidebar:
     
     # News sources selection
     st.subheader("News Sources")
-    use_finviz = st.checkbox("Finviz.com", value=True)
-    use_google = st.checkbox("Google News", value=True)
+    # One checkbox per registered source (see source_registry)
+    sources = [source.name for source in all_sources()
+               if st.checkbox(source.label, value=source.default_enabled)]
     
     # News count selection
     st.subheader("News Count")
@@ -75,18 +201,83 @@ with st.sidebar:
     st.subheader("Analysis Options")
     analysis_mode = st.radio(
         "Analyze sentiment on:",
-        ["Headlines Only", "Full Content", "Both (Averaged)"]
+        ANALYSIS_MODES
+    )
+    
+    headline_weight = st.slider(
+        "Headline weight",
+        0.0, 1.0, DEFAULT_HEADLINE_WEIGHT, 0.05,
+        disabled=analysis_mode != "Both (Averaged)",
+        help="Share of the headline in the blended score; the article body gets the rest"
+    )
+    
+    long_documents = LONG_DOCUMENT_OPTIONS[st.selectbox(
+        "Long articles",
+        list(LONG_DOCUMENT_OPTIONS),
+        disabled=analysis_mode == "Headlines Only",
+        help="Score whole article bodies in overlapping FinBERT windows instead of the first 1000 characters (slower)"
+    )]
+    
+    incremental = st.checkbox(
+        "Show summary rows as tickers finish",
+        value=True,
+        help="Update the summary table while the analysis is still running"
+    )
+    
+    dedup_stories = st.checkbox(
+        "Merge near-duplicate stories",
+        value=True,
+        help="Score reworded or syndicated copies of a story once and reuse the result"
+    )
+    count_duplicates = st.checkbox(
+        "Count duplicate stories in summary",
+        value=False,
+        disabled=not dedup_stories,
+        help="Count every copy of a story instead of one per ticker"
     )
     
     # Cache settings
     st.subheader("Cache Settings")
     cache_duration = st.slider("Cache duration (minutes)", 5, 60, 15)
+    incremental_refresh = st.checkbox(
+        "Only fetch new articles",
+        value=False,
+        help="Remember articles from earlier runs; only newer ones are fetched and scored"
+    )
     clear_cache = st.button("Clear Cache")
     
     if clear_cache:
-        st.session_state.cache = {}
+        scrape_cache.clear()
+        sentiment_cache.clear()
+        watermark_store.clear()
         st.success("Cache cleared!")
     
+    cache_stats = sentiment_cache.stats()
+    st.caption(
+        f"Sentiment cache: {cache_stats['entries']} entries, "
+        f"{cache_stats['hits']} hits / {cache_stats['misses']} misses / "
+        f"{finbert_flights.stats()['deduplicated']} shared inferences"
+    )
+    scrape_stats = scrape_cache.stats()
+    st.caption(
+        f"Scrape cache: {scrape_stats['entries']} entries, "
+        f"{scrape_stats['hits']} hits / {scrape_stats['misses']} misses / "
+        f"{scrape_stats['coalesced']} shared fetches"
+    )
+    if incremental_refresh:
+        watermark_stats = watermark_store.stats()
+        st.caption(
+            f"Seen articles: {watermark_stats['items']} stored, "
+            f"{watermark_stats['new']} new / {watermark_stats['reused']} reused scores"
+        )
+    if sentiment_analyzer.FINBERT_WORKER:
+        worker_stats = sentiment_analyzer.get_finbert_worker().stats()
+        st.caption(
+            f"FinBERT worker: queue {worker_stats['queue_depth']}, "
+            f"fill {worker_stats['fill_ratio'] * 100:.0f}%, "
+            f"p50 {worker_stats['p50_ms']:.0f} ms / p99 {worker_stats['p99_ms']:.0f} ms"
+        )
+    
     # Run analysis button
     analyze_button = st.button("🚀 Analyze Sentiment", type="primary", use_container_width=True)
 
@@ -100,215 +291,82 @@ if analyze_button:
         tickers = [t.strip().upper() for t in ticker_input.replace(',', ' ').split() if t.strip()]
         tickers = list(dict.fromkeys(tickers))[:30]  # Remove duplicates and limit to 30
         
-        if not any([use_finviz, use_google]):
+        if not sources:
             st.error("Please select at least one news source")
         else:
-            st.info(f"Analyzing {len(tickers)} ticker(s) from {sum([use_finviz, use_google])} source(s)... ({news_per_source} articles per source)")
+            st.info(f"Analyzing {len(tickers)} ticker(s) from {len(sources)} source(s)... ({news_per_source} articles per source)")
             
             # Create progress tracking
             progress_bar = st.progress(0)
             status_text = st.empty()
+            live_summary = st.empty()
+            live_rows = []
             
-            # Collect news sources
-            sources = []
-            if use_finviz:
-                sources.append(('Finviz', scrape_finviz))
-            if use_google:
-                sources.append(('Google News', scrape_google_news))
-            
-            # Process tickers
-            all_results = []
-            total_tasks = len(tickers)
+            processed = []
             
-            start_time = time.time()
-            
-            for idx, ticker in enumerate(tickers):
-                status_text.text(f"Processing {ticker} ({idx + 1}/{total_tasks})...")
-                
-                ticker_news = []
+            def show_ticker(ticker: str, ticker_news: List[Dict]):
+                """Progress and live summary row for one scored ticker"""
+                processed.append(ticker)
                 
-                # Scrape news from each source
-                for source_name, scraper_func in sources:
-                    cache_key = f"{ticker}_{source_name}_{news_per_source}_{datetime.now().strftime('%Y%m%d%H%M')[:11]}"  # Cache per 10 min
-                    
-                    # Check cache
-                    if cache_key in st.session_state.cache:
-                        news_items = st.session_state.cache[cache_key]
-                    else:
-                        try:
-                            news_items = scraper_func(ticker, max_articles=news_per_source)
-                            st.session_state.cache[cache_key] = news_items
-                        except Exception as e:
-                            st.warning(f"Error scraping {source_name} for {ticker}: {str(e)}")
-                            news_items = []
-                    
-                    ticker_news.extend(news_items)
-                
-                # Analyze sentiment for each news item
-                if ticker_news:
-                    for news in ticker_news:
-                        # Determine what to analyze
-                        if analysis_mode == "Headlines Only":
-                            text_to_analyze = news['headline']
-                        elif analysis_mode == "Full Content":
-                            text_to_analyze = news.get('content', news['headline'])
-                        else:  # Both (Averaged)
-                            text_to_analyze = news['headline'] + " " + news.get('content', '')
-                        
-                        # VADER sentiment
-                        vader_result = analyze_vader_sentiment(text_to_analyze)
-                        news['vader_sentiment'] = vader_result['label']
-                        news['vader_score'] = vader_result['compound']
-                        
-                        # FinBERT sentiment
-                        finbert_result = analyze_finbert_sentiment(text_to_analyze)
-                        news['finbert_sentiment'] = finbert_result['label']
-                        news['finbert_score'] = finbert_result['score']
-                        
-                        news['ticker'] = ticker
-                    
-                    all_results.extend(ticker_news)
+                # Show this ticker's summary row right away
+                if incremental and ticker_news:
+                    live_rows.append(summary_table(build_results_frame(ticker_news, [ticker]), count_duplicates))
+                    live_summary.dataframe(pd.concat(live_rows, ignore_index=True), use_container_width=True)
                 
                 # Update progress
-                progress_bar.progress((idx + 1) / total_tasks)
+                status_text.text(f"Processed {ticker} ({len(processed)}/{len(tickers)})...")
+                progress_bar.progress(len(processed) / len(tickers))
             
-            elapsed_time = time.time() - start_time
-            status_text.text(f"✅ Analysis complete in {elapsed_time:.2f} seconds!")
+            skipped_sources = set()
             
-            # Process results
-            if all_results:
-                # Create summary DataFrame
-                summary_data = []
-                
-                for ticker in tickers:
-                    ticker_results = [r for r in all_results if r['ticker'] == ticker]
-                    
-                    if ticker_results:
-                        vader_pos = sum(1 for r in ticker_results if r['vader_sentiment'] == 'positive')
-                        vader_neg = sum(1 for r in ticker_results if r['vader_sentiment'] == 'negative')
-                        vader_neu = sum(1 for r in ticker_results if r['vader_sentiment'] == 'neutral')
-                        
-                        finbert_pos = sum(1 for r in ticker_results if r['finbert_sentiment'] == 'positive')
-                        finbert_neg = sum(1 for r in ticker_results if r['finbert_sentiment'] == 'negative')
-                        finbert_neu = sum(1 for r in ticker_results if r['finbert_sentiment'] == 'neutral')
-                        
-                        # Calculate sentiment ratios (positive to negative)
-                        vader_ratio = vader_pos / vader_neg if vader_neg > 0 else (float('inf') if vader_pos > 0 else 0)
-                        finbert_ratio = finbert_pos / finbert_neg if finbert_neg > 0 else (float('inf') if finbert_pos > 0 else 0)
-                        
-                        summary_data.append({
-                            'Ticker': ticker,
-                            'Total News': len(ticker_results),
-                            'VADER Positive': vader_pos,
-                            'VADER Negative': vader_neg,
-                            'VADER Neutral': vader_neu,
-                            'VADER Ratio (P/N)': f"{vader_ratio:.2f}" if vader_ratio != float('inf') else "∞",
-                            'FinBERT Positive': finbert_pos,
-                            'FinBERT Negative': finbert_neg,
-                            'FinBERT Neutral': finbert_neu,
-                            'FinBERT Ratio (P/N)': f"{finbert_ratio:.2f}" if finbert_ratio != float('inf') else "∞"
-                        })
-                
-                summary_df = pd.DataFrame(summary_data)
-                
-                # Sort by sentiment ratio (using FinBERT as primary)
-                summary_df['_finbert_ratio_numeric'] = summary_df['FinBERT Ratio (P/N)'].apply(
-                    lambda x: float('inf') if x == "∞" else float(x)
-                )
-                summary_df = summary_df.sort_values('_finbert_ratio_numeric', ascending=False)
-                summary_df = summary_df.drop('_finbert_ratio_numeric', axis=1)
-                
-                # Display summary
-                st.header("📊 Summary Results")
-                st.dataframe(summary_df, use_container_width=True)
-                
-                # Download summary
-                csv_summary = summary_df.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Summary as CSV",
-                    data=csv_summary,
-                    file_name=f"sentiment_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv"
-                )
-                
-                # Detailed results
-                st.header("📰 Detailed News Analysis")
-                
-                # Ticker filter for detailed view
-                selected_ticker = st.selectbox(
-                    "Filter by ticker:",
-                    ['All'] + tickers
-                )
-                
-                # Filter results
-                if selected_ticker != 'All':
-                    filtered_results = [r for r in all_results if r['ticker'] == selected_ticker]
-                else:
-                    filtered_results = all_results
-                
-                # Create detailed display with HTML for clickable links and sentiment indicators
-                for item in filtered_results:
-                    with st.container():
-                        col1, col2, col3 = st.columns([3, 1, 1])
-                        
-                        with col1:
-                            # Clickable headline if URL available, otherwise just show headline
-                            if item.get('url') and item['url'].startswith('http'):
-                                st.markdown(f"**[{item['headline']}]({item['url']})**")
-                            else:
-                                st.markdown(f"**{item['headline']}**")
-                                if item['source'] == 'Google News':
-                                    st.caption(f"⚠️ Link unavailable - Google News redirect")
-                            st.caption(f"{item['ticker']} | {item['source']} | {item.get('date', 'N/A')}")
-                        
-                        with col2:
-                            st.markdown("**VADER**")
-                            vader_indicator = get_sentiment_indicator(item['vader_sentiment'])
-                            st.markdown(f"{vader_indicator} {item['vader_score']:.3f}")
-                        
-                        with col3:
-                            st.markdown("**FinBERT**")
-                            finbert_indicator = get_sentiment_indicator(item['finbert_sentiment'])
-                            st.markdown(f"{finbert_indicator} {item['finbert_score']:.3f}")
-                        
-                        st.divider()
-                
-                # Also provide downloadable detailed CSV
-                detailed_data = []
-                for item in filtered_results:
-                    detailed_data.append({
-                        'Ticker': item['ticker'],
-                        'Source': item['source'],
-                        'Headline': item['headline'],
-                        'Date': item.get('date', 'N/A'),
-                        'VADER Sentiment': item['vader_sentiment'],
-                        'VADER Score': f"{item['vader_score']:.3f}",
-                        'FinBERT Sentiment': item['finbert_sentiment'],
-                        'FinBERT Score': f"{item['finbert_score']:.3f}",
-                        'URL': item.get('url', '')
-                    })
-                
-                detailed_df = pd.DataFrame(detailed_data)
-                
-                # Download detailed results
-                csv_detailed = detailed_df.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Detailed Results as CSV",
-                    data=csv_detailed,
-                    file_name=f"sentiment_detailed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv"
+            def show_error(ticker: str, source_name: str, error: Exception):
+                # One warning per skipped source rather than one per remaining ticker
+                if isinstance(error, SourceSkipped):
+                    if source_name not in skipped_sources:
+                        skipped_sources.add(source_name)
+                        st.warning(str(error))
+                    return
+                st.warning(f"Error scraping {source_name} for {ticker}: {str(error)}")
+            
+            run = run_pipeline(
+                tickers,
+                sources=sources,
+                max_articles=news_per_source,
+                mode=analysis_mode,
+                cache_ttl=cache_duration * 60,
+                watermarks=watermark_store if incremental_refresh else None,
+                history=get_history_store(),
+                dedup=dedup_stories,
+                count_duplicates=count_duplicates,
+                long_documents=long_documents,
+                headline_weight=headline_weight,
+                on_ticker=show_ticker,
+                on_error=show_error
+            )
+            
+            status_text.text(f"✅ Analysis complete in {run['timings']['total']:.2f} seconds!")
+            if run['dedup'] is not None and run['dedup']['duplicates']:
+                st.caption(
+                    f"{run['dedup']['clusters']} distinct stories, "
+                    f"{run['dedup']['duplicates']} near-duplicates scored once"
                 )
-                
-                # Store in session state
-                st.session_state.results_history.append({
-                    'timestamp': datetime.now(),
-                    'tickers': tickers,
-                    'summary': summary_df,
-                    'detailed': detailed_df
-                })
+            
+            live_summary.empty()
+            
+            # Process results
+            if len(run['results']):
+                # Keep the run so filter and page changes rerender without reprocessing
+                st.session_state.last_run = run
             else:
+                st.session_state.last_run = None
                 st.warning("No news articles found for the specified tickers.")
 
+if st.session_state.last_run is not None:
+    render_results(st.session_state.last_run, count_duplicates)
+
+# History is kept on disk, so trends survive reruns and browser refreshes
+render_trends(get_history_store())
+
 # Footer
 st.markdown("---")
-st.markdown("Built with Streamlit | Data sources: Finviz, Google News")
+st.markdown(f"Built with Streamlit | Data sources: {', '.join(source.name for source in all_sources())}")
@@ -3,6 +3,7 @@ Test script to verify all components work correctly
 Run this before deploying to catch any issues
 """
 
+import os
 import sys
 
 def test_imports():
@@ -114,6 +115,1182 @@ def test_sentiment_analysis():
         return False
 
 
+def test_batch_analysis():
+    """Test that batched FinBERT matches per-text FinBERT"""
+    print("\nTesting batch analysis...")
+    
+    try:
+        from sentiment_analyzer import analyze_finbert_sentiment, batch_analyze_finbert
+        from sentiment_cache import sentiment_cache
+        
+        texts = [
+            "Apple Inc. reported strong quarterly earnings, exceeding analyst expectations.",
+            "",
+            "Shares plunged after the company cut its full-year guidance.",
+            "The board will meet on Tuesday."
+        ]
+        
+        sentiment_cache.clear()
+        batch_results = batch_analyze_finbert(texts, batch_size=2)
+        sentiment_cache.clear()
+        single_results = [analyze_finbert_sentiment(text) for text in texts]
+        
+        for batch_result, single_result in zip(batch_results, single_results):
+            if batch_result['label'] != single_result['label']:
+                print(f"✗ Label mismatch: {batch_result['label']} != {single_result['label']}")
+                return False
+            if abs(batch_result['score'] - single_result['score']) > 1e-3:
+                print(f"✗ Score mismatch: {batch_result['score']:.4f} != {single_result['score']:.4f}")
+                return False
+        
+        print(f"✓ Batched FinBERT matches per-text results ({len(texts)} texts)")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Batch analysis failed: {e}")
+        return False
+
+
+def test_sentiment_cache_lru():
+    """Test that the in-memory sentiment cache evicts least recently used first"""
+    print("\nTesting sentiment cache LRU order...")
+    
+    try:
+        from sentiment_cache import SentimentCache
+        
+        cache = SentimentCache(max_entries=3)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, {'label': key})
+        cache.get('a')  # 'b' is now least recently used
+        cache.put('d', {'label': 'd'})
+        
+        present = [key for key in ('a', 'b', 'c', 'd') if cache.get(key) is not None]
+        if present != ['a', 'c', 'd']:
+            print(f"✗ Wrong entries kept: {present}")
+            return False
+        
+        print("✓ Least recently used entry evicted first")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Sentiment cache LRU failed: {e}")
+        return False
+
+
+def test_sentiment_cache_persistence():
+    """Test that sentiment results survive reopening the SQLite cache"""
+    print("\nTesting sentiment cache persistence...")
+    
+    try:
+        import tempfile
+        from sentiment_cache import SentimentCache
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'sentiment.db')
+            result = {'label': 'positive', 'score': 0.91, 'positive': 0.91, 'negative': 0.04, 'neutral': 0.05}
+            SentimentCache(db_path=db_path).put('key', result)
+            
+            reopened = SentimentCache(db_path=db_path)
+            if reopened.get('key') != result:
+                print("✗ Result lost after reopening")
+                return False
+            stats = reopened.stats()
+            if stats['disk_hits'] != 1 or reopened.get('key') != result or reopened.stats()['disk_hits'] != 1:
+                print(f"✗ Disk hit not promoted to memory: {reopened.stats()}")
+                return False
+        
+        print("✓ Results persist across reopen and are promoted to memory")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Sentiment cache persistence failed: {e}")
+        return False
+
+
+def test_vader_columnar():
+    """Test that columnar VADER matches per-text VADER exactly"""
+    print("\nTesting columnar VADER...")
+    
+    try:
+        from sentiment_analyzer import analyze_vader_sentiment
+        from vader_fast import vader_columnar
+        
+        texts = [
+            "Apple Inc. reported strong quarterly earnings, exceeding analyst expectations.",
+            "",
+            "   ",
+            "The board will meet on Tuesday.",
+            "The results were NOT GOOD!!!",
+            "Sales were fine but margins collapsed :(",
+            "Shares plunged after the company cut its full-year guidance.",
+            "The board will meet on Tuesday."
+        ]
+        
+        expected = [analyze_vader_sentiment(text) for text in texts]
+        columns = vader_columnar(texts)
+        
+        if columns.to_dicts() != expected:
+            print("✗ Columnar VADER results differ from per-text results")
+            return False
+        if list(columns.labels()) != [result['label'] for result in expected]:
+            print("✗ Label codes do not match labels")
+            return False
+        
+        print(f"✓ Columnar VADER matches per-text results ({len(texts)} texts)")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Columnar VADER failed: {e}")
+        return False
+
+
+def test_results_frame():
+    """Test columnar results summary against format_results on dicts"""
+    print("\nTesting results frame...")
+    
+    try:
+        from results_frame import build_results_frame, summary_table
+        from utils import format_results
+        
+        items = [
+            {'ticker': 'AAPL', 'source': 'Finviz', 'headline': 'a', 'vader_sentiment': 'positive',
+             'vader_score': 0.6, 'finbert_sentiment': 'positive', 'finbert_score': 0.9},
+            {'ticker': 'AAPL', 'source': 'Google News', 'headline': 'b', 'vader_sentiment': 'negative',
+             'vader_score': -0.4, 'finbert_sentiment': 'neutral', 'finbert_score': 0.8},
+            {'ticker': 'MSFT', 'source': 'Finviz', 'headline': 'c', 'vader_sentiment': 'neutral',
+             'vader_score': 0.0, 'finbert_sentiment': 'negative', 'finbert_score': 0.7},
+        ]
+        
+        frame = build_results_frame(items, ['MSFT', 'AAPL'])
+        summary = summary_table(frame)
+        if list(summary['Ticker']) != ['AAPL', 'MSFT'] or list(summary['FinBERT Ratio (P/N)']) != ['∞', '0.00']:
+            print(f"✗ Unexpected summary:\n{summary}")
+            return False
+        
+        from_dicts = format_results(items)
+        from_frame = format_results(frame)
+        for ticker in from_dicts:
+            for key in ('total_news', 'vader', 'finbert'):
+                if from_dicts[ticker][key] != from_frame[ticker][key]:
+                    print(f"✗ format_results mismatch for {ticker} {key}")
+                    return False
+        
+        print("✓ Results frame summary matches")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Results frame failed: {e}")
+        return False
+
+
+def test_lazy_imports():
+    """Test that importing the analyzer does not load torch/transformers/VADER"""
+    print("\nTesting lazy imports...")
+    
+    try:
+        import subprocess
+        
+        check = (
+            "import sys, sentiment_analyzer; "
+            "print(','.join(m for m in ('torch', 'transformers', 'vaderSentiment') if m in sys.modules))"
+        )
+        proc = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+        if proc.returncode != 0:
+            print(f"✗ Import failed: {proc.stderr[-500:]}")
+            return False
+        if proc.stdout.strip():
+            print(f"✗ Imported eagerly: {proc.stdout.strip()}")
+            return False
+        
+        print("✓ Heavy dependencies load on first use")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Lazy import check failed: {e}")
+        return False
+
+
+def test_incremental_scraping():
+    """Test that the watermark store only lets new items through"""
+    print("\nTesting incremental scraping...")
+    
+    try:
+        from news_scrapers import parse_finviz
+        from watermark_store import WatermarkStore, select_new
+        
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'finviz_quote.html'), 'rb') as f:
+            html = f.read()
+        store = WatermarkStore()
+        
+        first = select_new(parse_finviz(html, 5), *store.known('AAPL', 'Finviz'))
+        merged = store.merge('AAPL', 'Finviz', first)
+        pending = store.apply_scores(merged, 'Headlines Only')
+        for item in pending:
+            item.update(vader_sentiment='neutral', vader_score=0.0, finbert_sentiment='neutral', finbert_score=0.5,
+                        finbert_probabilities={'positive': 0.25, 'negative': 0.25, 'neutral': 0.5})
+        # A FinBERT error fallback is not stored, so it is scored again
+        pending[0].update(finbert_score=0.0, finbert_probabilities={})
+        store.save_scores('AAPL', pending, 'Headlines Only')
+        
+        fresh = {'source': 'Finviz', 'headline': 'Apple unveils new product line', 'date': 'Oct-20-26 10:00AM',
+                 'url': 'https://www.example-news.com/markets/new-story.html', 'content': ''}
+        second = select_new([fresh] + parse_finviz(html, 5), *store.known('AAPL', 'Finviz'))
+        if [item['headline'] for item in second] != [fresh['headline']]:
+            print(f"✗ Expected only the new item, got {len(second)}")
+            return False
+        
+        merged = store.merge('AAPL', 'Finviz', second)[:5]
+        pending = store.apply_scores(merged, 'Headlines Only')
+        if len(pending) != 2 or merged[0]['headline'] != fresh['headline']:
+            print(f"✗ Expected the new item and the fallback to score, got {len(pending)}")
+            return False
+        
+        print("✓ Only new items are fetched and scored")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Incremental scraping failed: {e}")
+        return False
+
+
+def test_history_store():
+    """Test daily, rolling and top-mover queries on the history store"""
+    print("\nTesting history store...")
+    
+    try:
+        from history_store import HistoryStore, SECONDS_PER_DAY, _day
+        
+        store = HistoryStore()
+        now = 1_790_000_000.0
+        rows = []
+        for day in range(14):
+            ts = now - day * SECONDS_PER_DAY
+            # AAPL turned positive this week, MSFT stays neutral
+            label = 0 if day < 7 else 1
+            for i in range(3):
+                rows.append(('AAPL', f"a{day}-{i}", 'finbert', ts, _day(ts), 'Finviz', label, 0.9))
+                rows.append(('MSFT', f"m{day}-{i}", 'finbert', ts, _day(ts), 'Finviz', 2, 0.8))
+        
+        if store.append_rows(rows) != len(rows) or store.append_rows(rows[:5]) != 0:
+            print("✗ Append is not idempotent per article")
+            return False
+        
+        daily = store.daily(['AAPL'], start=now - 6 * SECONDS_PER_DAY, end=now)
+        if len(daily) != 7 or (daily['positive'] != 3).any():
+            print(f"✗ Unexpected daily counts:\n{daily}")
+            return False
+        
+        rolled = store.rolling(['AAPL'], window_days=7, start=now, end=now)
+        if rolled['positive'].tolist() != [21] or rolled['net'].tolist() != [1.0]:
+            print(f"✗ Unexpected rolling window:\n{rolled}")
+            return False
+        
+        movers = store.top_movers(window_days=7, as_of=now)
+        if movers['ticker'].tolist()[0] != 'AAPL' or abs(movers['change'].iloc[0] - 2.0) > 1e-9:
+            print(f"✗ Unexpected top movers:\n{movers}")
+            return False
+        
+        # Scored articles land on their publish day; undated ones on the run day
+        from results_frame import build_results_frame
+        scored = {'source': 'Finviz', 'date': 'N/A', 'url': '', 'vader_sentiment': 'neutral', 'vader_score': 0.0,
+                  'finbert_sentiment': 'positive', 'finbert_score': 0.9}
+        frame = build_results_frame([
+            dict(scored, ticker='NVDA', headline="Nvidia story from three days ago", published=now - 3 * SECONDS_PER_DAY),
+            dict(scored, ticker='NVDA', headline="Nvidia story without a date", published=None),
+        ])
+        fresh = HistoryStore()
+        if fresh.has_history() or fresh.append(frame, ts=now) != 4 or not fresh.has_history():
+            print("✗ Results frame not appended")
+            return False
+        days = fresh.daily(['NVDA'])['day'].tolist()
+        if days != [_day(now) - 3, _day(now)] or fresh.stats() != {'rows': 4, 'daily_rows': 4}:
+            print(f"✗ Articles not bucketed by publish day: {days}, {fresh.stats()}")
+            return False
+        
+        print("✓ History queries return expected aggregates")
+        return True
+        
+    except Exception as e:
+        print(f"✗ History store failed: {e}")
+        return False
+
+
+def test_near_duplicates():
+    """Test near-duplicate clustering and the duplicate toggle in the summary"""
+    print("\nTesting near-duplicate clustering...")
+    
+    try:
+        from dedup import NearDuplicateIndex
+        from pipeline import mark_duplicates
+        from results_frame import build_results_frame, summary_table
+        
+        news = [
+            {'source': 'Finviz', 'headline': 'Apple raises full-year guidance as iPhone sales beat estimates'},
+            {'source': 'Google News', 'headline': 'UPDATE 1-Apple raises full-year guidance as iPhone sales beat estimates - Reuters'},
+            {'source': 'Finviz', 'headline': 'Apple cuts full-year guidance as iPhone sales miss estimates'},
+        ]
+        mark_duplicates(news, 'Headlines Only', NearDuplicateIndex())
+        if news[0]['cluster'] != news[1]['cluster'] or news[0]['cluster'] == news[2]['cluster']:
+            print(f"✗ Unexpected clusters: {[item['cluster'] for item in news]}")
+            return False
+        if [item['duplicate'] for item in news] != [False, True, False]:
+            print("✗ Only the repeated story should be marked as a duplicate")
+            return False
+        
+        for item, label in zip(news, ['positive', 'positive', 'negative']):
+            item.update(ticker='AAPL', vader_sentiment=label, vader_score=0.5,
+                        finbert_sentiment=label, finbert_score=0.9)
+        frame = build_results_frame(news, ['AAPL'])
+        counted = summary_table(frame, count_duplicates=True)
+        merged = summary_table(frame, count_duplicates=False)
+        if counted['FinBERT Positive'].iloc[0] != 2 or merged['FinBERT Positive'].iloc[0] != 1:
+            print("✗ Duplicate toggle does not change the summary counts")
+            return False
+        
+        print("✓ Near-duplicate stories are clustered and counted once")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Near-duplicate clustering failed: {e}")
+        return False
+
+
+def test_window_pooling():
+    """Test pooling of FinBERT window probabilities for long articles"""
+    print("\nTesting long-article window pooling...")
+    
+    try:
+        import numpy as np
+        from sentiment_analyzer import pool_windows
+        
+        # A long neutral lead followed by a short, strongly negative tail
+        probs = np.array([[0.1, 0.1, 0.8], [0.1, 0.1, 0.8], [0.05, 0.9, 0.05]])
+        lengths = np.array([512, 512, 64])
+        
+        mean = pool_windows(probs, lengths, 'mean')
+        weighted = pool_windows(probs, lengths, 'length')
+        strongest = pool_windows(probs, lengths, 'max')
+        
+        if not np.allclose([mean.sum(), weighted.sum(), strongest.sum()], 1.0):
+            print("✗ Pooled probabilities do not sum to 1")
+            return False
+        if not weighted[1] < mean[1] < strongest[1]:
+            print(f"✗ Unexpected pooling order: {weighted[1]:.3f}, {mean[1]:.3f}, {strongest[1]:.3f}")
+            return False
+        if np.argmax(strongest) != 1 or np.argmax(weighted) != 2:
+            print("✗ Max pooling should surface the negative passage, length weighting the lead")
+            return False
+        
+        print("✓ Window pooling behaves as expected")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Window pooling failed: {e}")
+        return False
+
+
+def test_blended_scores():
+    """Test headline/body blending for the Both (Averaged) mode"""
+    print("\nTesting headline/body blending...")
+    
+    try:
+        from pipeline import analysis_parts
+        from sentiment_analyzer import blend_finbert, blend_vader
+        
+        news = {'headline': 'Apple beats estimates', 'content': 'Shares later gave up their gains.'}
+        if analysis_parts(news, "Both (Averaged)") != [news['headline'], news['content']]:
+            print("✗ Headline and body should be scored separately")
+            return False
+        
+        headline = {'label': 'positive', 'score': 0.8, 'positive': 0.8, 'negative': 0.1, 'neutral': 0.1}
+        body = {'label': 'negative', 'score': 0.7, 'positive': 0.1, 'negative': 0.7, 'neutral': 0.2}
+        empty = {'label': 'neutral', 'score': 0.0}
+        
+        even = blend_finbert([headline, body], [0.5, 0.5])
+        if even['label'] != 'positive' or abs(even['score'] - 0.45) > 1e-9:
+            print(f"✗ Unexpected even blend: {even}")
+            return False
+        if blend_finbert([headline, body], [0.2, 0.8])['label'] != 'negative':
+            print("✗ Body weight does not move the blended label")
+            return False
+        if blend_finbert([headline, empty], [0.0, 1.0])['score'] != 0.8:
+            print("✗ An article without a body should keep its headline score")
+            return False
+        
+        vader = blend_vader([{'label': 'positive', 'compound': 0.6, 'pos': 0.5, 'neu': 0.5, 'neg': 0.0},
+                             {'label': 'negative', 'compound': -0.2, 'pos': 0.0, 'neu': 0.7, 'neg': 0.3}], [0.5, 0.5])
+        if vader['label'] != 'positive' or abs(vader['compound'] - 0.2) > 1e-9:
+            print(f"✗ Unexpected VADER blend: {vader}")
+            return False
+        
+        print("✓ Headline and body scores are blended by weight")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Headline/body blending failed: {e}")
+        return False
+
+
+def test_source_lanes():
+    """Test that a slow or failing source does not hold up the others"""
+    print("\nTesting source registry and scrape lanes...")
+    
+    try:
+        import time
+        from fetch_orchestrator import HostLimiter, SourceSkipped, run_scrape_jobs
+        from source_registry import NewsSource, get_source, register_source, unregister_source
+        
+        register_source(NewsSource("Test Feed", 'testfeed', "https://feeds.example.test/{ticker}",
+                                   parse=lambda html, max_articles: [], default_enabled=False))
+        try:
+            if get_source('testfeed').host != 'feeds.example.test':
+                print("✗ Source host not derived from its URL")
+                return False
+        finally:
+            unregister_source("Test Feed")
+        
+        def fast(ticker, max_articles):
+            return [{'headline': ticker}]
+        
+        def slow(ticker, max_articles):
+            time.sleep(0.5)
+            return []
+        
+        def broken(ticker, max_articles):
+            raise TimeoutError("timed out")
+        
+        jobs = ([(f"S{i}", "Slow", slow) for i in range(4)] + [(f"B{i}", "Broken", broken) for i in range(5)]
+                + [(f"F{i}", "Fast", fast) for i in range(8)])
+        limiter = HostLimiter({'Slow': (1000, 100, 1), 'Broken': (1000, 100, 1), 'Fast': (1000, 100, 4)})
+        
+        start = time.perf_counter()
+        fast_done = []
+        errors = []
+        for ticker, source_name, news_items, error in run_scrape_jobs(jobs, max_workers=4, limiter=limiter):
+            if source_name == "Fast":
+                fast_done.append(time.perf_counter() - start)
+            elif error is not None:
+                errors.append(type(error))
+        
+        if len(fast_done) != 8 or max(fast_done) > 0.4:
+            print(f"✗ Fast source waited on the slow one ({max(fast_done):.2f}s)")
+            return False
+        if (errors.count(TimeoutError), errors.count(SourceSkipped)) != (3, 2):
+            print(f"✗ Failing source not skipped after repeated errors: {errors}")
+            return False
+        
+        print("✓ Sources run on independent lanes")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Source lanes failed: {e}")
+        return False
+
+
+def test_source_skips():
+    """Test that only transport failures count toward skipping a source"""
+    print("\nTesting source skips...")
+    
+    try:
+        import requests
+        from fetch_orchestrator import HostLimiter, SourceSkipped, run_scrape_jobs
+        
+        def failing(status):
+            def scraper(ticker, max_articles):
+                response = requests.Response()
+                response.status_code = status
+                raise requests.HTTPError(f"{status} error", response=response)
+            return scraper
+        
+        def unreachable(ticker, max_articles):
+            raise requests.ConnectionError("connection refused")
+        
+        jobs = ([(f"M{i}", "Missing", failing(404)) for i in range(5)]
+                + [(f"O{i}", "Overloaded", failing(503)) for i in range(5)]
+                + [(f"U{i}", "Unreachable", unreachable) for i in range(5)])
+        limiter = HostLimiter({name: (1000, 100, 1) for name in ("Missing", "Overloaded", "Unreachable")})
+        
+        skipped = {}
+        for ticker, source_name, news_items, error in run_scrape_jobs(jobs, max_workers=4, limiter=limiter):
+            skipped[source_name] = skipped.get(source_name, 0) + isinstance(error, SourceSkipped)
+        
+        if skipped != {'Missing': 0, 'Overloaded': 2, 'Unreachable': 2}:
+            print(f"✗ Wrong sources skipped: {skipped}")
+            return False
+        
+        print("✓ 404s never skip a source; 5xx and connection errors do")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Source skips failed: {e}")
+        return False
+
+
+def test_lane_limits():
+    """Test that lanes respect host concurrency and release it before bodies"""
+    print("\nTesting lane concurrency limits...")
+    
+    try:
+        import threading
+        import time
+        from fetch_orchestrator import HostLimiter, run_scrape_jobs
+        
+        lock = threading.Lock()
+        active = {'Plain': 0, 'Listing': 0}
+        peak = {'Plain': 0, 'Listing': 0}
+        
+        def enter(name):
+            with lock:
+                active[name] += 1
+                peak[name] = max(peak[name], active[name])
+        
+        def leave(name):
+            with lock:
+                active[name] -= 1
+        
+        def plain(ticker, max_articles):
+            enter('Plain')
+            time.sleep(0.1)
+            leave('Plain')
+            return []
+        
+        def with_bodies(ticker, max_articles, limit):
+            with limit():
+                enter('Listing')
+                time.sleep(0.05)
+                leave('Listing')
+            # Article bodies come from other hosts, outside the listing slot
+            time.sleep(0.4)
+            return []
+        
+        jobs = [(f"P{i}", "Plain", plain) for i in range(6)] + [(f"L{i}", "Listing", with_bodies) for i in range(6)]
+        limiter = HostLimiter({'Plain': (1000, 100, 2), 'Listing': (1000, 100, 1)})
+        
+        start = time.perf_counter()
+        errors = [error for _, _, _, error in run_scrape_jobs(jobs, max_workers=8, limiter=limiter) if error]
+        elapsed = time.perf_counter() - start
+        
+        if errors or peak != {'Plain': 2, 'Listing': 1}:
+            print(f"✗ Host concurrency not respected: peak {peak}, errors {errors}")
+            return False
+        if elapsed > 1.2:
+            print(f"✗ Body downloads held the listing host's slot ({elapsed:.2f}s)")
+            return False
+        
+        print(f"✓ Lanes stay within host concurrency ({elapsed:.2f}s)")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Lane limits failed: {e}")
+        return False
+
+
+def test_feed_sources():
+    """Test RSS/Atom parsing and multi-ticker feed scrapes from local fixtures"""
+    print("\nTesting feed sources...")
+    
+    try:
+        from feed_parsing import assign_tickers, parse_feed
+        from news_scrapers import scrape_source
+        from source_registry import NewsSource
+        
+        fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+        with open(os.path.join(fixtures, 'atom_feed.xml'), 'rb') as f:
+            atom_items = parse_feed(f.read(), max_articles=5)
+        if [item['url'] for item in atom_items] != ['https://example.com/news/nvidia-data-center',
+                                                    'https://example.com/news/chip-stocks-retreat']:
+            print(f"✗ Atom entries parsed wrong: {atom_items}")
+            return False
+        
+        feed = NewsSource("Local Feed", 'localfeed', 'file://' + os.path.join(fixtures, 'rss_feed.xml'),
+                          'feed_parsing:parse_feed', tickers_per_request=10, default_enabled=False)
+        single = scrape_source(feed, 'AAPL', max_articles=3)
+        if len(single) != 3 or any(item['published'] is None for item in single):
+            print(f"✗ Single-ticker feed scrape wrong: {single}")
+            return False
+        
+        # One request serves both tickers; the shared story goes to each
+        grouped = scrape_source(feed, 'AAPL,MSFT', max_articles=5)
+        by_ticker = {ticker: [item['url'].rsplit('/', 1)[-1] for item in grouped if item['ticker'] == ticker]
+                     for ticker in ('AAPL', 'MSFT')}
+        expected = {'AAPL': ['apple-beats-estimates', 'megacap-rally', 'apple-supplier-shortages'],
+                    'MSFT': ['microsoft-cloud-growth', 'megacap-rally', 'msft-price-targets']}
+        if by_ticker != expected:
+            print(f"✗ Feed items attributed wrong: {by_ticker}")
+            return False
+        
+        # Word-like and short tickers need a cashtag, parentheses or an exchange
+        items = [{'headline': headline, 'categories': []} for headline in (
+            "Shares of IT consulting firms rally ON upbeat demand NOW",
+            "Gartner (IT) beats estimates as $ON and NYSE:NOW climb"
+        )]
+        matched = [(item['headline'][:7], item['ticker']) for item in assign_tickers(items, ['IT', 'ON', 'NOW'])]
+        if matched != [('Gartner', 'IT'), ('Gartner', 'ON'), ('Gartner', 'NOW')]:
+            print(f"✗ Word-like tickers matched wrong: {matched}")
+            return False
+        
+        print("✓ Feeds parse and split across tickers")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Feed sources failed: {e}")
+        return False
+
+
+def test_async_backend():
+    """Test the async scrape orchestrator against a local server"""
+    print("\nTesting async scraping backend...")
+    
+    try:
+        import threading
+        import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from async_scrapers import get_async_scraper, run_scrape_jobs
+        from feed_parsing import parse_feed
+        from pipeline import get_scrapers, scrape_runner
+        from source_registry import NewsSource, register_source, unregister_source
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                ticker = self.path.rsplit('/', 1)[-1]
+                if self.path.startswith('/feed/BAD'):
+                    self.send_error(404)
+                    return
+                if self.path.startswith('/feed/'):
+                    entries = "".join(
+                        f"<item><title>{ticker} headline number {i} for the test feed</title>"
+                        f"<link>http://localhost:{port}/article/{ticker}-{i}</link></item>"
+                        for i in range(2)
+                    )
+                    body = f"<rss version='2.0'><channel>{entries}</channel></rss>".encode('utf-8')
+                else:
+                    time.sleep(0.3)
+                    body = f"<html><body><article><p>Body of {ticker}</p></article></body></html>".encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        
+        loop_thread = get_async_scraper()._thread
+        parse_threads = set()
+        
+        def parse(page, max_articles):
+            parse_threads.add(threading.current_thread())
+            return parse_feed(page, max_articles)
+        
+        # Listings on 127.0.0.1 (2 at a time), article bodies on localhost
+        register_source(NewsSource("Local Async", 'localasync', f"http://127.0.0.1:{port}/feed/{{ticker}}", parse,
+                                   rate=1000, burst=100, concurrency=2, needs_bodies=True, default_enabled=False))
+        try:
+            scrapers = get_scrapers('async')
+            if scrape_runner(scrapers) is not run_scrape_jobs:
+                print("✗ Pipeline does not use the async orchestrator for async scrapers")
+                return False
+            
+            tickers = ['AAA', 'BBB', 'CCC', 'DDD', 'EEE', 'FFF', 'BAD']
+            jobs = [(ticker, "Local Async", scrapers["Local Async"]) for ticker in tickers]
+            start = time.perf_counter()
+            results = {ticker: (items, error) for ticker, _, items, error in run_scrape_jobs(jobs, max_articles=2)}
+            elapsed = time.perf_counter() - start
+        finally:
+            unregister_source("Local Async")
+            server.shutdown()
+        
+        if results['BAD'][1] is None or any(results[ticker][1] is not None for ticker in tickers[:-1]):
+            print(f"✗ Wrong job errors: {[(ticker, error) for ticker, (_, error) in results.items()]}")
+            return False
+        contents = [item['content'] for ticker in tickers[:-1] for item in results[ticker][0]]
+        if len(contents) != 12 or not all(content.startswith("Body of") for content in contents):
+            print(f"✗ Article bodies missing: {contents}")
+            return False
+        if loop_thread in parse_threads:
+            print("✗ Listings parsed on the event loop thread")
+            return False
+        # 12 bodies of 0.3s each would take 3.6s two at a time
+        if elapsed > 2.5:
+            print(f"✗ Jobs did not overlap ({elapsed:.2f}s)")
+            return False
+        
+        print(f"✓ 7 jobs scraped in one event loop pass ({elapsed:.2f}s)")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Async backend failed: {e}")
+        return False
+
+
+def test_batch_schedule():
+    """Test that length-bucketed batches cover every text once under the token budget"""
+    print("\nTesting batch scheduling...")
+    
+    try:
+        import random
+        from sentiment_analyzer import schedule_batches
+        
+        rng = random.Random(7)
+        lengths = [rng.randint(5, 512) for _ in range(200)]
+        batches = schedule_batches(lengths, max_tokens=2048, max_batch_size=16)
+        
+        # Results are written back by index, so every index must appear exactly once
+        order = [i for batch in batches for i in batch]
+        if sorted(order) != list(range(len(lengths))):
+            print("✗ Batches do not cover every text exactly once")
+            return False
+        if any(lengths[a] > lengths[b] for a, b in zip(order, order[1:])):
+            print("✗ Batches are not bucketed by length")
+            return False
+        for batch in batches:
+            if len(batch) > 16 or (len(batch) > 1 and len(batch) * max(lengths[i] for i in batch) > 2048):
+                print(f"✗ Batch over budget: {[lengths[i] for i in batch]}")
+                return False
+        
+        if schedule_batches([]) != [] or schedule_batches([9000]) != [[0]]:
+            print("✗ Empty input or an over-budget text scheduled wrong")
+            return False
+        
+        print(f"✓ {len(lengths)} texts in {len(batches)} length-bucketed batches")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Batch scheduling failed: {e}")
+        return False
+
+
+def test_scrape_cache():
+    """Test scrape cache TTL expiry, byte eviction and miss coalescing"""
+    print("\nTesting scrape cache...")
+    
+    try:
+        import asyncio
+        import threading
+        import time
+        from scrape_cache import ScrapeCache
+        
+        cache = ScrapeCache()
+        cache.put('AAPL', [{'headline': 'Apple story'}])
+        if cache.get('AAPL', ttl=60) != [{'headline': 'Apple story'}] or cache.get('AAPL', ttl=-1) is not None:
+            print("✗ TTL not respected")
+            return False
+        
+        # Callers annotate items in place; the cached copy must not change
+        cache.get('AAPL', ttl=60)[0]['ticker'] = 'AAPL'
+        if 'ticker' in cache.get('AAPL', ttl=60)[0]:
+            print("✗ Cached items shared with callers")
+            return False
+        
+        small = ScrapeCache(max_bytes=200)
+        for i in range(5):
+            small.put(f"key{i}", [{'headline': 'x' * 40}])
+        if small.get('key0', ttl=60) is not None or small.get('key4', ttl=60) is None:
+            print("✗ Oldest entries not evicted over the byte budget")
+            return False
+        
+        calls = []
+        barrier = threading.Barrier(8)
+        
+        def fetch():
+            calls.append(1)
+            time.sleep(0.2)
+            return [{'headline': 'Fetched once'}]
+        
+        def worker(out):
+            barrier.wait()
+            out.append(cache.get_or_fetch('MSFT', fetch, ttl=60))
+        
+        results = []
+        threads = [threading.Thread(target=worker, args=(results,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        if len(calls) != 1 or len(results) != 8 or any(result != [{'headline': 'Fetched once'}] for result in results):
+            print(f"✗ Concurrent misses not coalesced: {len(calls)} fetches")
+            return False
+        
+        # The async path shares flights with sync callers and skips empty results
+        async_calls = []
+        
+        async def fetch_async():
+            async_calls.append(1)
+            await asyncio.sleep(0.2)
+            return [{'headline': 'Fetched async'}]
+        
+        async def fetch_empty():
+            async_calls.append(1)
+            return []
+        
+        async def run_async():
+            waiters = [cache.get_or_fetch_async('NVDA', fetch_async, ttl=60) for _ in range(6)]
+            threaded = asyncio.get_running_loop().run_in_executor(None, cache.get_or_fetch, 'NVDA', fetch, 60)
+            return await asyncio.gather(*waiters, threaded)
+        
+        calls.clear()
+        async_results = asyncio.run(run_async())
+        if len(async_calls) + len(calls) != 1 or len({str(result) for result in async_results}) != 1:
+            print(f"✗ Async misses not coalesced: {len(async_calls) + len(calls)} fetches")
+            return False
+        
+        async_calls.clear()
+        asyncio.run(cache.get_or_fetch_async('TSLA', fetch_empty, ttl=60))
+        asyncio.run(cache.get_or_fetch_async('TSLA', fetch_empty, ttl=60))
+        if len(async_calls) != 2 or cache.get('TSLA', ttl=60) is not None:
+            print("✗ Empty async result cached")
+            return False
+        
+        print("✓ TTL, byte eviction and coalescing work, sync and async")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Scrape cache failed: {e}")
+        return False
+
+
+def test_single_flight():
+    """Test that concurrent calls for one key run once and share errors"""
+    print("\nTesting single-flight...")
+    
+    try:
+        import threading
+        import time
+        from single_flight import SingleFlight
+        
+        flights = SingleFlight()
+        calls = []
+        barrier = threading.Barrier(6)
+        
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 42
+        
+        def fail():
+            calls.append(1)
+            time.sleep(0.2)
+            raise ValueError("model failed")
+        
+        def worker(key, fn, out):
+            barrier.wait()
+            try:
+                out.append(flights.do(key, fn))
+            except ValueError as e:
+                out.append(e)
+        
+        results = []
+        threads = [threading.Thread(target=worker, args=('ok', compute, results)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if len(calls) != 1 or results != [42] * 6:
+            print(f"✗ {len(calls)} calls for 6 concurrent callers")
+            return False
+        
+        calls.clear()
+        errors = []
+        threads = [threading.Thread(target=worker, args=('bad', fail, errors)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if len(calls) != 1 or len(errors) != 6 or not all(isinstance(error, ValueError) for error in errors):
+            print(f"✗ Leader's error not shared: {errors}")
+            return False
+        
+        stats = flights.stats()
+        if stats != {'calls': 12, 'deduplicated': 10, 'in_flight': 0}:
+            print(f"✗ Unexpected stats: {stats}")
+            return False
+        
+        print("✓ One call per key for concurrent callers, errors included")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Single-flight failed: {e}")
+        return False
+
+
+def test_inference_worker():
+    """Test micro-batch grouping, stats and shutdown of the inference worker"""
+    print("\nTesting inference worker...")
+    
+    try:
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from inference_worker import InferenceWorker
+        
+        batch_sizes = []
+        
+        def score_batch(texts):
+            batch_sizes.append(len(texts))
+            if 'boom' in texts:
+                raise RuntimeError("batch failed")
+            return [{'label': 'neutral', 'text': text} for text in texts]
+        
+        worker = InferenceWorker(score_batch, max_batch_size=4, max_wait=0.05)
+        worker.start()
+        thread = worker._thread
+        try:
+            # Ten texts from five callers share batches of at most four
+            with ThreadPoolExecutor(max_workers=5) as pool:
+                texts = [[f"caller {c} text {i}" for i in range(2)] for c in range(5)]
+                results = list(pool.map(worker.score, texts))
+            if [[result['text'] for result in caller] for caller in results] != texts:
+                print("✗ Results not routed back to their callers")
+                return False
+            if sum(batch_sizes) != 10 or max(batch_sizes) > 4 or len(batch_sizes) > 5:
+                print(f"✗ Requests not grouped into micro-batches: {batch_sizes}")
+                return False
+            
+            stats = worker.stats()
+            if stats['items'] != 10 or stats['batches'] != len(batch_sizes) or stats['queue_depth'] != 0:
+                print(f"✗ Unexpected stats: {stats}")
+                return False
+            
+            failed = worker.submit('boom')
+            try:
+                failed.result(timeout=5)
+                print("✗ Batch error not propagated")
+                return False
+            except RuntimeError:
+                pass
+        finally:
+            worker.stop()
+        
+        if thread.is_alive():
+            print("✗ Worker thread not stopped")
+            return False
+        
+        # Requests still queued at stop fail instead of hanging their callers
+        def slow_batch(texts):
+            time.sleep(0.1)
+            return [{'label': 'neutral'} for _ in texts]
+        
+        slow = InferenceWorker(slow_batch, max_batch_size=1, max_wait=0)
+        slow.start()
+        pending = [slow.submit(f"text {i}") for i in range(5)]
+        slow.stop()
+        outcomes = []
+        for future in pending:
+            try:
+                outcomes.append(future.result(timeout=1)['label'])
+            except RuntimeError:
+                outcomes.append('stopped')
+        if 'stopped' not in outcomes:
+            print(f"✗ Queued requests not failed on stop: {outcomes}")
+            return False
+        try:
+            slow.submit("late").result(timeout=1)
+            print("✗ Request accepted after stop")
+            return False
+        except RuntimeError:
+            pass
+        
+        print(f"✓ 10 texts scored in {len(batch_sizes) - 1} micro-batches")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Inference worker failed: {e}")
+        return False
+
+
+def test_backend_parity():
+    """Test that the int8 and ONNX backends agree with fp32 and cache apart"""
+    print("\nTesting FinBERT backend parity...")
+    
+    try:
+        import numpy as np
+        import sentiment_analyzer
+        from finbert_backends import BACKENDS, load_backend
+        
+        headlines = [
+            "Apple Inc. reported strong quarterly earnings, exceeding analyst expectations.",
+            "Shares plunged after the company cut its full-year guidance.",
+            "The board will meet on Tuesday.",
+            "Regulators fined the bank for misleading investors."
+        ]
+        tolerance = 0.05
+        
+        # Each backend's scores are cached under its own key
+        original = sentiment_analyzer.FINBERT_BACKEND
+        try:
+            keys = set()
+            for name in BACKENDS:
+                sentiment_analyzer.FINBERT_BACKEND = name
+                keys.add(sentiment_analyzer.finbert_cache_key(headlines[0]))
+        finally:
+            sentiment_analyzer.FINBERT_BACKEND = original
+        if len(keys) != len(BACKENDS):
+            print("✗ Backends share FinBERT cache keys")
+            return False
+        
+        def probabilities(name):
+            tokenizer, backend = load_backend(name, sentiment_analyzer.FINBERT_MODEL_ID,
+                                              sentiment_analyzer.FINBERT_ARTIFACT_DIR)
+            inputs = tokenizer(headlines, padding=True, truncation=True, return_tensors=backend.return_tensors)
+            return backend.predict_proba(inputs)
+        
+        try:
+            reference = probabilities('torch')
+        except Exception as e:
+            print(f"⚠ fp32 backend unavailable, parity skipped: {e}")
+            return True
+        
+        # Labels must agree wherever fp32 is clear by more than the tolerance
+        top2 = np.sort(reference, axis=1)[:, -2:]
+        decided = top2[:, 1] - top2[:, 0] > tolerance
+        compared = []
+        for name in BACKENDS[1:]:
+            try:
+                probs = probabilities(name)
+            except Exception as e:
+                print(f"⚠ {name} backend unavailable, skipped: {e}")
+                continue
+            drift = float(np.abs(probs - reference).max())
+            if drift > tolerance:
+                print(f"✗ {name} probabilities differ from fp32 by {drift:.3f}")
+                return False
+            if (probs.argmax(axis=1) != reference.argmax(axis=1))[decided].any():
+                print(f"✗ {name} labels differ from fp32")
+                return False
+            compared.append(f"{name} {drift:.4f}")
+        
+        print(f"✓ Backends match fp32 and cache apart (max drift: {', '.join(compared) or 'none compared'})")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Backend parity failed: {e}")
+        return False
+
+
+def test_body_limits():
+    """Test that streamed bodies stop at the byte cap and the total deadline"""
+    print("\nTesting body read limits...")
+    
+    try:
+        import time
+        from http_session import read_body
+        
+        class StubResponse:
+            url = 'http://example.com/article'
+            
+            def __init__(self, chunks):
+                self.chunks = chunks
+                self.read = 0
+                self.closed = False
+            
+            def iter_content(self, chunk_size):
+                for chunk in self.chunks:
+                    self.read += 1
+                    yield chunk
+            
+            def close(self):
+                self.closed = True
+        
+        def endless(delay=0.0):
+            while True:
+                time.sleep(delay)
+                yield b'x' * 1000
+        
+        oversized = StubResponse(endless())
+        body = read_body(oversized, max_bytes=5500)
+        if len(body) != 5500 or oversized.read != 6 or not oversized.closed:
+            print(f"✗ Oversized body not cut at the cap: {len(body)} bytes, {oversized.read} chunks")
+            return False
+        
+        # A server trickling bytes within the per-read timeout still hits the deadline
+        trickling = StubResponse(endless(delay=0.05))
+        start = time.perf_counter()
+        try:
+            read_body(trickling, deadline=0.3)
+            print("✗ Trickling body read past the deadline")
+            return False
+        except TimeoutError:
+            pass
+        elapsed = time.perf_counter() - start
+        if elapsed > 1.0 or not trickling.closed:
+            print(f"✗ Deadline not enforced promptly ({elapsed:.2f}s)")
+            return False
+        
+        print(f"✓ Bodies cut at the byte cap and abandoned after the deadline ({elapsed:.2f}s)")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Body limits failed: {e}")
+        return False
+
+
+def test_http_session():
+    """Test keep-alive session and conditional GET against a local server"""
+    print("\nTesting HTTP session...")
+    
+    try:
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from http_session import http_get
+        
+        hits = {'200': 0, '304': 0}
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def do_GET(self):
+                if self.headers.get('If-None-Match') == '"v1"':
+                    hits['304'] += 1
+                    self.send_response(304)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = b"<table id='news-table'></table>"
+                hits['200'] += 1
+                self.send_response(200)
+                self.send_header('ETag', '"v1"')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/quote"
+        
+        try:
+            first = http_get(url, timeout=5)
+            second = http_get(url, timeout=5)
+        finally:
+            server.shutdown()
+        
+        if hits != {'200': 1, '304': 1} or not second.from_store or second.content != first.content:
+            print(f"✗ Conditional GET not used: {hits}")
+            return False
+        
+        # The store is bounded by body bytes as well as entries
+        from http_session import ResponseStore
+        store = ResponseStore(max_bytes=len(first.content) + 10)
+        store.put(url, first)
+        store.put(url + '?page=2', first)
+        if store.get(url) is not None or store.get(url + '?page=2') is None:
+            print("✗ Response store not bounded by bytes")
+            return False
+        
+        print("✓ Second request answered with 304 and served from the response store")
+        return True
+        
+    except Exception as e:
+        print(f"✗ HTTP session test failed: {e}")
+        return False
+
+
 def test_web_scraping():
     """Test web scraping functions (optional, requires internet)"""
     print("\nTesting web scraping (optional)...")
@@ -151,6 +1328,29 @@ def run_all_tests():
     results.append(("Imports", test_imports()))
     results.append(("Modules", test_modules()))
     results.append(("Sentiment Analysis", test_sentiment_analysis()))
+    results.append(("Batch Analysis", test_batch_analysis()))
+    results.append(("Columnar VADER", test_vader_columnar()))
+    results.append(("Results Frame", test_results_frame()))
+    results.append(("Lazy Imports", test_lazy_imports()))
+    results.append(("Incremental Scraping", test_incremental_scraping()))
+    results.append(("History Store", test_history_store()))
+    results.append(("Near Duplicates", test_near_duplicates()))
+    results.append(("Window Pooling", test_window_pooling()))
+    results.append(("Blended Scores", test_blended_scores()))
+    results.append(("Source Lanes", test_source_lanes()))
+    results.append(("Source Skips", test_source_skips()))
+    results.append(("Lane Limits", test_lane_limits()))
+    results.append(("Feed Sources", test_feed_sources()))
+    results.append(("Async Backend", test_async_backend()))
+    results.append(("Batch Schedule", test_batch_schedule()))
+    results.append(("Scrape Cache", test_scrape_cache()))
+    results.append(("Single Flight", test_single_flight()))
+    results.append(("Inference Worker", test_inference_worker()))
+    results.append(("Backend Parity", test_backend_parity()))
+    results.append(("Sentiment Cache LRU", test_sentiment_cache_lru()))
+    results.append(("Sentiment Cache Persistence", test_sentiment_cache_persistence()))
+    results.append(("Body Limits", test_body_limits()))
+    results.append(("HTTP Session", test_http_session()))
     
     # Optional tests
     results.append(("Web Scraping", test_web_scraping()))
@@ -165,7 +1365,7 @@ def run_all_tests():
         symbol = "✓" if result else "✗"
         print(f"{symbol} {name}: {status}")
     
-    all_passed = all(result for name, result in results[:3])  # Only critical tests
+    all_passed = all(result for name, result in results[:26])  # Only critical tests
     
     print("\n" + "="*60)
     if all_passed:
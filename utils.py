@@ -1,5 +1,8 @@
 import re
-from typing import List
+from typing import List, Union
+
+import numpy as np
+import pandas as pd
 
 def validate_ticker(ticker: str) -> bool:
     """
@@ -33,10 +36,14 @@ def clean_ticker(ticker: str) -> str:
     return ticker.upper().strip()
 
 
-def format_results(results: List[dict]) -> dict:
+def format_results(results: Union[List[dict], pd.DataFrame]) -> dict:
     """
     Format raw results into structured summary
+    Accepts a list of result dicts or a results DataFrame (see results_frame)
     """
+    if isinstance(results, pd.DataFrame):
+        return _format_results_frame(results)
+    
     summary = {}
     
     for item in results:
@@ -67,10 +74,43 @@ def format_results(results: List[dict]) -> dict:
     return summary
 
 
-def calculate_sentiment_ratio(positive: int, negative: int) -> float:
+def _format_results_frame(frame: pd.DataFrame) -> dict:
+    """
+    format_results for a DataFrame: counts from one groupby per model
+    """
+    summary = {}
+    labels = ['positive', 'negative', 'neutral']
+    tickers = frame['ticker'] if 'ticker' in frame else pd.Series('UNKNOWN', index=frame.index)
+    
+    counts = {}
+    for model in ('vader', 'finbert'):
+        column = f'{model}_sentiment'
+        sentiments = frame[column] if column in frame else pd.Series('neutral', index=frame.index)
+        counts[model] = pd.crosstab(tickers, sentiments).reindex(columns=labels, fill_value=0)
+    
+    for ticker, group in frame.groupby(tickers, observed=True, sort=False):
+        summary[ticker] = {
+            'total_news': len(group),
+            'vader': {label: int(counts['vader'].at[ticker, label]) for label in labels},
+            'finbert': {label: int(counts['finbert'].at[ticker, label]) for label in labels},
+            'news_items': group.to_dict('records')
+        }
+    
+    return summary
+
+
+def calculate_sentiment_ratio(positive, negative):
     """
     Calculate positive to negative sentiment ratio
+    Works on scalars or element-wise on arrays of counts
     """
+    if np.ndim(positive) or np.ndim(negative):
+        positive = np.asarray(positive, dtype=float)
+        negative = np.asarray(negative, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = positive / negative
+        return np.where(negative == 0, np.where(positive > 0, np.inf, 0.0), ratio)
+    
     if negative == 0:
         return float('inf') if positive > 0 else 0.0
     return positive / negative
@@ -0,0 +1,131 @@
+import string
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Label codes, in the same order as FinBERT's classes
+LABELS = ('positive', 'negative', 'neutral')
+POSITIVE, NEGATIVE, NEUTRAL = 0, 1, 2
+
+# Same thresholds as sentiment_analyzer.analyze_vader_sentiment
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+# Built lazily, once per process
+_analyzer = None
+_lexicon = None
+_emojis = None
+_token_hits = {}
+
+
+def _get_analyzer():
+    global _analyzer, _lexicon, _emojis
+    if _analyzer is None:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        _analyzer = SentimentIntensityAnalyzer()
+        _lexicon = frozenset(_analyzer.lexicon)
+        _emojis = frozenset(_analyzer.emojis)
+    return _analyzer
+
+
+def _token_in_lexicon(token: str) -> bool:
+    """
+    Whether VADER would look this raw token up successfully (memoized)
+    Mirrors SentiText._strip_punc_if_word followed by a lowercase lookup
+    """
+    hit = _token_hits.get(token)
+    if hit is None:
+        stripped = token.strip(string.punctuation)
+        word = token if len(stripped) <= 2 else stripped
+        hit = _token_hits[token] = word.lower() in _lexicon
+    return hit
+
+
+def _score(text: str):
+    """
+    (compound, pos, neu, neg) exactly as analyze_vader_sentiment reports them
+    Texts without emoji or lexicon words always score neutral in VADER, so
+    they skip polarity_scores entirely
+    """
+    if not text or not text.strip():
+        return 0.0, np.nan, np.nan, np.nan
+
+    analyzer = _get_analyzer()
+    if not any(char in _emojis for char in text) and not any(map(_token_in_lexicon, text.split())):
+        return 0.0, 0.0, 1.0, 0.0
+
+    scores = analyzer.polarity_scores(text)
+    return scores['compound'], scores['pos'], scores['neu'], scores['neg']
+
+
+class VaderColumns:
+    """
+    Columnar VADER results: float arrays compound/pos/neu/neg and an int8
+    label code array (see LABELS). pos/neu/neg are NaN for empty texts,
+    which analyze_vader_sentiment reports without those keys.
+    """
+
+    def __init__(self, compound: np.ndarray, pos: np.ndarray, neu: np.ndarray, neg: np.ndarray):
+        self.compound = compound
+        self.pos = pos
+        self.neu = neu
+        self.neg = neg
+        self.label_code = np.full(len(compound), NEUTRAL, dtype=np.int8)
+        self.label_code[compound >= POSITIVE_THRESHOLD] = POSITIVE
+        self.label_code[compound <= NEGATIVE_THRESHOLD] = NEGATIVE
+
+    def __len__(self) -> int:
+        return len(self.compound)
+
+    def labels(self) -> np.ndarray:
+        return np.array(LABELS)[self.label_code]
+
+    def to_dicts(self) -> List[Dict]:
+        """
+        Convert back to analyze_vader_sentiment's list-of-dicts format
+        """
+        results = []
+        for i in range(len(self)):
+            result = {'label': LABELS[self.label_code[i]], 'compound': float(self.compound[i])}
+            if not np.isnan(self.pos[i]):
+                result['pos'] = float(self.pos[i])
+                result['neu'] = float(self.neu[i])
+                result['neg'] = float(self.neg[i])
+            results.append(result)
+        return results
+
+
+def _score_many(texts: List[str]) -> np.ndarray:
+    scores = np.empty((len(texts), 4))
+    for i, text in enumerate(texts):
+        scores[i] = _score(text)
+    return scores
+
+
+def vader_columnar(texts: List[str], processes: int = 1, chunk_size: int = 5000,
+                   executor: Optional[ProcessPoolExecutor] = None) -> VaderColumns:
+    """
+    High-throughput VADER over a large corpus
+    Each distinct text is scored once; with processes > 1 (or an executor)
+    the distinct texts are sharded across worker processes
+    """
+    # Memoize repeated sentences: score unique texts, then gather
+    index = {}
+    inverse = np.empty(len(texts), dtype=np.int64)
+    for i, text in enumerate(texts):
+        inverse[i] = index.setdefault(text, len(index))
+    unique = list(index)
+
+    if (processes > 1 or executor is not None) and len(unique) > chunk_size:
+        chunks = [unique[i:i + chunk_size] for i in range(0, len(unique), chunk_size)]
+        if executor is not None:
+            unique_scores = np.concatenate(list(executor.map(_score_many, chunks)))
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                unique_scores = np.concatenate(list(pool.map(_score_many, chunks)))
+    else:
+        unique_scores = _score_many(unique)
+
+    scores = unique_scores[inverse] if len(texts) else np.empty((0, 4))
+    return VaderColumns(scores[:, 0], scores[:, 1], scores[:, 2], scores[:, 3])
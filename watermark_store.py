@@ -0,0 +1,278 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from typing import Container, Dict, List, Optional, Tuple
+
+from sentiment_cache import normalize_text
+
+# Score fields copied between scored items and the store
+SCORE_FIELDS = ('vader_sentiment', 'vader_score', 'finbert_sentiment', 'finbert_score', 'finbert_probabilities')
+
+# Finviz shows "Oct-17-26 09:30AM" on the first row of a day and "09:30AM" after it
+FINVIZ_DATETIME_FORMAT = '%b-%d-%y %I:%M%p'
+TIME_FORMAT = '%I:%M%p'
+RELATIVE_TIME = re.compile(r'(\d+)\s*(minute|min|hour|day|week)s?\s+ago', re.IGNORECASE)
+RELATIVE_UNITS = {'minute': 'minutes', 'min': 'minutes', 'hour': 'hours', 'day': 'days', 'week': 'weeks'}
+
+
+def item_key(item: Dict) -> str:
+    """
+    Identity of a news item: hash of its URL, or of its headline when it has none
+    """
+    url = item.get('url', '')
+    basis = url if url.startswith('http') else normalize_text(item.get('headline', '')).lower()
+    return hashlib.sha1(basis.encode('utf-8')).hexdigest()
+
+
+def parse_published(date_text: str, previous: Optional[datetime] = None,
+                    now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Best-effort parse of a scraped or feed date string
+    Time-only strings take their day from previous (the row above) or today;
+    unparseable strings ('Recent', 'N/A') give None
+    """
+    text = (date_text or '').strip()
+    now = now or datetime.now()
+    if not text:
+        return None
+
+    try:
+        return datetime.strptime(text, FINVIZ_DATETIME_FORMAT)
+    except ValueError:
+        pass
+
+    # Feed dates: RFC 822 (RSS pubDate) and ISO 8601 (Atom), as local time
+    for parse in (parsedate_to_datetime, datetime.fromisoformat):
+        try:
+            published = parse(text)
+        except (TypeError, ValueError):
+            continue
+        return published.astimezone().replace(tzinfo=None) if published.tzinfo else published
+
+    if text.lower().startswith('today'):
+        text, previous = text[5:].strip(), now
+    try:
+        clock = datetime.strptime(text, TIME_FORMAT)
+        day = previous or now
+        return day.replace(hour=clock.hour, minute=clock.minute, second=0, microsecond=0)
+    except ValueError:
+        pass
+
+    match = RELATIVE_TIME.search(text)
+    if match:
+        return now - timedelta(**{RELATIVE_UNITS[match.group(2).lower()]: int(match.group(1))})
+    if text.lower() == 'yesterday':
+        return now - timedelta(days=1)
+    return None
+
+
+def annotate_published(news_items: List[Dict]) -> List[Dict]:
+    """
+    Set 'published' (epoch seconds or None) on items in page order
+    """
+    previous = None
+    for item in news_items:
+        published = parse_published(item.get('date', ''), previous)
+        if published is not None:
+            previous = published
+        item['published'] = published.timestamp() if published is not None else None
+    return news_items
+
+
+def select_new(news_items: List[Dict], known: Optional[Container[str]] = None,
+               since: Optional[float] = None, stop_at_known: bool = True) -> List[Dict]:
+    """
+    Items not seen before, in page order
+    For newest-first listings (stop_at_known) everything from the first
+    already-seen item, or the first item older than since, is dropped;
+    otherwise seen items are just filtered out
+    """
+    annotate_published(news_items)
+    if not known and since is None:
+        return news_items
+
+    new_items = []
+    for item in news_items:
+        seen = known is not None and item_key(item) in known
+        stale = since is not None and item['published'] is not None and item['published'] < since
+        if stop_at_known and (seen or stale):
+            break
+        if not seen:
+            new_items.append(item)
+    return new_items
+
+
+class WatermarkStore:
+    """
+    Per-(ticker, source) record of news items already scraped and scored
+    Holds each pair's items newest first with their content and their
+    scores per analysis mode, plus a watermark (newest parsed publish
+    time). Scrapers use it to stop at the first known item, and callers
+    score only items that have no stored scores. An optional SQLite file
+    keeps the store across restarts.
+    """
+
+    def __init__(self, max_items: int = 200, db_path: Optional[str] = None):
+        self.max_items = max_items
+        self._entries = {}  # (ticker, source) -> list of stored items, newest first
+        self._lock = threading.Lock()
+        self._db = None
+        self.new_items = 0
+        self.reused_items = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS watermark_items "
+                "(ticker TEXT NOT NULL, source TEXT NOT NULL, key TEXT NOT NULL, "
+                "position REAL NOT NULL, item TEXT NOT NULL, PRIMARY KEY (ticker, source, key))"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_watermark_items_pair "
+                "ON watermark_items (ticker, source, position)"
+            )
+            self._db.commit()
+
+    def _items(self, ticker: str, source: str) -> List[Dict]:
+        """
+        Stored items for a pair, loading them from disk on first use; caller must hold the lock
+        """
+        pair = (ticker, source)
+        if pair not in self._entries:
+            items = []
+            if self._db is not None:
+                rows = self._db.execute(
+                    "SELECT item FROM watermark_items WHERE ticker = ? AND source = ? "
+                    "ORDER BY position DESC LIMIT ?", (ticker, source, self.max_items)
+                ).fetchall()
+                items = [json.loads(row[0]) for row in rows]
+            self._entries[pair] = items
+        return self._entries[pair]
+
+    def known(self, ticker: str, source: str) -> Tuple[set, Optional[float]]:
+        """
+        (keys of stored items, watermark) for a pair
+        """
+        with self._lock:
+            items = self._items(ticker, source)
+            times = [item['published'] for item in items if item.get('published') is not None]
+            return {item['key'] for item in items}, (max(times) if times else None)
+
+    def merge(self, ticker: str, source: str, news_items: List[Dict]) -> List[Dict]:
+        """
+        Add newly scraped items and return all stored items for the pair,
+        newest first, as copies; items already stored are not duplicated
+        """
+        stamp = time.time()
+        with self._lock:
+            items = self._items(ticker, source)
+            keys = {item['key'] for item in items}
+
+            fresh = []
+            for item in news_items:
+                key = item_key(item)
+                if key in keys:
+                    continue
+                keys.add(key)
+                stored = {field: value for field, value in item.items() if field not in SCORE_FIELDS}
+                stored.update(key=key, scores={})
+                fresh.append(stored)
+
+            if fresh:
+                items[:0] = fresh
+                del items[self.max_items:]
+                self.new_items += len(fresh)
+                # Later positions sort first; keep page order within this batch
+                self._write(ticker, source, [(stamp + (len(fresh) - i) * 1e-6, item) for i, item in enumerate(fresh)])
+
+            return [dict(item, scores=dict(item['scores'])) for item in items]
+
+    def apply_scores(self, news_items: List[Dict], mode: str) -> List[Dict]:
+        """
+        Copy stored scores for mode onto items; return the items that still need scoring
+        """
+        pending = []
+        for item in news_items:
+            scores = item.get('scores', {}).get(mode)
+            if scores is None:
+                pending.append(item)
+            else:
+                item.update(scores)
+        with self._lock:
+            self.reused_items += len(news_items) - len(pending)
+        return pending
+
+    def save_scores(self, ticker: str, news_items: List[Dict], mode: str):
+        """
+        Store the scores of freshly scored items under mode
+        FinBERT error fallbacks (no class probabilities) are not stored, so
+        later runs score those items again; the sentiment cache skips them too
+        """
+        with self._lock:
+            updates = {}
+            for item in news_items:
+                if not item.get('finbert_probabilities'):
+                    continue
+                scores = {field: item[field] for field in SCORE_FIELDS if field in item}
+                for stored in self._items(ticker, item['source']):
+                    if stored['key'] == item['key']:
+                        stored['scores'][mode] = scores
+                        updates.setdefault(item['source'], []).append(stored)
+                        break
+
+            for source, items in updates.items():
+                self._update(ticker, source, items)
+
+    def _write(self, ticker: str, source: str, positioned: List[Tuple[float, Dict]]):
+        if self._db is None:
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO watermark_items (ticker, source, key, position, item) VALUES (?, ?, ?, ?, ?)",
+            [(ticker, source, item['key'], position, json.dumps(item)) for position, item in positioned]
+        )
+        # Keep the table bounded like the in-memory list
+        self._db.execute(
+            "DELETE FROM watermark_items WHERE ticker = ? AND source = ? AND key NOT IN "
+            "(SELECT key FROM watermark_items WHERE ticker = ? AND source = ? ORDER BY position DESC LIMIT ?)",
+            (ticker, source, ticker, source, self.max_items)
+        )
+        self._db.commit()
+
+    def _update(self, ticker: str, source: str, items: List[Dict]):
+        if self._db is None:
+            return
+        self._db.executemany(
+            "UPDATE watermark_items SET item = ? WHERE ticker = ? AND source = ? AND key = ?",
+            [(json.dumps(item), ticker, source, item['key']) for item in items]
+        )
+        self._db.commit()
+
+    def clear(self, disk: bool = True):
+        with self._lock:
+            self._entries.clear()
+            if disk and self._db is not None:
+                self._db.execute("DELETE FROM watermark_items")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'pairs': len(self._entries),
+                'items': sum(len(items) for items in self._entries.values()),
+                'new': self.new_items,
+                'reused': self.reused_items
+            }
+
+
+# Shared by all sessions in this process; set WATERMARK_DB to persist
+watermark_store = WatermarkStore(
+    max_items=int(os.environ.get('WATERMARK_MAX_ITEMS', 200)),
+    db_path=os.environ.get('WATERMARK_DB')
+)